@@ -0,0 +1,285 @@
+# Incremental achievement engine
+# Requirement JSON is compiled once into predicates indexed by the inputs they read.
+# After a game only the achievements whose inputs that game changed are evaluated,
+# only the inputs those achievements need are loaded, and all unlocks are written
+# with one multi-row INSERT IGNORE. Each row is tagged with the evaluation that
+# wrote it, so XP is credited only for rows this game created.
+
+import json
+import threading
+import time
+import uuid
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Callable, Dict, FrozenSet, List, Optional
+
+import mysql.connector
+
+from config import ACHIEVEMENT_CONFIG, execute_many, execute_query
+
+# Inputs read from the student's game_stats row
+STAT_INPUTS = ("games_completed", "level", "current_streak")
+
+
+@dataclass(frozen=True)
+class GameCompletion:
+    """What a finished game changed, as seen by the achievement engine"""
+    subject: str
+    score: int
+    time_spent: int
+
+
+@dataclass(frozen=True)
+class CompiledAchievement:
+    id: str
+    xp_reward: int
+    inputs: FrozenSet[str]
+    predicate: Callable[[Dict[str, Any]], bool]
+    row: Dict[str, Any]
+
+
+def _at_least(input_key: str, value) -> Callable[[Dict[str, Any]], bool]:
+    return lambda snapshot: (snapshot.get(input_key) or 0) >= value
+
+
+def compile_requirements(requirements: Dict[str, Any]) -> Optional[tuple]:
+    """Turn a requirements object into (inputs, predicate); None for types we cannot evaluate"""
+    req_type = requirements.get("type")
+    value = requirements.get("value")
+    if value is None:
+        return None
+
+    if req_type in STAT_INPUTS or req_type == "streak":
+        input_key = "current_streak" if req_type == "streak" else req_type
+        return frozenset([input_key]), _at_least(input_key, value)
+
+    if req_type == "perfect_score":
+        # Number of games finished with a score of 100
+        return frozenset(["perfect_scores"]), _at_least("perfect_scores", value)
+
+    if req_type in ("subject_mastery", "subject_games") and requirements.get("subject"):
+        input_key = f"{req_type}:{requirements['subject']}"
+        return frozenset([input_key]), _at_least(input_key, value)
+
+    if req_type == "speed_completion":
+        # Finish a game in `value` seconds or less
+        return frozenset(["time_spent"]), \
+            lambda snapshot: snapshot.get("time_spent") is not None and snapshot["time_spent"] <= value
+
+    return None
+
+
+class AchievementEngine:
+    def __init__(self, config: Dict[str, Any] = None):
+        config = config or ACHIEVEMENT_CONFIG
+        self.definitions_ttl_seconds = config["definitions_ttl_seconds"]
+
+        self._by_input: Dict[str, List[CompiledAchievement]] = {}
+        self._definitions: Dict[str, CompiledAchievement] = {}
+        self._unsupported: List[str] = []
+        self._loaded_at: Optional[float] = None
+        self._lock = threading.Lock()
+        self._counters = {
+            "evaluations": 0,
+            "candidates_checked": 0,
+            "awards": 0,
+            "reloads": 0
+        }
+
+    def load(self, force: bool = False, cursor=None):
+        """Compile active achievement definitions; reloaded after definitions_ttl_seconds
+
+        Pass the caller's cursor to read them on a connection it already holds.
+        """
+        if not force and self._loaded_at is not None \
+                and time.monotonic() - self._loaded_at < self.definitions_ttl_seconds:
+            return
+
+        query = "SELECT * FROM achievements WHERE is_active = TRUE"
+        if cursor is None:
+            rows = execute_query(query, fetch=True)
+        else:
+            try:
+                cursor.execute(query)
+                rows = cursor.fetchall()
+            except mysql.connector.Error as e:
+                print(f"❌ Error loading achievement definitions: {e}")
+                rows = None
+        if rows is None:
+            if self._loaded_at is None:
+                raise RuntimeError("Could not load achievement definitions")
+            return  # Keep serving the definitions we have
+
+        definitions, by_input, unsupported = {}, {}, []
+        for row in rows:
+            # A malformed row is skipped rather than failing the completion that loaded it
+            try:
+                requirements = row["requirements"]
+                if isinstance(requirements, (str, bytes, bytearray)):
+                    requirements = json.loads(requirements)
+                compiled = compile_requirements(requirements)
+            except (ValueError, TypeError, AttributeError, KeyError) as e:
+                print(f"❌ Invalid requirements for achievement {row.get('id')}: {e}")
+                compiled = None
+            if compiled is None:
+                unsupported.append(row["id"])
+                continue
+            inputs, predicate = compiled
+            achievement = CompiledAchievement(row["id"], row["xp_reward"], inputs, predicate, row)
+            definitions[row["id"]] = achievement
+            for input_key in inputs:
+                by_input.setdefault(input_key, []).append(achievement)
+
+        with self._lock:
+            self._definitions, self._by_input, self._unsupported = definitions, by_input, unsupported
+            self._loaded_at = time.monotonic()
+            self._counters["reloads"] += 1
+
+    def changed_inputs(self, event: GameCompletion) -> List[str]:
+        """Inputs a completed game can move"""
+        changed = list(STAT_INPUTS)
+        changed += [f"subject_mastery:{event.subject}", f"subject_games:{event.subject}"]
+        if event.score >= 100:
+            changed.append("perfect_scores")
+        if event.time_spent > 0:
+            changed.append("time_spent")
+        return changed
+
+    def _load_snapshot(self, cursor, user_id: int, event: GameCompletion, needed: set) -> Dict[str, Any]:
+        snapshot: Dict[str, Any] = {}
+
+        if needed & set(STAT_INPUTS):
+            cursor.execute(
+                "SELECT games_completed, level, current_streak FROM game_stats WHERE user_id = %s",
+                (user_id,)
+            )
+            row = cursor.fetchone()
+            if row:
+                snapshot.update({key: row[key] for key in STAT_INPUTS})
+
+        subject_keys = {f"subject_mastery:{event.subject}", f"subject_games:{event.subject}"}
+        if needed & subject_keys:
+            cursor.execute(
+                """SELECT MAX(mastery_percentage) AS mastery, SUM(games_completed) AS games
+                   FROM subject_mastery WHERE user_id = %s AND subject = %s""",
+                (user_id, event.subject)
+            )
+            row = cursor.fetchone() or {}
+            snapshot[f"subject_mastery:{event.subject}"] = row.get("mastery")
+            snapshot[f"subject_games:{event.subject}"] = row.get("games")
+
+        if "perfect_scores" in needed:
+            cursor.execute(
+                "SELECT COUNT(*) AS perfect_scores FROM game_progress WHERE user_id = %s AND score >= 100",
+                (user_id,)
+            )
+            snapshot["perfect_scores"] = cursor.fetchone()["perfect_scores"]
+
+        if "time_spent" in needed:
+            snapshot["time_spent"] = event.time_spent
+
+        return snapshot
+
+    def evaluate(self, cursor, user_id: int, event: GameCompletion) -> List[Dict[str, Any]]:
+        """Award every achievement a completed game unlocks, using the caller's transaction"""
+        # Definitions load through the caller's cursor: a second pooled connection
+        # could time out under load and roll back the completion
+        try:
+            self.load(cursor=cursor)
+        except RuntimeError as e:
+            print(f"❌ Skipping achievements for user {user_id}: {e}")
+            return []
+        with self._lock:
+            by_input = self._by_input
+
+        candidates: Dict[str, CompiledAchievement] = {}
+        for input_key in self.changed_inputs(event):
+            for achievement in by_input.get(input_key, ()):
+                candidates[achievement.id] = achievement
+        if not candidates:
+            return []
+
+        # Drop the ones this student already has
+        placeholders = ", ".join(["%s"] * len(candidates))
+        cursor.execute(
+            f"""SELECT achievement_id FROM student_achievements
+                WHERE user_id = %s AND achievement_id IN ({placeholders})""",
+            (user_id, *candidates)
+        )
+        for row in cursor.fetchall():
+            candidates.pop(row["achievement_id"], None)
+        if not candidates:
+            return []
+
+        needed = set().union(*(achievement.inputs for achievement in candidates.values()))
+        snapshot = self._load_snapshot(cursor, user_id, event, needed)
+        unlocked = [achievement for achievement in candidates.values() if achievement.predicate(snapshot)]
+
+        awarded = self._award(cursor, user_id, unlocked, snapshot)
+
+        if awarded:
+            cursor.execute(
+                "UPDATE game_stats SET total_points = total_points + %s WHERE user_id = %s",
+                (sum(achievement.xp_reward for achievement in awarded), user_id)
+            )
+
+        with self._lock:
+            self._counters["evaluations"] += 1
+            self._counters["candidates_checked"] += len(candidates)
+            self._counters["awards"] += len(awarded)
+
+        return [dict(achievement.row) for achievement in awarded]
+
+    def _award(self, cursor, user_id: int, unlocked: List[CompiledAchievement],
+               snapshot: Dict[str, Any]) -> List[CompiledAchievement]:
+        """Insert the unlocked achievements and return the ones this call created"""
+        if not unlocked:
+            return []
+
+        # A concurrent completion may award the same achievement; rows carry this
+        # call's award_id so only the ones it actually inserted credit their XP
+        award_id = uuid.uuid4().hex
+        now = datetime.now()
+        rows = [
+            (user_id, achievement.id, now,
+             json.dumps({"award_id": award_id,
+                         **{key: snapshot.get(key) for key in achievement.inputs}}, default=float))
+            for achievement in unlocked
+        ]
+        inserted = sum(execute_many(
+            """INSERT IGNORE INTO student_achievements (user_id, achievement_id, unlocked_at, progress_data)
+               VALUES (%s, %s, %s, %s)""",
+            rows, cursor=cursor
+        ))
+        if inserted == len(unlocked):
+            return unlocked
+        if inserted == 0:
+            return []
+
+        placeholders = ", ".join(["%s"] * len(unlocked))
+        cursor.execute(
+            f"""SELECT achievement_id, progress_data FROM student_achievements
+                WHERE user_id = %s AND achievement_id IN ({placeholders})""",
+            (user_id, *(achievement.id for achievement in unlocked))
+        )
+        created = set()
+        for row in cursor.fetchall():
+            progress_data = row["progress_data"]
+            if isinstance(progress_data, (str, bytes, bytearray)):
+                progress_data = json.loads(progress_data)
+            if isinstance(progress_data, dict) and progress_data.get("award_id") == award_id:
+                created.add(row["achievement_id"])
+        return [achievement for achievement in unlocked if achievement.id in created]
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "definitions": len(self._definitions),
+                "indexed_inputs": sorted(self._by_input),
+                "unsupported": list(self._unsupported),
+                **self._counters
+            }
+
+
+# Initialize the achievement engine
+achievement_engine = AchievementEngine()
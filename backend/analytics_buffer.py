@@ -0,0 +1,184 @@
+# Buffered writer for learning_analytics events
+# Request handlers enqueue events without touching MySQL; a daemon thread writes
+# them in multi-row inserts when a batch fills up or the flush interval passes.
+# The queue is bounded: on overflow the configured policy drops the oldest or
+# newest event, or briefly blocks the caller before dropping. After a failed
+# flush the thread backs off exponentially (capped) before retrying.
+
+import atexit
+import json
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+from config import ANALYTICS_BUFFER_CONFIG, execute_many, execute_query
+
+OVERFLOW_POLICIES = ("drop_oldest", "drop_newest", "block")
+
+INSERT_EVENTS = """INSERT INTO learning_analytics
+                   (user_id, game_id, session_id, event_type, event_data, timestamp)
+                   VALUES (%s, %s, %s, %s, %s, %s)"""
+
+Event = Tuple[int, str, Optional[str], str, str, datetime]
+
+
+class AnalyticsBuffer:
+    def __init__(self, config: Dict[str, Any] = None):
+        config = config or ANALYTICS_BUFFER_CONFIG
+        self.enabled = config["enabled"]
+        self.max_queue_size = config["max_queue_size"]
+        self.batch_size = config["batch_size"]
+        self.flush_interval_seconds = config["flush_interval_seconds"]
+        self.max_backoff_seconds = config["max_backoff_seconds"]
+        self.overflow_policy = config["overflow_policy"]
+        self.block_timeout_seconds = config["block_timeout_seconds"]
+        if self.overflow_policy not in OVERFLOW_POLICIES:
+            raise ValueError(f"Unknown analytics overflow policy: {self.overflow_policy}")
+
+        self._queue: Deque[Event] = deque()
+        self._lock = threading.Lock()
+        self._has_batch = threading.Condition(self._lock)
+        self._has_space = threading.Condition(self._lock)
+        self._flush_lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._closed = False
+        self._counters = {
+            "enqueued": 0,
+            "written": 0,
+            "dropped": 0,
+            "flushes": 0,
+            "flush_failures": 0
+        }
+
+    def log(self, user_id: int, game_id: str, session_id: Optional[str],
+            event_type: str, event_data: Dict = None) -> bool:
+        """Queue one event; returns False if it was dropped"""
+        event = (user_id, game_id, session_id, event_type, json.dumps(event_data or {}), datetime.now())
+
+        if not self.enabled or self._closed:
+            return self._write_direct(event)
+
+        self._ensure_started()
+        with self._lock:
+            if len(self._queue) >= self.max_queue_size:
+                if self.overflow_policy == "drop_oldest":
+                    self._queue.popleft()
+                    self._counters["dropped"] += 1
+                elif self.overflow_policy == "block":
+                    self._has_space.wait_for(lambda: len(self._queue) < self.max_queue_size,
+                                             timeout=self.block_timeout_seconds)
+
+                if len(self._queue) >= self.max_queue_size:
+                    self._counters["dropped"] += 1
+                    return False
+
+            self._queue.append(event)
+            self._counters["enqueued"] += 1
+            if len(self._queue) >= self.batch_size:
+                self._has_batch.notify()
+        return True
+
+    def _write_direct(self, event: Event) -> bool:
+        return execute_query(INSERT_EVENTS, event) is not None
+
+    def _take_batch(self) -> List[Event]:
+        with self._lock:
+            batch = [self._queue.popleft() for _ in range(min(self.batch_size, len(self._queue)))]
+            if batch:
+                self._has_space.notify_all()
+            return batch
+
+    def _requeue(self, batch: List[Event]):
+        """Put a failed batch back at the front, dropping what no longer fits"""
+        with self._lock:
+            room = max(0, self.max_queue_size - len(self._queue))
+            kept = batch[:room]
+            self._queue.extendleft(reversed(kept))
+            self._counters["dropped"] += len(batch) - len(kept)
+
+    def _write_batch(self, batch: List[Event]) -> bool:
+        # Multi-row inserts sized under max_allowed_packet, committed as one unit
+        return execute_many(INSERT_EVENTS, batch, transaction=True) is not None
+
+    def flush(self) -> int:
+        """Write everything queued so far; returns the number of events written"""
+        written = 0
+        with self._flush_lock:
+            while True:
+                batch = self._take_batch()
+                if not batch:
+                    break
+                if not self._write_batch(batch):
+                    self._requeue(batch)
+                    with self._lock:
+                        self._counters["flush_failures"] += 1
+                    break
+                written += len(batch)
+                with self._lock:
+                    self._counters["written"] += len(batch)
+                    self._counters["flushes"] += 1
+        return written
+
+    def _run(self):
+        backoff = 0.0
+        while True:
+            with self._lock:
+                if backoff:
+                    # Requeued events may already fill a batch; only close() cuts the retry delay short
+                    self._has_batch.wait_for(lambda: self._closed, timeout=backoff)
+                else:
+                    self._has_batch.wait_for(
+                        lambda: self._closed or len(self._queue) >= self.batch_size,
+                        timeout=self.flush_interval_seconds
+                    )
+                closed = self._closed
+                failures = self._counters["flush_failures"]
+            self.flush()
+            if closed:
+                return
+            with self._lock:
+                failed = self._counters["flush_failures"] != failures
+            if failed:
+                backoff = min(max(backoff * 2, self.flush_interval_seconds), self.max_backoff_seconds)
+            else:
+                backoff = 0.0
+
+    def _ensure_started(self):
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="analytics-buffer", daemon=True)
+                self._thread.start()
+
+    def close(self, timeout: float = 10.0):
+        """Stop accepting buffered events and flush what is queued"""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            self._has_batch.notify()
+            self._has_space.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout)
+        deadline = time.monotonic() + timeout
+        while self._queue and time.monotonic() < deadline:
+            if not self.flush():
+                break
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "queued": len(self._queue),
+                "max_queue_size": self.max_queue_size,
+                "overflow_policy": self.overflow_policy,
+                **self._counters
+            }
+
+
+# Initialize the buffer and flush it when the process exits
+analytics_buffer = AnalyticsBuffer()
+atexit.register(analytics_buffer.close)
@@ -0,0 +1,159 @@
+# Async MySQL access layer
+# Runs mysql-connector calls on a dedicated thread pool so async services never
+# block the event loop. Unlike execute_query, failures raise typed errors instead
+# of returning None.
+
+import asyncio
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Sequence
+
+import mysql.connector
+
+import config
+from config import ASYNC_DB_CONFIG
+
+
+class DatabaseError(Exception):
+    """A statement failed; errno carries the MySQL error code when there is one"""
+
+    def __init__(self, message: str, errno: Optional[int] = None):
+        super().__init__(message)
+        self.errno = errno
+
+
+class DatabaseUnavailableError(DatabaseError):
+    """No connection could be obtained from the pool"""
+
+
+@dataclass
+class QueryResult:
+    rows: List[Dict[str, Any]] = field(default_factory=list)
+    rowcount: int = 0
+    lastrowid: Optional[int] = None
+
+    def first(self) -> Optional[Dict[str, Any]]:
+        return self.rows[0] if self.rows else None
+
+
+def _acquire():
+    connection = config.get_db_connection()
+    if connection is None:
+        raise DatabaseUnavailableError("No database connection available")
+    return connection
+
+
+def _release(connection):
+    try:
+        connection.close()
+    except mysql.connector.Error:
+        pass
+
+
+def _run_statement(connection, query: str, params: Optional[Sequence]) -> QueryResult:
+    cursor = connection.cursor(dictionary=True)
+    try:
+        with config.query_metrics.timed(query) as timing:
+            cursor.execute(query, params or ())
+            rows = cursor.fetchall() if cursor.with_rows else []
+            timing["rows"] = len(rows) if cursor.with_rows else cursor.rowcount
+        return QueryResult(rows=rows, rowcount=cursor.rowcount, lastrowid=cursor.lastrowid)
+    except mysql.connector.Error as err:
+        raise DatabaseError(str(err), getattr(err, "errno", None)) from err
+    finally:
+        cursor.close()
+
+
+def _execute(query: str, params: Optional[Sequence]) -> QueryResult:
+    connection = _acquire()
+    try:
+        return _run_statement(connection, query, params)
+    finally:
+        _release(connection)
+
+
+def _begin():
+    connection = _acquire()
+    try:
+        connection.start_transaction()
+    except mysql.connector.Error as err:
+        _release(connection)
+        raise DatabaseError(str(err), getattr(err, "errno", None)) from err
+    return connection
+
+
+def _finish(connection, commit: bool):
+    try:
+        if commit:
+            connection.commit()
+        else:
+            connection.rollback()
+    except mysql.connector.Error as err:
+        raise DatabaseError(str(err), getattr(err, "errno", None)) from err
+    finally:
+        _release(connection)
+
+
+class AsyncTransaction:
+    """Statements issued on one connection between BEGIN and COMMIT/ROLLBACK"""
+
+    def __init__(self, db: "AsyncDatabase", connection):
+        self._db = db
+        self._connection = connection
+
+    async def execute(self, query: str, params: Optional[Sequence] = None) -> QueryResult:
+        return await self._db.run_sync(_run_statement, self._connection, query, params)
+
+    async def fetch_all(self, query: str, params: Optional[Sequence] = None) -> List[Dict[str, Any]]:
+        return (await self.execute(query, params)).rows
+
+    async def fetch_one(self, query: str, params: Optional[Sequence] = None) -> Optional[Dict[str, Any]]:
+        return (await self.execute(query, params)).first()
+
+
+class AsyncDatabase:
+    def __init__(self, db_config: Dict[str, Any] = None):
+        db_config = db_config or ASYNC_DB_CONFIG
+        self.max_workers = db_config["max_workers"]
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.max_workers,
+            thread_name_prefix=db_config["thread_name_prefix"]
+        )
+
+    async def run_sync(self, func: Callable, *args):
+        """Run a blocking database callable on the database thread pool"""
+        loop = asyncio.get_running_loop()
+        # Carry context variables (e.g. the route queries are attributed to) into the worker thread
+        context = contextvars.copy_context()
+        return await loop.run_in_executor(self._executor, context.run, func, *args)
+
+    async def execute(self, query: str, params: Optional[Sequence] = None) -> QueryResult:
+        """Run one autocommit statement"""
+        return await self.run_sync(_execute, query, params)
+
+    async def fetch_all(self, query: str, params: Optional[Sequence] = None) -> List[Dict[str, Any]]:
+        return (await self.execute(query, params)).rows
+
+    async def fetch_one(self, query: str, params: Optional[Sequence] = None) -> Optional[Dict[str, Any]]:
+        return (await self.execute(query, params)).first()
+
+    @asynccontextmanager
+    async def transaction(self) -> AsyncIterator[AsyncTransaction]:
+        """Run several statements on one connection; commit on success, roll back on error"""
+        connection = await self.run_sync(_begin)
+        try:
+            yield AsyncTransaction(self, connection)
+        except BaseException:
+            await asyncio.shield(self.run_sync(_finish, connection, False))
+            raise
+        await self.run_sync(_finish, connection, True)
+
+    def close(self):
+        """Stop the database thread pool"""
+        self._executor.shutdown(wait=False)
+
+
+# Initialize the async database layer
+async_db = AsyncDatabase()
@@ -0,0 +1,246 @@
+# Bearer token verification for the game APIs
+# HS256 JWTs are checked locally (signature, exp, nbf) so forged or expired tokens
+# never reach MySQL. Tokens that pass are mapped to their user row through a
+# bounded TTL cache; only a cache miss costs a query. Opaque session tokens issued
+# by the Next.js login are looked up in the sessions table the same way.
+# Revocation goes through the sessions table: revoke() deletes the session and
+# evicts every cached token that depends on it.
+
+import base64
+import hashlib
+import hmac
+import json
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional, Set
+
+from config import AUTH_CONFIG, execute_prepared, execute_query
+
+
+class InvalidTokenError(Exception):
+    """The token is malformed, badly signed or outside its validity window"""
+
+
+def _b64decode(segment: str) -> bytes:
+    return base64.urlsafe_b64decode(segment + "=" * (-len(segment) % 4))
+
+
+def decode_jwt(token: str, secret: str, leeway: int = 0) -> Dict[str, Any]:
+    """Verify an HS256 JWT without any I/O and return its claims"""
+    try:
+        header_segment, payload_segment, signature_segment = token.split(".")
+        header = json.loads(_b64decode(header_segment))
+        signature = _b64decode(signature_segment)
+    except (ValueError, TypeError) as e:
+        raise InvalidTokenError(f"Malformed token: {e}")
+
+    if header.get("alg") != "HS256":
+        raise InvalidTokenError(f"Unsupported algorithm: {header.get('alg')}")
+
+    expected = hmac.new(secret.encode("utf-8"), f"{header_segment}.{payload_segment}".encode("ascii"),
+                        hashlib.sha256).digest()
+    if not hmac.compare_digest(signature, expected):
+        raise InvalidTokenError("Bad signature")
+
+    try:
+        claims = json.loads(_b64decode(payload_segment))
+    except ValueError as e:
+        raise InvalidTokenError(f"Malformed claims: {e}")
+
+    now = time.time()
+    if "exp" in claims and now > claims["exp"] + leeway:
+        raise InvalidTokenError("Token expired")
+    if "nbf" in claims and now < claims["nbf"] - leeway:
+        raise InvalidTokenError("Token not yet valid")
+    if "sub" not in claims:
+        raise InvalidTokenError("Token has no subject")
+    return claims
+
+
+def _timestamp(value) -> Optional[float]:
+    """Session expiry from MySQL (naive UTC, see DATABASE_CONFIG time_zone) as epoch seconds"""
+    if value is None:
+        return None
+    if isinstance(value, datetime):
+        return value.replace(tzinfo=value.tzinfo or timezone.utc).timestamp()
+    return float(value)
+
+
+@dataclass(frozen=True)
+class CachedUser:
+    user: Dict[str, Any]
+    session_token: Optional[str]
+    valid_until: float  # epoch seconds
+
+
+class TokenVerifier:
+    def __init__(self, config: Dict[str, Any] = None):
+        config = config or AUTH_CONFIG
+        self.jwt_secret = config["jwt_secret"]
+        self.jwt_leeway_seconds = config["jwt_leeway_seconds"]
+        self.require_session = config["require_session"]
+        self.cache_max_entries = config["cache_max_entries"]
+        self.cache_ttl_seconds = config["cache_ttl_seconds"]
+        self.dev_user_id = config["dev_user_id"]
+
+        self._cache: "OrderedDict[str, CachedUser]" = OrderedDict()
+        self._by_user: Dict[int, Set[str]] = {}
+        self._by_session: Dict[str, Set[str]] = {}
+        self._lock = threading.Lock()
+        self._counters = {
+            "hits": 0,
+            "misses": 0,
+            "rejected": 0,
+            "revocations": 0,
+            "evictions": 0
+        }
+
+    def cached(self, token: str) -> Optional[Dict[str, Any]]:
+        """The cached user row for a token, without any I/O; None means call verify()"""
+        with self._lock:
+            entry = self._cache.get(token)
+            if entry is not None:
+                if time.time() < entry.valid_until:
+                    self._cache.move_to_end(token)
+                    self._counters["hits"] += 1
+                    return entry.user
+                self._forget(token)
+        return None
+
+    def verify(self, token: str) -> Optional[Dict[str, Any]]:
+        """Return the user row for a bearer token, or None if it is not valid"""
+        user = self.cached(token)
+        if user is not None:
+            return user
+
+        now = time.time()
+        with self._lock:
+            self._counters["misses"] += 1
+        try:
+            entry = self._load(token, now)
+        except InvalidTokenError:
+            entry = None
+        if entry is None:
+            with self._lock:
+                self._counters["rejected"] += 1
+            return None
+
+        self._remember(token, entry)
+        return entry.user
+
+    def _load(self, token: str, now: float) -> Optional[CachedUser]:
+        valid_until = now + self.cache_ttl_seconds
+
+        if token.count(".") == 2:
+            if not self.jwt_secret:
+                raise InvalidTokenError("JWT received but AUTH_JWT_SECRET is not configured")
+            claims = decode_jwt(token, self.jwt_secret, self.jwt_leeway_seconds)
+            if "exp" in claims:
+                valid_until = min(valid_until, claims["exp"] + self.jwt_leeway_seconds)
+            user_id = int(claims["sub"])
+            session_token = claims.get("sid")
+
+            if session_token is None:
+                if self.require_session:
+                    raise InvalidTokenError("Token is not bound to a session")
+                rows = execute_prepared("user_by_id", (user_id,), fetch=True)
+            else:
+                rows = execute_prepared("session_user_by_token", (session_token,), fetch=True)
+                if rows and rows[0]["id"] != user_id:
+                    raise InvalidTokenError("Session belongs to another user")
+        else:
+            session_token = token
+            rows = execute_prepared("session_user_by_token", (token,), fetch=True)
+            if not rows and self.dev_user_id is not None:
+                # Development fallback: unknown tokens act as the configured user
+                session_token = None
+                rows = execute_prepared("user_by_id", (self.dev_user_id,), fetch=True)
+
+        if not rows:
+            return None
+
+        user = dict(rows[0])
+        session_expires_at = _timestamp(user.pop("session_expires_at", None))
+        if session_expires_at is not None:
+            valid_until = min(valid_until, session_expires_at)
+        return CachedUser(user=user, session_token=session_token, valid_until=valid_until)
+
+    def _remember(self, token: str, entry: CachedUser):
+        with self._lock:
+            self._forget(token)
+            self._cache[token] = entry
+            self._by_user.setdefault(entry.user["id"], set()).add(token)
+            if entry.session_token is not None:
+                self._by_session.setdefault(entry.session_token, set()).add(token)
+            while len(self._cache) > self.cache_max_entries:
+                oldest = next(iter(self._cache))
+                self._forget(oldest)
+                self._counters["evictions"] += 1
+
+    def _forget(self, token: str):
+        """Drop one cached token and its index entries; caller holds the lock"""
+        entry = self._cache.pop(token, None)
+        if entry is None:
+            return
+        for index, key in ((self._by_user, entry.user["id"]), (self._by_session, entry.session_token)):
+            tokens = index.get(key)
+            if tokens is not None:
+                tokens.discard(token)
+                if not tokens:
+                    del index[key]
+
+    def revoke(self, token: str) -> bool:
+        """Log a token out: delete its session row and evict it from the cache"""
+        session_token = token
+        with self._lock:
+            entry = self._cache.get(token)
+            if entry is not None:
+                session_token = entry.session_token
+        if session_token is None and token.count(".") == 2 and self.jwt_secret:
+            try:
+                session_token = decode_jwt(token, self.jwt_secret, self.jwt_leeway_seconds).get("sid")
+            except InvalidTokenError:
+                pass
+
+        deleted = True
+        if session_token is not None:
+            deleted = execute_query("DELETE FROM sessions WHERE token = %s", (session_token,)) is not None
+            self.invalidate_session(session_token)
+        with self._lock:
+            self._forget(token)
+            self._counters["revocations"] += 1
+        return deleted
+
+    def invalidate_session(self, session_token: str):
+        """Evict every cached token bound to a session deleted elsewhere"""
+        with self._lock:
+            for token in list(self._by_session.get(session_token, ())):
+                self._forget(token)
+
+    def invalidate_user(self, user_id: int):
+        """Evict a user's cached tokens, e.g. after their sessions were deleted or their row changed"""
+        with self._lock:
+            for token in list(self._by_user.get(user_id, ())):
+                self._forget(token)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            counters = dict(self._counters)
+            size = len(self._cache)
+
+        lookups = counters["hits"] + counters["misses"]
+        return {
+            "jwt_enabled": bool(self.jwt_secret),
+            "size": size,
+            "max_entries": self.cache_max_entries,
+            "ttl_seconds": self.cache_ttl_seconds,
+            "hit_ratio": round(counters["hits"] / lookups, 4) if lookups else 0.0,
+            **counters
+        }
+
+
+# Initialize the token verifier
+token_verifier = TokenVerifier()
@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark: blocking execute_query vs the async_db layer inside an event loop.
+
+Runs N concurrent "requests" that each issue one query, and measures total time
+and worst event-loop stall (how late a 10ms heartbeat fires). By default the
+database is a stand-in connection with a fixed round-trip latency; pass --mysql
+to use the DATABASE_* settings from .env instead.
+
+Usage: python bench_async_db.py [--requests 200] [--rtt 0.02] [--mysql]
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import config
+from config import execute_query
+from async_db import async_db
+
+QUERY = "SELECT 1 AS ok"
+
+
+class _StandInCursor:
+    def __init__(self, rtt: float):
+        self.rtt = rtt
+        self.rowcount = 0
+        self.lastrowid = None
+        self.with_rows = False
+
+    def execute(self, query, params=()):
+        time.sleep(self.rtt)
+        self.with_rows = query.lstrip().upper().startswith("SELECT")
+        self.rowcount = 1
+
+    def fetchall(self):
+        return [{"ok": 1}]
+
+    def fetchone(self):
+        return {"ok": 1}
+
+    def close(self):
+        pass
+
+
+class StandInConnection:
+    """Behaves like a pooled mysql-connector connection with a fixed round trip"""
+
+    def __init__(self, rtt: float):
+        self.rtt = rtt
+
+    def cursor(self, dictionary=False, **kwargs):
+        return _StandInCursor(self.rtt)
+
+    def commit(self):
+        pass
+
+    def rollback(self):
+        pass
+
+    def start_transaction(self):
+        pass
+
+    def close(self):
+        pass
+
+
+async def heartbeat(stop: asyncio.Event, interval: float = 0.01) -> float:
+    """Return the worst lateness of a periodic timer while the benchmark runs"""
+    worst = 0.0
+    while not stop.is_set():
+        expected = time.perf_counter() + interval
+        await asyncio.sleep(interval)
+        worst = max(worst, time.perf_counter() - expected)
+    return worst
+
+
+async def run_case(name: str, one_request, total: int):
+    stop = asyncio.Event()
+    monitor = asyncio.create_task(heartbeat(stop))
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one_request() for _ in range(total)))
+    elapsed = time.perf_counter() - started
+
+    stop.set()
+    worst_stall = await monitor
+    print(f"{name:<28} {elapsed:7.3f}s  {total / elapsed:8.1f} req/s  worst loop stall {worst_stall * 1000:8.1f}ms")
+
+
+async def blocking_request():
+    execute_query(QUERY, fetch=True)
+
+
+async def async_request():
+    await async_db.fetch_all(QUERY)
+
+
+async def run_all(total: int):
+    await run_case("execute_query (blocking)", blocking_request, total)
+    await run_case("async_db.fetch_all", async_request, total)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=200, help="concurrent requests")
+    parser.add_argument("--rtt", type=float, default=0.02, help="stand-in round-trip time in seconds")
+    parser.add_argument("--mysql", action="store_true", help="use the real database from .env")
+    args = parser.parse_args()
+
+    if not args.mysql:
+        config.get_db_connection = lambda: StandInConnection(args.rtt)
+        backend = f"stand-in connection, {args.rtt * 1000:.0f}ms RTT"
+    else:
+        backend = f"MySQL at {config.DATABASE_CONFIG['host']}"
+
+    print(f"🧪 {args.requests} concurrent requests against {backend}, "
+          f"{async_db.max_workers} async_db workers")
+    print("=" * 80)
+    asyncio.run(run_all(args.requests))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""
+Import-time benchmark for config.py.
+
+Each run starts a fresh interpreter and times `import config`. The "eager" case
+also calls warm_up_pool() right after the import, which is what every importer
+used to pay before the pool became lazy. By default DATABASE_HOST points at an
+unroutable address so the eager case shows the cost of a remote database that
+is slow or unreachable; pass --real-host to use the .env settings instead.
+
+Usage: python bench_config_import.py [--runs 5] [--real-host] [--timeout 5]
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+
+CASES = {
+    "lazy (import only)": "import config",
+    "eager (import + pool)": "import config; config.warm_up_pool()"
+}
+
+
+def time_import(code: str, env: dict, timeout: float) -> float:
+    started = time.perf_counter()
+    try:
+        subprocess.run([sys.executable, "-c", code], cwd=BACKEND_DIR, env=env,
+                       stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, timeout=timeout)
+    except subprocess.TimeoutExpired:
+        pass  # Counted as the full timeout
+    return time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5, help="interpreter launches per case")
+    parser.add_argument("--real-host", action="store_true", help="use DATABASE_HOST from .env")
+    parser.add_argument("--timeout", type=float, default=30, help="give up on one launch after this many seconds")
+    args = parser.parse_args()
+
+    env = dict(os.environ)
+    if not args.real_host:
+        env["DATABASE_HOST"] = "10.255.255.1"  # Unroutable: the TLS handshake never starts
+
+    print(f"🧪 import config, {args.runs} fresh interpreters per case, "
+          f"DATABASE_HOST={env.get('DATABASE_HOST')}")
+    print("=" * 72)
+    for name, code in CASES.items():
+        timings = [time_import(code, env, args.timeout) for _ in range(args.runs)]
+        print(f"{name:<24} median {statistics.median(timings) * 1000:9.1f}ms   "
+              f"max {max(timings) * 1000:9.1f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,333 @@
+#!/usr/bin/env python3
+"""
+Load benchmark: Flask game API (threaded WSGI server, as app.run serves it) vs
+the ASGI variant in game_api_asgi.py (uvicorn, one worker).
+
+Each app runs in its own subprocess. N simulated students each open a
+keep-alive connection, start a game session and then loop over a typical mix:
+game list, stats dashboard (with If-None-Match), autosave, leaderboard and
+game details. Reports requests/sec and latency percentiles per app.
+
+By default MySQL is replaced by a stand-in driver with a fixed round-trip time
+behind the real connection pool, so both apps see the same pool limits; pass
+--mysql to use the DATABASE_* settings from .env (students then authenticate
+as AUTH_DEV_USER_ID, default 1).
+
+Usage: python bench_game_api_asgi.py [--students 500] [--duration 15] [--rtt 0.01] [--mysql]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+GAMES = 40
+SUBJECTS = ("maths", "science", "english", "technology")
+
+# (weight, method, path); {game} and {session} are filled per student
+WORKLOAD = (
+    (30, "GET", "/api/games"),
+    (20, "GET", "/api/student/stats"),
+    (35, "POST", "/api/games/{game}/progress"),
+    (10, "GET", "/api/leaderboard"),
+    (5, "GET", "/api/games/{game}"),
+)
+
+
+# ---- stand-in MySQL driver ----
+
+def _game_row(index: int):
+    return {
+        "id": f"game-{index}", "title": f"Game {index}", "subject": SUBJECTS[index % len(SUBJECTS)],
+        "class_level": 6 + index % 3, "game_type": "puzzle", "difficulty": "BEGINNER",
+        "time_estimate": 5, "xp_reward": 100, "is_active": True, "assets": None,
+        "curriculum_data": json.dumps({"topic": f"topic-{index}"}),
+        "unlock_requirements": json.dumps({"level": 2}) if index % 5 == 4 else None,
+        "created_at": datetime(2025, 1, 1), "updated_at": datetime(2025, 1, 1)
+    }
+
+
+def _student_row(user_id: int):
+    return {
+        "id": user_id, "user_id": user_id, "name": f"Student {user_id}", "avatar": None, "grade": 6,
+        "role": "student", "level": 3, "total_points": 1200 + user_id, "games_completed": 10,
+        "average_score": 78.5, "current_streak": 2, "favorite_subject": "maths"
+    }
+
+
+def _respond(query: str, params):
+    """Plausible rows for each statement the game API issues"""
+    if "FROM sessions s" in query:
+        token = params[0]
+        user_id = int(token.rsplit("-", 1)[1]) if token.startswith("student-") else 1
+        return [dict(_student_row(user_id), session_expires_at=datetime.utcnow() + timedelta(days=1))]
+    if "MAX(updated_at)" in query:
+        return [{"updated_at": datetime(2025, 1, 1), "games": GAMES}]
+    if query.startswith("SELECT * FROM games"):
+        return [_game_row(index) for index in range(GAMES)]
+    if "SELECT game_id, best_score, attempts" in query:
+        return [{"game_id": "game-0", "best_score": 80, "attempts": 2}]
+    if "SELECT level, games_completed FROM game_stats" in query:
+        return [{"level": 3, "games_completed": 10}]
+    if "SELECT subject, mastery_percentage" in query:
+        return [{"subject": "maths", "mastery_percentage": 55.0}]
+    if "FROM game_stats gs" in query and "WHERE gs.user_id" in query:
+        return [_student_row(params[0])]
+    if "u.role = 'student'" in query and "FROM game_stats gs" in query:
+        return [_student_row(user_id) for user_id in range(1, 1001)]
+    if "SELECT id FROM game_sessions" in query:
+        return [{"id": params[0]}]
+    if "@@max_allowed_packet" in query:
+        return [{"max_allowed_packet": 64 * 1024 * 1024}]
+    if "attempts as total_attempts" in query:
+        return [{"total_attempts": 2, "average_score": 75.0, "best_score": 80, "total_time_spent": 300}]
+    if "FROM users u" in query and "WHERE u.id" in query:
+        return [_student_row(params[0])]
+    return []
+
+
+class _StandInCursor:
+    def __init__(self, rtt: float):
+        self.rtt = rtt
+        self.rows = []
+        self.rowcount = 0
+        self.lastrowid = 1
+        self.with_rows = False
+
+    def execute(self, query, params=()):
+        time.sleep(self.rtt)
+        query = " ".join(query.split())
+        self.with_rows = query.upper().startswith("SELECT")
+        self.rows = _respond(query, params or ()) if self.with_rows else []
+        self.rowcount = len(self.rows) if self.with_rows else 1
+
+    def executemany(self, query, seq_params):
+        time.sleep(self.rtt)
+        self.rowcount = len(seq_params)
+
+    def fetchall(self):
+        rows, self.rows = self.rows, []
+        return rows
+
+    def fetchone(self):
+        return self.rows.pop(0) if self.rows else None
+
+    def close(self):
+        pass
+
+
+class StandInConnection:
+    """Raw connection as mysql.connector.connect returns it, with a fixed round trip per statement"""
+
+    def __init__(self, rtt: float):
+        self.rtt = rtt
+        self.in_transaction = False
+
+    def cursor(self, dictionary=False, prepared=False, **kwargs):
+        return _StandInCursor(self.rtt)
+
+    def ping(self, reconnect=False):
+        pass
+
+    def start_transaction(self):
+        self.in_transaction = True
+
+    def commit(self):
+        self.in_transaction = False
+
+    def rollback(self):
+        self.in_transaction = False
+
+    def close(self):
+        pass
+
+
+def install_stand_in(rtt: float):
+    import mysql.connector
+    mysql.connector.connect = lambda **kwargs: StandInConnection(rtt)
+
+
+# ---- servers ----
+
+def serve(app_name: str, port: int):
+    if app_name == "flask":
+        from werkzeug.serving import make_server
+        from game_api import app
+        make_server("127.0.0.1", port, app, threaded=True).serve_forever()
+    else:
+        import uvicorn
+        from game_api_asgi import app
+        uvicorn.run(app, host="127.0.0.1", port=port, log_level="warning", access_log=False, backlog=2048)
+
+
+# ---- load generator ----
+
+class HttpConnection:
+    """Minimal HTTP/1.1 keep-alive client; enough for JSON requests against one server"""
+
+    def __init__(self, port: int):
+        self.port = port
+        self.reader = None
+        self.writer = None
+
+    async def request(self, method: str, path: str, headers: dict, body: bytes = b""):
+        if self.writer is None:
+            self.reader, self.writer = await asyncio.open_connection("127.0.0.1", self.port)
+
+        lines = [f"{method} {path} HTTP/1.1", f"Host: 127.0.0.1:{self.port}", f"Content-Length: {len(body)}"]
+        lines += [f"{name}: {value}" for name, value in headers.items()]
+        self.writer.write(("\r\n".join(lines) + "\r\n\r\n").encode("latin-1") + body)
+
+        head = (await self.reader.readuntil(b"\r\n\r\n")).decode("latin-1").split("\r\n")
+        status = int(head[0].split(" ")[1])
+        response_headers = {}
+        for line in head[1:]:
+            if ":" in line:
+                name, value = line.split(":", 1)
+                response_headers[name.strip().lower()] = value.strip()
+
+        if response_headers.get("transfer-encoding") == "chunked":
+            payload = b""
+            while True:
+                size = int((await self.reader.readuntil(b"\r\n")).strip(), 16)
+                payload += (await self.reader.readexactly(size + 2))[:-2]
+                if size == 0:
+                    break
+        else:
+            payload = await self.reader.readexactly(int(response_headers.get("content-length", 0)))
+
+        if response_headers.get("connection", "").lower() == "close":
+            self.writer.close()
+            self.reader = self.writer = None
+        return status, response_headers, payload
+
+
+async def student(index: int, port: int, deadline: float, measure_from: float, results: dict):
+    connection = HttpConnection(port)
+    headers = {"Authorization": f"Bearer student-{index + 1}", "Content-Type": "application/json"}
+    game = "game-0"
+    session_id = None
+    while session_id is None and time.perf_counter() < deadline:
+        try:
+            status, _, payload = await connection.request("POST", f"/api/games/{game}/start", headers)
+            session_id = json.loads(payload).get("session_id") if status == 200 else None
+        except (OSError, asyncio.IncompleteReadError, ValueError):
+            connection = HttpConnection(port)
+            await asyncio.sleep(0.1)
+    etag = None
+    rng = random.Random(index)
+    weights = [weight for weight, _, _ in WORKLOAD]
+    score = 0
+
+    while time.perf_counter() < deadline:
+        _, method, path = rng.choices(WORKLOAD, weights)[0]
+        request_headers, body = dict(headers), b""
+        if path == "/api/student/stats" and etag:
+            request_headers["If-None-Match"] = etag
+        if method == "POST":
+            score += 1
+            body = json.dumps({"session_id": session_id, "score": score, "time_spent": score,
+                               "completed": False, "game_state": {"step": score}}).encode()
+
+        started = time.perf_counter()
+        try:
+            status, response_headers, _ = await connection.request(method, path.format(game=game), request_headers,
+                                                                   body)
+        except (OSError, asyncio.IncompleteReadError, ValueError):
+            status, response_headers = 599, {}
+            connection = HttpConnection(port)
+        finished = time.perf_counter()
+
+        if path == "/api/student/stats" and "etag" in response_headers:
+            etag = response_headers["etag"]
+        if started >= measure_from:
+            results["latencies"].append(finished - started)
+            if status >= 500:
+                results["errors"] += 1
+
+
+async def wait_until_up(port: int, timeout: float = 60):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            status, _, _ = await HttpConnection(port).request("GET", "/api/metrics/db-pool", {})
+            if status == 200:
+                return
+        except OSError:
+            pass
+        await asyncio.sleep(0.2)
+    raise RuntimeError(f"server on port {port} did not start")
+
+
+async def load(port: int, students: int, duration: float, warmup: float) -> dict:
+    await wait_until_up(port)
+    results = {"latencies": [], "errors": 0}
+    now = time.perf_counter()
+    measure_from = now + warmup
+    deadline = measure_from + duration
+    await asyncio.gather(*(student(index, port, deadline, measure_from, results) for index in range(students)))
+
+    latencies = sorted(results["latencies"])
+    if not latencies:
+        return {"requests": 0, "rps": 0.0, "p50_ms": 0.0, "p99_ms": 0.0, "errors": results["errors"]}
+    return {
+        "requests": len(latencies),
+        "rps": len(latencies) / duration,
+        "p50_ms": statistics.median(latencies) * 1000,
+        "p99_ms": latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] * 1000,
+        "errors": results["errors"]
+    }
+
+
+def run_app(app_name: str, port: int, args) -> dict:
+    command = [sys.executable, os.path.abspath(__file__), "--serve", app_name, "--port", str(port),
+               "--rtt", str(args.rtt)] + (["--mysql"] if args.mysql else [])
+    env = dict(os.environ)
+    if args.mysql:
+        env.setdefault("AUTH_DEV_USER_ID", "1")
+    server = subprocess.Popen(command, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        return asyncio.run(load(port, args.students, args.duration, args.warmup))
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--students", type=int, default=500, help="concurrent simulated students")
+    parser.add_argument("--duration", type=float, default=15, help="measured seconds per app")
+    parser.add_argument("--warmup", type=float, default=5, help="unmeasured seconds before measuring")
+    parser.add_argument("--rtt", type=float, default=0.01, help="stand-in round-trip time in seconds")
+    parser.add_argument("--mysql", action="store_true", help="use the real database from .env")
+    parser.add_argument("--apps", default="flask,asgi", help="comma-separated subset of flask,asgi")
+    parser.add_argument("--serve", choices=("flask", "asgi"), help=argparse.SUPPRESS)
+    parser.add_argument("--port", type=int, default=8101, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve:
+        if not args.mysql:
+            install_stand_in(args.rtt)
+        serve(args.serve, args.port)
+        return
+
+    backend = "MySQL from .env" if args.mysql else f"stand-in MySQL, {args.rtt * 1000:.0f}ms RTT"
+    print(f"🧪 {args.students} concurrent students, {args.duration:.0f}s measured per app, {backend}")
+    print("=" * 72)
+    print(f"{'app':<8}{'requests':>10}{'req/s':>10}{'p50 ms':>10}{'p99 ms':>10}{'5xx':>8}")
+    for offset, app_name in enumerate(args.apps.split(",")):
+        result = run_app(app_name, args.port + offset, args)
+        print(f"{app_name:<8}{result['requests']:>10}{result['rps']:>10.1f}{result['p50_ms']:>10.1f}"
+              f"{result['p99_ms']:>10.1f}{result['errors']:>8}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Benchmark concurrent /generate/questions throughput against a stubbed Gemini model.
+
+Compares the old behaviour (synchronous generate_content on the event loop)
+with the async API and the bounded executor. Requires httpx.
+
+Usage: python bench_gemini_concurrency.py [--requests 40] [--latency 0.5]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+# The stub never talks to Gemini, and distinct topics must not be served from cache
+os.environ.setdefault("GEMINI_API_KEY", "benchmark-key-not-used-by-stub")
+os.environ["QUESTION_CACHE_ENABLED"] = "false"
+
+import httpx
+
+from main import app
+from gemini_service import gemini_service
+
+SAMPLE_QUESTION = {
+    "type": "multiple-choice",
+    "question": {"en": "Which temple is known as the Black Pagoda?", "od": "-", "hi": "-"},
+    "options": {"en": ["Konark", "Puri", "Lingaraj", "Mukteswar"], "od": ["-"] * 4, "hi": ["-"] * 4},
+    "correctAnswer": 0,
+    "explanation": {"en": "Konark Sun Temple", "od": "-", "hi": "-"},
+    "difficulty": "easy",
+    "topic": "Light and Its Properties",
+    "grade": 8,
+    "subject": "science"
+}
+
+
+class _StubResponse:
+    def __init__(self, text: str):
+        self.text = text
+
+
+class StubModel:
+    """Stands in for genai.GenerativeModel with a fixed upstream latency"""
+
+    def __init__(self, latency: float):
+        self.latency = latency
+        self.payload = json.dumps({"questions": [SAMPLE_QUESTION]})
+
+    def generate_content(self, prompt):
+        time.sleep(self.latency)
+        return _StubResponse(self.payload)
+
+    async def generate_content_async(self, prompt):
+        await asyncio.sleep(self.latency)
+        return _StubResponse(self.payload)
+
+
+async def _blocking_generate(prompt: str):
+    """The pre-change behaviour: a synchronous call made directly on the event loop"""
+    return gemini_service.model.generate_content(prompt)
+
+
+async def run_mode(name: str, total: int) -> float:
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        async def one(i: int):
+            response = await client.post("/generate/questions", json={
+                "subject": "science",
+                "grade": 8,
+                "topic": f"Light {i}",
+                "count": 1,
+                "difficulty": "easy"
+            })
+            response.raise_for_status()
+
+        started = time.perf_counter()
+        await asyncio.gather(*(one(i) for i in range(total)))
+        elapsed = time.perf_counter() - started
+
+    print(f"{name:<22} {total} requests in {elapsed:6.2f}s -> {total / elapsed:7.1f} req/s")
+    return elapsed
+
+
+async def run_all(total: int):
+    original_generate = gemini_service._generate
+
+    gemini_service._generate = _blocking_generate
+    await run_mode("blocking (before)", total)
+
+    gemini_service._generate = original_generate
+    gemini_service.use_async_api = True
+    await run_mode("async API", total)
+
+    gemini_service.use_async_api = False
+    await run_mode("bounded executor", total)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=40, help="concurrent /generate/questions calls")
+    parser.add_argument("--latency", type=float, default=0.5, help="stubbed Gemini latency in seconds")
+    args = parser.parse_args()
+
+    gemini_service.model = StubModel(args.latency)
+
+    print(f"🧪 {args.requests} concurrent requests, {args.latency}s stub latency, "
+          f"max_concurrency={gemini_service.max_concurrency}")
+    print("=" * 60)
+    asyncio.run(run_all(args.requests))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Benchmark: text protocol vs server-side prepared statements for the hot queries
+in config.PREPARED_QUERIES.
+
+Runs every query N times on one pooled connection, first through a regular
+dictionary cursor (client-side interpolation) and then through the
+connection's cached prepared cursor, and reports wall-clock latency
+percentiles and client CPU per query. Needs the database from .env.
+
+Usage: python bench_prepared_statements.py [--iterations 500] [--user-id 1] [--game-id <id>]
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from config import PREPARED_QUERIES, execute_query, get_db_connection
+
+BENCH_QUERIES = ("game_stats_by_user", "game_by_id", "user_by_id")
+
+
+def run(cursor_for, query: str, params, iterations: int):
+    latencies = []
+    cpu_started = time.process_time()
+    for _ in range(iterations):
+        started = time.perf_counter()
+        cursor = cursor_for()
+        cursor.execute(query, params)
+        cursor.fetchall()
+        latencies.append(time.perf_counter() - started)
+    cpu = time.process_time() - cpu_started
+    latencies.sort()
+    return {
+        "p50_ms": statistics.median(latencies) * 1000,
+        "p95_ms": latencies[int(len(latencies) * 0.95) - 1] * 1000,
+        "cpu_us": cpu / iterations * 1_000_000
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=500)
+    parser.add_argument("--user-id", type=int, default=None, help="defaults to the first user")
+    parser.add_argument("--game-id", default=None, help="defaults to the first game")
+    args = parser.parse_args()
+
+    user_id = args.user_id
+    if user_id is None:
+        rows = execute_query("SELECT id FROM users ORDER BY id LIMIT 1", fetch=True)
+        if rows is None:
+            sys.exit("❌ Database unavailable; this benchmark needs the MySQL server from .env")
+        user_id = rows[0]["id"] if rows else 1
+    game_id = args.game_id
+    if game_id is None:
+        rows = execute_query("SELECT id FROM games ORDER BY id LIMIT 1", fetch=True) or [{"id": ""}]
+        game_id = rows[0]["id"]
+
+    params = {
+        "game_stats_by_user": (user_id,),
+        "game_by_id": (game_id,),
+        "user_by_id": (user_id,)
+    }
+
+    connection = get_db_connection()
+    if connection is None:
+        sys.exit("❌ Database unavailable; this benchmark needs the MySQL server from .env")
+
+    print(f"🧪 {args.iterations} executions per query and protocol, user_id={user_id}, game_id={game_id}")
+    print("=" * 86)
+    print(f"{'query':<22}{'protocol':<10}{'p50 ms':>10}{'p95 ms':>10}{'client CPU µs':>16}")
+    try:
+        for name in BENCH_QUERIES:
+            query = PREPARED_QUERIES[name]
+            text_cursor = connection.cursor(dictionary=True)
+            text = run(lambda: text_cursor, query, params[name], args.iterations)
+            text_cursor.close()
+            prepared = run(lambda: connection.prepared_cursor(name), query, params[name], args.iterations)
+
+            for protocol, result in (("text", text), ("prepared", prepared)):
+                print(f"{name:<22}{protocol:<10}{result['p50_ms']:>10.3f}{result['p95_ms']:>10.3f}"
+                      f"{result['cpu_us']:>16.1f}")
+    finally:
+        connection.close()
+
+
+if __name__ == "__main__":
+    main()
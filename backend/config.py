@@ -1,7 +1,12 @@
 import os
+import re
+import time
+from contextlib import contextmanager
 from dotenv import load_dotenv
 import mysql.connector
-from mysql.connector import pooling
+
+from db_pool import ConnectionPool
+from query_metrics import InstrumentedCursor, QueryMetrics
 
 # Load environment variables
 load_dotenv()
@@ -27,31 +32,57 @@ DATABASE_CONFIG = {
 # Connection Pool Configuration
 POOL_CONFIG = {
     'pool_name': 'shiksha_pool',
-    'pool_size': 10,
-    'pool_reset_session': True,
-    **DATABASE_CONFIG
+    'min_size': int(os.getenv('DATABASE_POOL_MIN_SIZE', 2)),
+    'pool_size': int(os.getenv('DATABASE_POOL_SIZE', 10)),
+    'max_overflow': int(os.getenv('DATABASE_POOL_MAX_OVERFLOW', 5)),  # extra short-lived connections under bursts
+    'acquire_timeout': float(os.getenv('DATABASE_POOL_TIMEOUT', 5)),  # seconds to wait for a free connection
+    'pre_ping_after': float(os.getenv('DATABASE_POOL_PRE_PING_AFTER', 30)),  # ping connections idle this long
+    'retry_initial': float(os.getenv('DATABASE_POOL_RETRY_INITIAL_SECONDS', 0.5)),  # fail-fast window after one failed connect
+    'retry_after': float(os.getenv('DATABASE_POOL_RETRY_SECONDS', 30))  # cap on the window, which doubles per consecutive failure
+}
+
+# Query instrumentation: per-fingerprint latency histograms and a slow-query log
+QUERY_METRICS_CONFIG = {
+    'enabled': os.getenv('QUERY_METRICS_ENABLED', 'True').lower() == 'true',
+    'slow_query_ms': float(os.getenv('SLOW_QUERY_MS', 200)),  # log statements slower than this with their call site
+    'slow_log_size': int(os.getenv('SLOW_QUERY_LOG_SIZE', 100)),  # recent slow queries kept for /metrics
+    'max_fingerprints': int(os.getenv('QUERY_METRICS_MAX_FINGERPRINTS', 500))
 }
 
-# Initialize connection pool
-try:
-    connection_pool = mysql.connector.pooling.MySQLConnectionPool(**POOL_CONFIG)
-    print("✅ MySQL connection pool initialized successfully")
-except mysql.connector.Error as err:
-    print(f"❌ Error creating connection pool: {err}")
-    connection_pool = None
+query_metrics = QueryMetrics(QUERY_METRICS_CONFIG)
+
+# The pool opens connections on first use so importing config never touches the network.
+# Servers call warm_up_pool() at startup to pay the TLS handshakes up front.
+connection_pool = ConnectionPool(DATABASE_CONFIG, POOL_CONFIG)
+
+def get_connection_pool() -> ConnectionPool:
+    """Return the shared connection pool"""
+    return connection_pool
+
+def warm_up_pool() -> bool:
+    """Open the pool's minimum connections now instead of on the first queries"""
+    try:
+        opened = connection_pool.warm_up()
+        print(f"✅ MySQL connection pool ready ({opened} connections opened)")
+        return True
+    except mysql.connector.Error as err:
+        print(f"❌ Error warming up connection pool: {err}")
+        return False
+
+def get_query_metrics() -> QueryMetrics:
+    """Return the shared query instrumentation"""
+    return query_metrics
 
 def get_db_connection():
-    """Get a database connection from the pool"""
+    """Get a database connection from the pool, waiting up to acquire_timeout if all are busy"""
+    started = time.perf_counter()
     try:
-        if connection_pool:
-            connection = connection_pool.get_connection()
-            return connection
-        else:
-            # Fallback to direct connection if pool failed
-            return mysql.connector.connect(**DATABASE_CONFIG)
+        return connection_pool.acquire()
     except mysql.connector.Error as err:
         print(f"❌ Error getting database connection: {err}")
         return None
+    finally:
+        query_metrics.record_pool_wait(time.perf_counter() - started)
 
 def execute_query(query, params=None, fetch=False):
     """Execute a database query with proper connection handling"""
@@ -63,16 +94,22 @@ def execute_query(query, params=None, fetch=False):
             return None
             
         cursor = connection.cursor(dictionary=True)
-        cursor.execute(query, params or ())
-        
-        if fetch:
-            if query.strip().upper().startswith('SELECT'):
-                return cursor.fetchall()
+        with query_metrics.timed(query) as timing:
+            cursor.execute(query, params or ())
+
+            if fetch:
+                if query.strip().upper().startswith('SELECT'):
+                    rows = cursor.fetchall()
+                    timing["rows"] = len(rows)
+                    return rows
+                else:
+                    row = cursor.fetchone()
+                    timing["rows"] = 1 if row else 0
+                    return row
             else:
-                return cursor.fetchone()
-        else:
-            connection.commit()
-            return cursor.rowcount
+                connection.commit()
+                timing["rows"] = cursor.rowcount
+                return cursor.rowcount
             
     except mysql.connector.Error as err:
         print(f"❌ Database query error: {err}")
@@ -85,12 +122,295 @@ def execute_query(query, params=None, fetch=False):
         if connection:
             connection.close()
 
+# Hot queries executed by name via execute_prepared(). They run on the text protocol
+# unless PREPARED_STATEMENTS_ENABLED is set: the pure-Python connector sends
+# COM_STMT_RESET before every prepared execute, so a prepared statement costs two
+# round trips (three on first use) against one for the text protocol. Enable it
+# only where bench_prepared_statements.py shows a win against the real server.
+PREPARED_STATEMENTS_ENABLED = os.getenv('PREPARED_STATEMENTS_ENABLED', 'False').lower() == 'true'
+
+PREPARED_QUERIES = {
+    "user_by_id": "SELECT * FROM users WHERE id = %s",
+    "game_by_id": "SELECT * FROM games WHERE id = %s",
+    "game_stats_by_user": "SELECT * FROM game_stats WHERE user_id = %s",
+    "unlock_stats_by_user": "SELECT level, games_completed FROM game_stats WHERE user_id = %s",
+    "mastery_by_user": "SELECT subject, mastery_percentage FROM subject_mastery WHERE user_id = %s",
+    "session_for_user": "SELECT id FROM game_sessions WHERE id = %s AND user_id = %s",
+    "session_user_by_token": """SELECT u.*, s.expires_at AS session_expires_at
+                                FROM sessions s
+                                JOIN users u ON u.id = s.user_id
+                                WHERE s.token = %s AND s.expires_at > NOW()"""
+}
+
+def execute_prepared(name, params=None, fetch=False):
+    """Execute a named query from PREPARED_QUERIES; same results as execute_query"""
+    query = PREPARED_QUERIES[name]
+    if not PREPARED_STATEMENTS_ENABLED:
+        return execute_query(query, params, fetch=fetch)
+
+    connection = None
+    cursor = None
+    try:
+        connection = get_db_connection()
+        if not connection:
+            return None
+
+        cursor = connection.prepared_cursor(name)
+        with query_metrics.timed(query) as timing:
+            cursor.execute(query, params or ())
+            rows = cursor.fetchall() if cursor.with_rows else None
+            timing["rows"] = len(rows) if rows is not None else cursor.rowcount
+
+        if fetch:
+            return rows if rows is not None else []
+        connection.commit()
+        return cursor.rowcount
+
+    except mysql.connector.Error as err:
+        print(f"❌ Database query error ({name}): {err}")
+        if connection:
+            connection.discard_prepared(name)
+            connection.rollback()
+        return None
+    finally:
+        if connection:
+            connection.close()
+
+@contextmanager
+def db_transaction():
+    """Run several statements on one pooled connection as a single transaction.
+
+    Yields a dictionary cursor whose statements are recorded in query_metrics;
+    commits when the block exits cleanly and rolls back if it raises.
+    """
+    connection = get_db_connection()
+    if not connection:
+        raise mysql.connector.Error("No database connection available")
+
+    cursor = None
+    try:
+        connection.start_transaction()
+        cursor = connection.cursor(dictionary=True)
+        yield InstrumentedCursor(cursor, query_metrics)
+        connection.commit()
+    except BaseException:
+        connection.rollback()
+        raise
+    finally:
+        if cursor:
+            cursor.close()
+        connection.close()
+
+# Bulk writes: multi-row statements are kept under this fraction of max_allowed_packet
+BULK_CONFIG = {
+    "max_rows_per_statement": int(os.getenv('BULK_MAX_ROWS', 1000)),
+    "packet_fraction": 0.75,
+    "default_max_allowed_packet": 4 * 1024 * 1024  # used when the server value cannot be read
+}
+
+_INSERT_TEMPLATE = re.compile(
+    r"^(?P<head>\s*(?:INSERT|REPLACE)\b.*?\bVALUES\s*)"
+    r"(?P<row>\((?:[^()]|\([^()]*\))*\))"
+    r"(?P<tail>\s*(?:ON\s+DUPLICATE\s+KEY\s+UPDATE\b.*)?)$",
+    re.IGNORECASE | re.DOTALL
+)
+_max_allowed_packet = None
+
+def _get_max_allowed_packet(cursor) -> int:
+    global _max_allowed_packet
+    if _max_allowed_packet is None:
+        try:
+            cursor.execute("SELECT @@max_allowed_packet AS max_allowed_packet")
+            row = cursor.fetchone()
+            _max_allowed_packet = int(row["max_allowed_packet"] if isinstance(row, dict) else row[0])
+        except mysql.connector.Error:
+            return BULK_CONFIG["default_max_allowed_packet"]
+    return _max_allowed_packet
+
+def _estimate_row_bytes(row) -> int:
+    """Upper bound on the bytes a parameter tuple adds once escaped into SQL"""
+    size = 4
+    for value in row:
+        if value is None:
+            size += 5
+        elif isinstance(value, (bytes, bytearray)):
+            size += 2 * len(value) + 4
+        elif isinstance(value, str):
+            size += 2 * len(value.encode('utf-8')) + 4
+        else:
+            size += len(str(value)) + 4
+    return size
+
+def _chunk_rows(rows, base_bytes: int, max_bytes: int):
+    chunk, chunk_bytes = [], base_bytes
+    for row in rows:
+        row_bytes = _estimate_row_bytes(row)
+        if chunk and (len(chunk) >= BULK_CONFIG["max_rows_per_statement"] or chunk_bytes + row_bytes > max_bytes):
+            yield chunk
+            chunk, chunk_bytes = [], base_bytes
+        chunk.append(row)
+        chunk_bytes += row_bytes
+    if chunk:
+        yield chunk
+
+def _execute_chunks(cursor, query, rows):
+    match = _INSERT_TEMPLATE.match(query)
+    max_bytes = int(_get_max_allowed_packet(cursor) * BULK_CONFIG["packet_fraction"])
+    counts = []
+    for chunk in _chunk_rows(rows, len(query.encode('utf-8')), max_bytes):
+        if match:
+            statement = match.group('head') + ", ".join([match.group('row')] * len(chunk)) + match.group('tail')
+            cursor.execute(statement, [value for row in chunk for value in row])
+        else:
+            # UPDATE/DELETE templates: one statement per row, but on one connection
+            cursor.executemany(query, chunk)
+        counts.append(cursor.rowcount)
+    return counts
+
+def execute_many(query, rows, transaction=False, cursor=None):
+    """Run one statement template for many parameter tuples.
+
+    INSERT/REPLACE ... VALUES templates are sent as multi-row statements sized
+    under max_allowed_packet. Returns the affected-row count of each chunk, or
+    None on error. With transaction=True all chunks commit or roll back
+    together; pass the cursor from db_transaction() to join an open transaction.
+    """
+    if cursor is not None:
+        return _execute_chunks(cursor, query, rows)
+
+    try:
+        with (db_transaction() if transaction else _autocommit_cursor()) as bulk_cursor:
+            return _execute_chunks(bulk_cursor, query, rows)
+    except mysql.connector.Error as err:
+        print(f"❌ Bulk query error: {err}")
+        return None
+
+@contextmanager
+def _autocommit_cursor():
+    connection = get_db_connection()
+    if not connection:
+        raise mysql.connector.Error("No database connection available")
+    cursor = connection.cursor(dictionary=True)
+    try:
+        yield InstrumentedCursor(cursor, query_metrics)
+    finally:
+        cursor.close()
+        connection.close()
+
+# Async access layer: blocking driver calls run on a dedicated thread pool sized to the connection pool,
+# overflow included, so bursts can use every connection the pool will hand out
+ASYNC_DB_CONFIG = {
+    "max_workers": int(os.getenv('ASYNC_DB_MAX_WORKERS', POOL_CONFIG['pool_size'] + POOL_CONFIG['max_overflow'])),
+    "thread_name_prefix": "mysql"
+}
+
 # API Configuration
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
 if not GEMINI_API_KEY:
     print("Warning: GEMINI_API_KEY not found in environment variables")
     print("Please set your Gemini API key in the .env file")
 
+# Gemini call limits: at most max_concurrency generations in flight per worker
+GEMINI_CONFIG = {
+    "model_name": os.getenv('GEMINI_MODEL', 'gemini-pro'),
+    "max_concurrency": int(os.getenv('GEMINI_MAX_CONCURRENCY', 8)),
+    "request_timeout": float(os.getenv('GEMINI_REQUEST_TIMEOUT', 60)),
+    "use_async_api": os.getenv('GEMINI_USE_ASYNC_API', 'True').lower() == 'true'
+}
+
+# Batch generation: items run concurrently and the batch returns whatever finished by the deadline
+BATCH_CONFIG = {
+    "max_parallel": int(os.getenv('BATCH_MAX_PARALLEL', 4)),
+    "deadline_seconds": float(os.getenv('BATCH_DEADLINE_SECONDS', 25)),
+    "max_deadline_seconds": float(os.getenv('BATCH_MAX_DEADLINE_SECONDS', 55))
+}
+
+# Question cache: memory tier is an LRU with TTL, persistent tier reuses curriculum_cache
+QUESTION_CACHE_CONFIG = {
+    "enabled": os.getenv('QUESTION_CACHE_ENABLED', 'True').lower() == 'true',
+    "max_entries": int(os.getenv('QUESTION_CACHE_MAX_ENTRIES', 512)),
+    "ttl_seconds": int(os.getenv('QUESTION_CACHE_TTL', 900)),
+    "persistent_enabled": os.getenv('QUESTION_CACHE_PERSISTENT', 'True').lower() == 'true',
+    "persistent_ttl_seconds": int(os.getenv('QUESTION_CACHE_PERSISTENT_TTL', 86400)),
+    "version": "questions-v1"
+}
+
+# Question bank: per-(grade, subject, topic, difficulty) pools topped up by a background worker
+QUESTION_BANK_CONFIG = {
+    "enabled": os.getenv('QUESTION_BANK_ENABLED', 'True').lower() == 'true',
+    # Pools live in memory only, so prefilling all ~690 curriculum pools repeats the Gemini calls on every restart
+    "prefill_curriculum": os.getenv('QUESTION_BANK_PREFILL', 'False').lower() == 'true',
+    "difficulties": ["easy", "medium", "hard"],
+    "low_water_mark": int(os.getenv('QUESTION_BANK_LOW_WATER', 10)),
+    "max_pool_size": int(os.getenv('QUESTION_BANK_MAX_POOL', 40)),
+    "refill_batch_size": int(os.getenv('QUESTION_BANK_REFILL_BATCH', 10)),
+    "refill_interval_seconds": float(os.getenv('QUESTION_BANK_REFILL_INTERVAL', 30)),
+    "max_refills_per_cycle": int(os.getenv('QUESTION_BANK_REFILLS_PER_CYCLE', 4))
+}
+
+# Health checks: deep checks run in the background, probes only read the cached result
+HEALTH_CONFIG = {
+    "check_interval_seconds": float(os.getenv('HEALTH_CHECK_INTERVAL', 30)),
+    "check_timeout_seconds": float(os.getenv('HEALTH_CHECK_TIMEOUT', 10)),
+    "stale_after_seconds": float(os.getenv('HEALTH_STALE_AFTER', 120))
+}
+
+# Analytics events are buffered in-process and written with multi-row inserts
+ANALYTICS_BUFFER_CONFIG = {
+    "enabled": os.getenv('ANALYTICS_BUFFER_ENABLED', 'True').lower() == 'true',
+    "max_queue_size": int(os.getenv('ANALYTICS_MAX_QUEUE', 10000)),
+    "batch_size": int(os.getenv('ANALYTICS_BATCH_SIZE', 200)),
+    "flush_interval_seconds": float(os.getenv('ANALYTICS_FLUSH_INTERVAL', 2)),
+    "max_backoff_seconds": float(os.getenv('ANALYTICS_MAX_BACKOFF', 60)),  # retry delay cap while flushes fail
+    "overflow_policy": os.getenv('ANALYTICS_OVERFLOW_POLICY', 'drop_oldest'),  # drop_oldest, drop_newest or block
+    "block_timeout_seconds": float(os.getenv('ANALYTICS_BLOCK_TIMEOUT', 0.05))
+}
+
+# In-progress game state is kept per session and written behind in batched updates
+SESSION_STORE_CONFIG = {
+    "enabled": os.getenv('SESSION_STORE_ENABLED', 'True').lower() == 'true',
+    "flush_interval_seconds": float(os.getenv('SESSION_FLUSH_INTERVAL', 5)),
+    "max_batch_rows": int(os.getenv('SESSION_FLUSH_BATCH_ROWS', 200)),
+    "max_batch_bytes": int(os.getenv('SESSION_FLUSH_BATCH_BYTES', 1024 * 1024)),  # game_state JSON per statement
+    "max_sessions": int(os.getenv('SESSION_STORE_MAX_SESSIONS', 50000)),  # beyond this, saves are written directly
+    "idle_ttl_seconds": float(os.getenv('SESSION_IDLE_TTL', 1800))  # forget clean sessions idle this long
+}
+
+# Progress history: keyset-paginated reads; final game states are stored compressed
+PROGRESS_HISTORY_CONFIG = {
+    "page_size": int(os.getenv('PROGRESS_PAGE_SIZE', 20)),
+    "max_page_size": int(os.getenv('PROGRESS_MAX_PAGE_SIZE', 100)),
+    "state_compression_level": int(os.getenv('PROGRESS_STATE_COMPRESSION_LEVEL', 6))  # zlib 1-9
+}
+
+# Achievement definitions are compiled once and recompiled after this many seconds
+ACHIEVEMENT_CONFIG = {
+    "definitions_ttl_seconds": float(os.getenv('ACHIEVEMENT_DEFINITIONS_TTL', 300))
+}
+
+# Game catalog: the games table is held in memory and reloaded when MAX(updated_at) or COUNT(*) changes
+GAME_CATALOG_CONFIG = {
+    "poll_interval_seconds": float(os.getenv('GAME_CATALOG_POLL_INTERVAL', 30))
+}
+
+# Per-user dashboard snapshots; the TTL bounds staleness from writes made by other processes
+STATS_CACHE_CONFIG = {
+    "enabled": os.getenv('STATS_CACHE_ENABLED', 'True').lower() == 'true',
+    "max_entries": int(os.getenv('STATS_CACHE_MAX_ENTRIES', 5000)),
+    "ttl_seconds": float(os.getenv('STATS_CACHE_TTL', 300))
+}
+
+# Authentication: JWT signatures are checked locally, user rows are cached per token.
+# Revoked sessions stop working immediately in this process and within cache_ttl_seconds elsewhere.
+AUTH_CONFIG = {
+    "jwt_secret": os.getenv('AUTH_JWT_SECRET'),  # HS256 signing key; opaque session tokens work without it
+    "jwt_leeway_seconds": int(os.getenv('AUTH_JWT_LEEWAY', 30)),
+    "require_session": os.getenv('AUTH_REQUIRE_SESSION', 'True').lower() == 'true',  # JWT sid must be a live session
+    "cache_max_entries": int(os.getenv('AUTH_CACHE_MAX_ENTRIES', 10000)),
+    "cache_ttl_seconds": float(os.getenv('AUTH_CACHE_TTL', 60)),
+    "dev_user_id": int(os.getenv('AUTH_DEV_USER_ID')) if os.getenv('AUTH_DEV_USER_ID') else None
+}
+
 # Server Configuration
 HOST = "127.0.0.1"
 PORT = 8000
@@ -344,5 +664,6 @@ LEADERBOARD_CONFIG = {
         "quiz_master": 900  # 15 minutes
     },
     "max_entries": 100,
-    "anonymize_after": 10  # Show only top 10, rest anonymous
+    "anonymize_after": 10,  # Show only top 10, rest anonymous
+    "materialize_interval": int(os.getenv('LEADERBOARD_MATERIALIZE_INTERVAL', 60))  # seconds between game_leaderboards writes
 }
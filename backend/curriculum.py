@@ -1,6 +1,14 @@
 # Odisha Government Curriculum Structure
 # Based on official Odisha State Board syllabus for different grades
 
+import difflib
+import math
+import os
+import re
+from collections import namedtuple
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+
 ODISHA_CURRICULUM = {
     8: {
         "science": [
@@ -374,3 +382,155 @@ def get_all_subjects() -> list:
     for grade_data in ODISHA_CURRICULUM.values():
         subjects.update(grade_data.keys())
     return list(subjects)
+
+
+# ==================== TOPIC RESOLUTION ====================
+# A token index over every curriculum topic, built once at import time. Free-text
+# topics from requests ("Light", "quadratc equations") are matched against the
+# topics of the requested grade and subject with IDF-weighted token overlap,
+# prefix matching and typo-tolerant fuzzy matching. Query tokens no topic word
+# explains count against the score, so loose look-alikes fall back to the
+# requested topic instead of resolving to an unrelated one.
+
+TopicMatch = namedtuple("TopicMatch", ["topic", "score", "grade", "subject"])
+
+_STOPWORDS = {"a", "an", "and", "around", "for", "in", "is", "its", "of", "our",
+              "the", "their", "to", "us", "with"}
+
+def _stem(token: str) -> str:
+    if len(token) > 4 and token.endswith("ies"):
+        return token[:-3] + "y"
+    if len(token) > 3 and token.endswith("s") and not token.endswith("ss"):
+        return token[:-1]
+    return token
+
+def normalize_topic(text: str) -> Tuple[str, ...]:
+    """Lowercase, strip punctuation and stopwords, and lightly stem a topic string"""
+    words = re.findall(r"[a-z0-9]+", text.lower())
+    return tuple(_stem(word) for word in words if word not in _STOPWORDS)
+
+def _build_topic_index():
+    entries = []
+    scopes: Dict[Tuple[int, str], List[int]] = {}
+    postings: Dict[str, set] = {}
+
+    for grade, subjects in ODISHA_CURRICULUM.items():
+        for subject, topics in subjects.items():
+            for topic in topics:
+                tokens = normalize_topic(topic)
+                index = len(entries)
+                entries.append((grade, subject, topic, tokens))
+                scopes.setdefault((grade, subject), []).append(index)
+                for token in set(tokens):
+                    postings.setdefault(token, set()).add(index)
+
+    total = len(entries)
+    idf = {token: math.log(1 + total / len(ids)) for token, ids in postings.items()}
+    return entries, scopes, postings, idf
+
+_TOPIC_ENTRIES, _TOPIC_SCOPES, _TOKEN_POSTINGS, _TOKEN_IDF = _build_topic_index()
+_DEFAULT_IDF = max(_TOKEN_IDF.values())
+
+# Exact and prefix hits are "strong"; typo and shared-stem hits only count towards the
+# score, so a topic needs strong hits on at least half of the query's tokens to match.
+_STRONG_WEIGHT = 0.85
+
+def _expand_token(token: str, vocabulary: List[str]) -> Dict[str, float]:
+    """Tokens of the searched topics a query token may refer to, with a confidence weight"""
+    if token in vocabulary:
+        return {token: 1.0}
+
+    expansions = {}
+    if len(token) >= 3:
+        for candidate in vocabulary:
+            if candidate.startswith(token):
+                expansions[candidate] = _STRONG_WEIGHT
+    if not expansions and len(token) >= 5:
+        # Shared stems such as gravity/gravitation or integration/integral
+        for candidate in vocabulary:
+            if len(os.path.commonprefix([token, candidate])) >= 5:
+                expansions[candidate] = 0.7
+    if not expansions:
+        # Typos keep the first letter and roughly the length of the word
+        for candidate in difflib.get_close_matches(token, vocabulary, n=3, cutoff=0.85):
+            if candidate[0] == token[0] and abs(len(candidate) - len(token)) <= 1:
+                expansions[candidate] = 0.8 * difflib.SequenceMatcher(None, token, candidate).ratio()
+    return expansions
+
+@lru_cache(maxsize=4096)
+def _rank_topics(grade: Optional[int], subject: Optional[str], query_tokens: Tuple[str, ...]) -> Tuple[TopicMatch, ...]:
+    if grade is not None and subject is not None:
+        scope = set(_TOPIC_SCOPES.get((grade, subject), ()))
+    else:
+        scope = {i for i, (g, s, _, _) in enumerate(_TOPIC_ENTRIES)
+                 if (grade is None or g == grade) and (subject is None or s == subject)}
+    if not scope:
+        return ()
+
+    vocabulary = sorted({token for index in scope for token in _TOPIC_ENTRIES[index][3]})
+    expansions = [_expand_token(token, vocabulary) for token in query_tokens]
+    query_weight = sum(
+        max((_TOKEN_IDF[t] for t in expanded), default=_DEFAULT_IDF) for expanded in expansions
+    )
+
+    candidates = set()
+    for expanded in expansions:
+        for token in expanded:
+            candidates.update(_TOKEN_POSTINGS[token] & scope)
+
+    matches = []
+    for index in candidates:
+        entry_grade, entry_subject, topic, tokens = _TOPIC_ENTRIES[index]
+        token_set = set(tokens)
+
+        matched_query = 0.0
+        matched_tokens = set()
+        matched_count = strong_count = 0
+        for expanded in expansions:
+            best = 0.0
+            best_token = None
+            for token, weight in expanded.items():
+                if token in token_set and _TOKEN_IDF[token] * weight > best:
+                    best = _TOKEN_IDF[token] * weight
+                    best_token = token
+            if best_token:
+                matched_query += best
+                matched_tokens.add(best_token)
+                matched_count += 1
+                strong_count += expanded[best_token] >= _STRONG_WEIGHT
+
+        if strong_count * 2 < len(query_tokens):
+            continue
+
+        topic_weight = sum(_TOKEN_IDF[token] for token in token_set)
+        query_coverage = matched_query / query_weight if query_weight else 0.0
+        topic_coverage = sum(_TOKEN_IDF[t] for t in matched_tokens) / topic_weight if topic_weight else 0.0
+
+        if tokens == query_tokens:
+            score = 1.0
+        else:
+            # Query tokens that matched nothing in the topic scale the score down
+            score = (0.7 * query_coverage + 0.3 * topic_coverage) * matched_count / len(query_tokens)
+        matches.append(TopicMatch(topic, round(score, 4), entry_grade, entry_subject))
+
+    matches.sort(key=lambda match: (-match.score, match.grade, match.subject, match.topic))
+    return tuple(matches)
+
+def resolve_topic(grade: Optional[int], subject: Optional[str], query: str,
+                  min_score: float = 0.5) -> Optional[TopicMatch]:
+    """Return the best-matching curriculum topic for a free-text query, or None
+    
+    The search is limited to the given grade and subject; pass None for either to
+    search across all grades or subjects.
+    """
+    matches = rank_topics(grade, subject, query, limit=1)
+    if matches and matches[0].score >= min_score:
+        return matches[0]
+    return None
+
+def rank_topics(grade: Optional[int], subject: Optional[str], query: str, limit: int = 5) -> List[TopicMatch]:
+    """Return up to `limit` curriculum topics ranked by how well they match the query"""
+    query_tokens = normalize_topic(query)
+    if not query_tokens:
+        return []
+    return list(_rank_topics(grade, subject, query_tokens)[:limit])
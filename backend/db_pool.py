@@ -0,0 +1,311 @@
+# MySQL connection pool manager
+# Keeps between min_size and pool_size persistent connections, opens up to
+# max_overflow short-lived extra connections under bursts, and makes callers wait
+# (up to acquire_timeout) instead of failing when everything is checked out.
+# Connections idle longer than pre_ping_after are pinged before reuse, and every
+# returned connection has its session reset so no state leaks between callers.
+# After a failed connect, new connects fail fast for a window that doubles with
+# each consecutive failure, from retry_initial up to retry_after.
+# Named hot queries get a server-side prepared statement per checkout; the
+# session reset on release deallocates them.
+
+import threading
+import time
+from collections import deque
+from typing import Any, Deque, Dict, Optional, Tuple
+
+import mysql.connector
+from mysql.connector import errors
+
+
+class PoolTimeoutError(errors.PoolError):
+    """No connection became available within acquire_timeout"""
+
+
+class PooledConnection:
+    """A checked-out connection; close() hands it back to the pool"""
+
+    def __init__(self, pool: "ConnectionPool", connection, overflow: bool):
+        self._pool = pool
+        self._connection = connection
+        self._overflow = overflow
+
+    def __getattr__(self, name):
+        connection = self.__dict__.get("_connection")
+        if connection is None:
+            raise errors.OperationalError("Connection already returned to the pool")
+        return getattr(connection, name)
+
+    def prepared_cursor(self, name: str):
+        """This connection's prepared cursor for a named query, created on first use"""
+        return self._pool.prepared_cursor(self._connection, name)
+
+    def discard_prepared(self, name: str):
+        """Drop a prepared cursor left in an unknown state, e.g. after an error"""
+        self._pool.discard_prepared(self._connection, name)
+
+    def close(self):
+        connection, self._connection = self._connection, None
+        if connection is not None:
+            self._pool.release(connection, self._overflow)
+
+
+class ConnectionPool:
+    def __init__(self, connect_config: Dict[str, Any], pool_config: Dict[str, Any]):
+        self.connect_config = connect_config
+        self.name = pool_config["pool_name"]
+        self.min_size = pool_config["min_size"]
+        self.max_size = pool_config["pool_size"]
+        self.max_overflow = pool_config["max_overflow"]
+        self.acquire_timeout = pool_config["acquire_timeout"]
+        self.pre_ping_after = pool_config["pre_ping_after"]
+        self.retry_initial = pool_config["retry_initial"]
+        self.retry_after = pool_config["retry_after"]
+
+        self._idle: Deque[Tuple[Any, float]] = deque()  # (connection, returned_at)
+        self._size = 0          # persistent connections open or being opened
+        self._overflow = 0      # overflow connections open or being opened
+        self._in_use = 0
+        self._connect_failed_at: Optional[float] = None
+        self._consecutive_failures = 0
+        self._lock = threading.Lock()
+        self._available = threading.Condition(self._lock)
+
+        self._statements: Dict[int, Dict[str, Any]] = {}  # id(connection) -> name -> prepared cursor
+        self._wait_samples: Deque[float] = deque(maxlen=1000)
+        self._counters = {
+            "checkouts": 0,
+            "waits": 0,
+            "timeouts": 0,
+            "overflow_checkouts": 0,
+            "connections_opened": 0,
+            "connect_failures": 0,
+            "pre_pings": 0,
+            "stale_discarded": 0,
+            "reset_failures": 0,
+            "statements_prepared": 0,
+            "statement_reuses": 0,
+            "peak_in_use": 0
+        }
+
+    # ---- connection lifecycle ----
+
+    def _connect(self):
+        """Open a raw connection; fails fast during the backoff after consecutive failures"""
+        with self._lock:
+            failed_at, failures = self._connect_failed_at, self._consecutive_failures
+        if failed_at is not None:
+            backoff = min(self.retry_after, self.retry_initial * 2 ** (failures - 1))
+            if time.monotonic() - failed_at < backoff:
+                raise errors.PoolError(f"Pool {self.name}: database unreachable, retrying later")
+        try:
+            connection = mysql.connector.connect(**self.connect_config)
+        except mysql.connector.Error:
+            with self._lock:
+                self._connect_failed_at = time.monotonic()
+                self._consecutive_failures += 1
+                self._counters["connect_failures"] += 1
+            raise
+        with self._lock:
+            self._connect_failed_at = None
+            self._consecutive_failures = 0
+            self._counters["connections_opened"] += 1
+        return connection
+
+    def _is_alive(self, connection) -> bool:
+        try:
+            connection.ping(reconnect=False)
+            return True
+        except mysql.connector.Error:
+            return False
+
+    def _discard(self, connection):
+        with self._lock:
+            self._statements.pop(id(connection), None)
+        try:
+            connection.close()
+        except mysql.connector.Error:
+            pass
+
+    def acquire(self, timeout: Optional[float] = None) -> PooledConnection:
+        """Check out a connection, waiting up to timeout (default acquire_timeout) if none is free"""
+        timeout = self.acquire_timeout if timeout is None else timeout
+        started = time.monotonic()
+        deadline = started + timeout
+        waited = False
+
+        while True:
+            with self._lock:
+                while True:
+                    if self._idle:
+                        connection, returned_at = self._idle.pop()
+                        action = "reuse"
+                        break
+                    if self._size < self.max_size:
+                        self._size += 1
+                        action = "open"
+                        break
+                    if self._overflow < self.max_overflow:
+                        self._overflow += 1
+                        action = "overflow"
+                        break
+
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self._counters["timeouts"] += 1
+                        raise PoolTimeoutError(
+                            f"Pool {self.name}: no connection available after {timeout:.1f}s "
+                            f"({self._in_use} in use, {self._overflow} overflow)"
+                        )
+                    waited = True
+                    self._available.wait(remaining)
+
+            if action == "reuse":
+                if time.monotonic() - returned_at >= self.pre_ping_after:
+                    with self._lock:
+                        self._counters["pre_pings"] += 1
+                    if not self._is_alive(connection):
+                        self._discard(connection)
+                        with self._lock:
+                            self._size -= 1
+                            self._counters["stale_discarded"] += 1
+                        continue
+                return self._checked_out(connection, False, started, waited)
+
+            try:
+                connection = self._connect()
+            except mysql.connector.Error:
+                with self._lock:
+                    if action == "open":
+                        self._size -= 1
+                    else:
+                        self._overflow -= 1
+                    self._available.notify()
+                raise
+            return self._checked_out(connection, action == "overflow", started, waited)
+
+    def _checked_out(self, connection, overflow: bool, started: float, waited: bool) -> PooledConnection:
+        with self._lock:
+            self._in_use += 1
+            self._counters["checkouts"] += 1
+            self._counters["peak_in_use"] = max(self._counters["peak_in_use"], self._in_use)
+            if overflow:
+                self._counters["overflow_checkouts"] += 1
+            if waited:
+                self._counters["waits"] += 1
+            self._wait_samples.append(time.monotonic() - started)
+        return PooledConnection(self, connection, overflow)
+
+    def release(self, connection, overflow: bool = False):
+        """Return a connection; overflow connections are closed instead of kept"""
+        keep = not overflow
+        if keep:
+            # The reset rolls back any open transaction and deallocates prepared statements
+            with self._lock:
+                self._statements.pop(id(connection), None)
+            try:
+                connection.reset_session()
+            except mysql.connector.Error:
+                keep = False
+                with self._lock:
+                    self._counters["reset_failures"] += 1
+
+        if not keep:
+            self._discard(connection)
+
+        with self._lock:
+            self._in_use -= 1
+            if overflow:
+                self._overflow -= 1
+            elif keep:
+                self._idle.append((connection, time.monotonic()))
+            else:
+                self._size -= 1
+            self._available.notify()
+
+    def prepared_cursor(self, connection, name: str):
+        with self._lock:
+            statements = self._statements.setdefault(id(connection), {})
+            cursor = statements.get(name)
+            if cursor is not None:
+                self._counters["statement_reuses"] += 1
+                return cursor
+
+        # The statement itself is prepared on the server by the cursor's first execute
+        cursor = connection.cursor(prepared=True, dictionary=True)
+        with self._lock:
+            statements[name] = cursor
+            self._counters["statements_prepared"] += 1
+        return cursor
+
+    def discard_prepared(self, connection, name: str):
+        with self._lock:
+            cursor = self._statements.get(id(connection), {}).pop(name, None)
+        if cursor is not None:
+            try:
+                cursor.close()
+            except mysql.connector.Error:
+                pass
+
+    def warm_up(self) -> int:
+        """Open connections until min_size are idle; returns how many were opened"""
+        opened = 0
+        while True:
+            with self._lock:
+                if self._size >= min(self.min_size, self.max_size):
+                    return opened
+                self._size += 1
+            try:
+                connection = self._connect()
+            except mysql.connector.Error:
+                with self._lock:
+                    self._size -= 1
+                raise
+            with self._lock:
+                self._idle.append((connection, time.monotonic()))
+                self._available.notify()
+            opened += 1
+
+    def close(self):
+        """Close every idle connection"""
+        with self._lock:
+            idle, self._idle = list(self._idle), deque()
+            self._size -= len(idle)
+        for connection, _ in idle:
+            self._discard(connection)
+
+    # ---- metrics ----
+
+    def stats(self) -> Dict[str, Any]:
+        """Checkout wait times, in-use and overflow counts for sizing the pool"""
+        with self._lock:
+            samples = sorted(self._wait_samples)
+            counters = dict(self._counters)
+            state = {
+                "prepared_statements": sum(len(statements) for statements in self._statements.values()),
+                "in_use": self._in_use,
+                "idle": len(self._idle),
+                "open": self._size + self._overflow,
+                "overflow_in_use": self._overflow
+            }
+
+        def percentile(fraction: float) -> float:
+            if not samples:
+                return 0.0
+            return round(samples[min(len(samples) - 1, int(len(samples) * fraction))] * 1000, 2)
+
+        return {
+            "pool_name": self.name,
+            "min_size": self.min_size,
+            "pool_size": self.max_size,
+            "max_overflow": self.max_overflow,
+            "acquire_timeout": self.acquire_timeout,
+            **state,
+            "wait_ms": {
+                "p50": percentile(0.5),
+                "p95": percentile(0.95),
+                "p99": percentile(0.99),
+                "max": round(samples[-1] * 1000, 2) if samples else 0.0
+            },
+            **counters
+        }
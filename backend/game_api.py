@@ -9,8 +9,18 @@ from datetime import datetime, timedelta
 import json
 import hashlib
 import uuid
+from functools import lru_cache
 from typing import Dict, List, Optional, Any
-from config import get_db_connection, execute_query, GAME_CONSTANTS, SUBJECT_CONFIG, BADGE_CONFIG
+from config import get_db_connection, execute_query, execute_prepared, warm_up_pool, get_connection_pool, get_query_metrics, db_transaction, GAME_CONSTANTS, SUBJECT_CONFIG, BADGE_CONFIG
+from query_metrics import enter_route, exit_route
+from leaderboard import leaderboard_service
+from achievements import achievement_engine, GameCompletion
+from stats_cache import stats_cache
+from analytics_buffer import analytics_buffer
+from auth import token_verifier
+from game_catalog import game_catalog
+from session_store import session_store
+from progress_history import compress_state, load_progress_page, load_progress_state
 import logging
 
 # Setup logging
@@ -20,6 +30,18 @@ logger = logging.getLogger(__name__)
 app = Flask(__name__)
 CORS(app, origins=["http://localhost:3000", "http://127.0.0.1:3000"])
 
+# Attribute every query a request issues to its route template in /api/metrics/queries
+@app.before_request
+def start_query_route():
+    route = request.url_rule.rule if request.url_rule else "unmatched"
+    g.query_route_token = enter_route(f"{request.method} {route}")
+
+@app.teardown_request
+def end_query_route(exc=None):
+    token = g.pop('query_route_token', None)
+    if token is not None:
+        exit_route(token)
+
 # Authentication decorator (using existing auth system)
 def require_auth(f):
     def decorated_function(*args, **kwargs):
@@ -33,23 +55,28 @@ def require_auth(f):
             return jsonify({'error': 'Invalid token'}), 401
         
         g.current_user = user
+        g.auth_token = token
         return f(*args, **kwargs)
     
     decorated_function.__name__ = f.__name__
     return decorated_function
 
 def verify_token(token: str) -> Optional[Dict]:
-    """Verify JWT token and return user data"""
+    """Verify a bearer token locally and return the cached user row"""
     try:
-        # This would integrate with your existing JWT verification
-        # For now, return a mock user for development
-        query = "SELECT * FROM users WHERE id = %s"
-        result = execute_query(query, (1,), fetch=True)
-        return result[0] if result else None
+        return token_verifier.verify(token)
     except Exception as e:
         logger.error(f"Token verification failed: {e}")
         return None
 
+@app.route('/api/auth/logout', methods=['POST'])
+@require_auth
+def logout():
+    """Revoke the caller's session so the token stops working immediately"""
+    if not token_verifier.revoke(g.auth_token):
+        return jsonify({'error': 'Failed to revoke session'}), 500
+    return jsonify({'success': True})
+
 # Game Management Endpoints
 
 @app.route('/api/games', methods=['GET'])
@@ -61,39 +88,19 @@ def get_games():
         class_level = request.args.get('class_level', type=int)
         difficulty = request.args.get('difficulty')
         
-        query = """
-        SELECT g.*, 
-               CASE WHEN gp.user_id IS NOT NULL THEN TRUE ELSE FALSE END as is_completed,
-               COALESCE(MAX(gp.score), 0) as best_score,
-               COUNT(gp.id) as attempts
-        FROM games g
-        LEFT JOIN game_progress gp ON g.id = gp.game_id AND gp.user_id = %s
-        WHERE g.is_active = TRUE
-        """
-        params = [g.current_user['id']]
-        
-        if subject:
-            query += " AND g.subject = %s"
-            params.append(subject)
-        
-        if class_level:
-            query += " AND g.class_level = %s"
-            params.append(class_level)
-        
-        if difficulty:
-            query += " AND g.difficulty = %s"
-            params.append(difficulty)
-        
-        query += " GROUP BY g.id ORDER BY g.class_level, g.difficulty, g.title"
-        
-        games = execute_query(query, params, fetch=True)
+        # Catalog filtering runs in memory; only the student's progress comes from MySQL
+        games = game_catalog.find(subject, class_level, difficulty)
+        progress = load_progress_by_game(g.current_user['id'])
+        for game in games:
+            best_score, attempts = progress.get(game['id'], (0, 0))
+            game['is_completed'] = attempts > 0
+            game['best_score'] = best_score
+            game['attempts'] = attempts
         
-        # Check unlock status for each game
+        # Evaluate unlock status for the whole catalog in one pass
+        unlocked = check_unlock_statuses(g.current_user['id'], games)
         for game in games:
-            game['is_unlocked'] = check_game_unlock_status(
-                g.current_user['id'], 
-                game['id']
-            )
+            game['is_unlocked'] = unlocked[game['id']]
         
         return jsonify({
             'success': True,
@@ -109,24 +116,12 @@ def get_games():
 def get_game_details(game_id: str):
     """Get detailed information about a specific game"""
     try:
-        query = """
-        SELECT g.*, 
-               COUNT(gp.id) as total_attempts,
-               AVG(gp.score) as average_score,
-               MAX(gp.score) as best_score,
-               SUM(gp.time_spent) as total_time_spent
-        FROM games g
-        LEFT JOIN game_progress gp ON g.id = gp.game_id AND gp.user_id = %s
-        WHERE g.id = %s AND g.is_active = TRUE
-        GROUP BY g.id
-        """
-        
-        result = execute_query(query, (g.current_user['id'], game_id), fetch=True)
+        game = game_catalog.get(game_id)
         
-        if not result:
+        if not game:
             return jsonify({'error': 'Game not found'}), 404
         
-        game = result[0]
+        game.update(load_game_totals(g.current_user['id'], game_id))
         
         # Get recent progress
         progress_query = """
@@ -141,7 +136,7 @@ def get_game_details(game_id: str):
         game['recent_progress'] = progress or []
         
         # Check unlock status
-        game['is_unlocked'] = check_game_unlock_status(g.current_user['id'], game_id)
+        game['is_unlocked'] = check_unlock_statuses(g.current_user['id'], [game])[game_id]
         
         return jsonify({
             'success': True,
@@ -160,18 +155,13 @@ def start_game_session(game_id: str):
     """Start a new game session"""
     try:
         # Check if game exists and is unlocked
-        game = execute_query(
-            "SELECT * FROM games WHERE id = %s AND is_active = TRUE",
-            (game_id,), fetch=True
-        )
+        game = game_catalog.get(game_id)
         
         if not game:
             return jsonify({'error': 'Game not found'}), 404
         
-        game = game[0]
-        
         # Check unlock status
-        is_unlocked = check_game_unlock_status(g.current_user['id'], game_id)
+        is_unlocked = check_unlock_statuses(g.current_user['id'], [game])[game_id]
         if not is_unlocked:
             return jsonify({'error': 'Game is locked'}), 403
         
@@ -191,6 +181,7 @@ def start_game_session(game_id: str):
             datetime.now(),
             True
         ))
+        session_store.register(session_id, g.current_user['id'])
         
         # Log analytics event
         log_analytics_event(g.current_user['id'], game_id, session_id, 'game_start')
@@ -225,89 +216,30 @@ def save_game_progress(game_id: str):
         mistakes = int(data.get('mistakes', 0))
         game_state = data.get('game_state', {})
         
-        # Verify session belongs to current user
-        session = execute_query(
-            "SELECT * FROM game_sessions WHERE id = %s AND user_id = %s",
-            (session_id, g.current_user['id']), fetch=True
-        )
-        
-        if not session:
+        # Verify the session belongs to the current user; known sessions are checked in memory
+        owner = session_store.owner(session_id)
+        if owner is None:
+            if not execute_prepared("session_for_user", (session_id, g.current_user['id']), fetch=True):
+                return jsonify({'error': 'Invalid session'}), 403
+            session_store.register(session_id, g.current_user['id'])
+        elif owner != g.current_user['id']:
             return jsonify({'error': 'Invalid session'}), 403
         
-        # Get game details for XP calculation
-        game = execute_query(
-            "SELECT * FROM games WHERE id = %s",
-            (game_id,), fetch=True
-        )[0]
+        game = game_catalog.get(game_id, active_only=False)
+        if not game:
+            return jsonify({'error': 'Game not found'}), 404
         
         if completed:
-            # Calculate XP reward
-            xp_earned = calculate_xp_reward(
-                game['xp_reward'],
-                score,
-                time_spent,
-                game['time_estimate'] * 60,  # Convert to seconds
-                hints_used,
-                game['difficulty']
-            )
-            
-            # Save completed progress
-            progress_id = str(uuid.uuid4())
-            query = """
-            INSERT INTO game_progress 
-            (id, user_id, game_id, session_id, score, time_spent, hints_used, 
-             mistakes, xp_earned, completed_at, game_state)
-            VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-            """
-            
-            execute_query(query, (
-                progress_id,
-                g.current_user['id'],
-                game_id,
-                session_id,
-                score,
-                time_spent,
-                hints_used,
-                mistakes,
-                xp_earned,
-                datetime.now(),
-                json.dumps(game_state)
-            ))
-            
-            # End game session
-            execute_query(
-                "UPDATE game_sessions SET is_active = FALSE, ended_at = %s WHERE id = %s",
-                (datetime.now(), session_id)
-            )
-            
-            # Update student stats
-            update_student_stats(g.current_user['id'], xp_earned, score, time_spent)
-            
-            # Check for new achievements
-            achievements = check_achievements(g.current_user['id'])
-            
-            # Log completion event
-            log_analytics_event(g.current_user['id'], game_id, session_id, 'game_complete', {
-                'score': score,
-                'xp_earned': xp_earned,
-                'time_spent': time_spent
-            })
-            
             return jsonify({
                 'success': True,
-                'xp_earned': xp_earned,
-                'new_achievements': achievements,
-                'progress_id': progress_id
+                **record_game_completion(g.current_user['id'], game_id, session_id, game, score,
+                                         time_spent, hints_used, mistakes, game_state)
             })
         
         else:
-            # Save in-progress state
-            execute_query(
-                """UPDATE game_sessions 
-                   SET current_score = %s, game_state = %s, last_activity = %s 
-                   WHERE id = %s""",
-                (score, json.dumps(game_state), datetime.now(), session_id)
-            )
+            # Save in-progress state; buffered and written behind in batches
+            if not session_store.save(session_id, g.current_user['id'], score, game_state):
+                return jsonify({'error': 'Failed to save progress'}), 500
             
             return jsonify({'success': True, 'message': 'Progress saved'})
         
@@ -320,68 +252,85 @@ def save_game_progress(game_id: str):
 @app.route('/api/student/stats', methods=['GET'])
 @require_auth
 def get_student_stats():
-    """Get comprehensive student statistics"""
+    """Get comprehensive student statistics; supports If-None-Match"""
     try:
         user_id = g.current_user['id']
         
-        # Get basic stats
-        stats_query = """
-        SELECT gs.*, u.grade, u.name
-        FROM game_stats gs
-        JOIN users u ON gs.user_id = u.id
-        WHERE gs.user_id = %s
-        """
-        
-        stats = execute_query(stats_query, (user_id,), fetch=True)
-        if not stats:
-            # Create initial stats record
-            execute_query(
-                "INSERT INTO game_stats (user_id) VALUES (%s)",
-                (user_id,)
-            )
-            stats = execute_query(stats_query, (user_id,), fetch=True)
-        
-        student_stats = stats[0]
-        
-        # Get subject mastery
-        mastery_query = """
-        SELECT subject, mastery_level, total_xp, games_completed, 
-               average_score, mastery_percentage, current_streak
-        FROM subject_mastery
-        WHERE user_id = %s
-        """
-        
-        subject_mastery = execute_query(mastery_query, (user_id,), fetch=True)
-        
-        # Get recent achievements
-        achievements_query = """
-        SELECT sa.*, a.name, a.description, a.icon, a.xp_reward
-        FROM student_achievements sa
-        JOIN achievements a ON sa.achievement_id = a.id
-        WHERE sa.user_id = %s
-        ORDER BY sa.unlocked_at DESC
-        LIMIT 10
-        """
-        
-        recent_achievements = execute_query(achievements_query, (user_id,), fetch=True)
+        snapshot = stats_cache.get(user_id)
+        if snapshot is None:
+            generation = stats_cache.generation(user_id)
+            snapshot = stats_cache.put(user_id, load_student_stats(user_id), generation)
         
-        # Calculate level info
-        level_info = calculate_level_info(student_stats['total_points'])
+        if request.if_none_match.contains_weak(snapshot.etag):
+            stats_cache.record_not_modified()
+            response = app.response_class(status=304)
+        else:
+            response = jsonify({
+                'success': True,
+                'stats': snapshot.stats
+            })
         
-        return jsonify({
-            'success': True,
-            'stats': {
-                **student_stats,
-                'level_info': level_info,
-                'subject_mastery': subject_mastery or [],
-                'recent_achievements': recent_achievements or []
-            }
-        })
+        response.set_etag(snapshot.etag)
+        response.headers['Cache-Control'] = 'private, no-cache'
+        return response
         
     except Exception as e:
         logger.error(f"Error fetching student stats: {e}")
         return jsonify({'error': 'Failed to fetch statistics'}), 500
 
+def load_student_stats(user_id: int) -> Dict:
+    """Build the dashboard stats payload for a student"""
+    # Get basic stats
+    stats_query = """
+    SELECT gs.*, u.grade, u.name
+    FROM game_stats gs
+    JOIN users u ON gs.user_id = u.id
+    WHERE gs.user_id = %s
+    """
+    
+    stats = execute_query(stats_query, (user_id,), fetch=True)
+    if not stats:
+        # Create initial stats record
+        execute_query(
+            "INSERT INTO game_stats (user_id) VALUES (%s)",
+            (user_id,)
+        )
+        stats = execute_query(stats_query, (user_id,), fetch=True)
+    
+    student_stats = stats[0]
+    
+    # Get subject mastery
+    mastery_query = """
+    SELECT subject, mastery_level, total_xp, games_completed, 
+           average_score, mastery_percentage, current_streak
+    FROM subject_mastery
+    WHERE user_id = %s
+    """
+    
+    subject_mastery = execute_query(mastery_query, (user_id,), fetch=True)
+    
+    # Get recent achievements
+    achievements_query = """
+    SELECT sa.*, a.name, a.description, a.icon, a.xp_reward
+    FROM student_achievements sa
+    JOIN achievements a ON sa.achievement_id = a.id
+    WHERE sa.user_id = %s
+    ORDER BY sa.unlocked_at DESC
+    LIMIT 10
+    """
+    
+    recent_achievements = execute_query(achievements_query, (user_id,), fetch=True)
+    
+    # Calculate level info
+    level_info = calculate_level_info(student_stats['total_points'])
+    
+    return {
+        **student_stats,
+        'level_info': level_info,
+        'subject_mastery': subject_mastery or [],
+        'recent_achievements': recent_achievements or []
+    }
+
 @app.route('/api/student/progress/<subject>', methods=['GET'])
 @require_auth
 def get_subject_progress(subject: str):
@@ -398,35 +347,27 @@ def get_subject_progress(subject: str):
         
         mastery = execute_query(mastery_query, (user_id, subject, class_level), fetch=True)
         
-        # Get game progress for this subject
-        progress_query = """
-        SELECT gp.*, g.title, g.difficulty, g.game_type
-        FROM game_progress gp
-        JOIN games g ON gp.game_id = g.id
-        WHERE gp.user_id = %s AND g.subject = %s
-        ORDER BY gp.completed_at DESC
-        """
-        
-        progress = execute_query(progress_query, (user_id, subject), fetch=True)
+        # Get one page of game progress for this subject, newest first
+        try:
+            progress, next_cursor = load_progress_page(user_id, subject, request.args.get('cursor'),
+                                                       request.args.get('limit', type=int))
+        except ValueError:
+            return jsonify({'error': 'Invalid cursor'}), 400
         
         # Get available games for this subject
-        games_query = """
-        SELECT g.*, 
-               CASE WHEN gp.user_id IS NOT NULL THEN TRUE ELSE FALSE END as is_completed,
-               COALESCE(MAX(gp.score), 0) as best_score
-        FROM games g
-        LEFT JOIN game_progress gp ON g.id = gp.game_id AND gp.user_id = %s
-        WHERE g.subject = %s AND g.class_level = %s AND g.is_active = TRUE
-        GROUP BY g.id
-        """
-        
-        games = execute_query(games_query, (user_id, subject, class_level), fetch=True)
+        games = game_catalog.find(subject, class_level)
+        progress_by_game = load_progress_by_game(user_id, [game['id'] for game in games])
+        for game in games:
+            best_score, attempts = progress_by_game.get(game['id'], (0, 0))
+            game['is_completed'] = attempts > 0
+            game['best_score'] = best_score
         
         return jsonify({
             'success': True,
             'subject': subject,
             'mastery': mastery[0] if mastery else None,
-            'recent_progress': progress or [],
+            'recent_progress': progress,
+            'next_cursor': next_cursor,
             'available_games': games or []
         })
         
@@ -434,6 +375,21 @@ def get_subject_progress(subject: str):
         logger.error(f"Error fetching subject progress: {e}")
         return jsonify({'error': 'Failed to fetch subject progress'}), 500
 
+@app.route('/api/student/progress/history/<int:progress_id>/state', methods=['GET'])
+@require_auth
+def get_progress_state(progress_id: int):
+    """Get the final game state saved with one completed game"""
+    try:
+        state = load_progress_state(g.current_user['id'], progress_id)
+        if state is None:
+            return jsonify({'error': 'Progress not found'}), 404
+        
+        return jsonify({'success': True, **state})
+        
+    except Exception as e:
+        logger.error(f"Error fetching progress state: {e}")
+        return jsonify({'error': 'Failed to fetch progress state'}), 500
+
 # Achievement System Endpoints
 
 @app.route('/api/achievements', methods=['GET'])
@@ -485,40 +441,9 @@ def get_leaderboard():
         class_level = request.args.get('class_level', type=int)
         limit = request.args.get('limit', 50, type=int)
         
-        query = """
-        SELECT u.name, u.avatar, gs.level, gs.total_points, gs.games_completed,
-               gs.average_score, gs.current_streak,
-               ROW_NUMBER() OVER (ORDER BY gs.total_points DESC) as rank_position
-        FROM game_stats gs
-        JOIN users u ON gs.user_id = u.id
-        WHERE u.role = 'student'
-        """
-        params = []
-        
-        if class_level:
-            query += " AND u.grade = %s"
-            params.append(class_level)
-        
-        if subject and leaderboard_type == 'subject':
-            # For subject leaderboards, we'd need to calculate subject-specific scores
-            # This is a simplified version
-            query += " AND gs.favorite_subject = %s"
-            params.append(subject)
-        
-        query += f" ORDER BY gs.total_points DESC LIMIT {limit}"
-        
-        leaderboard = execute_query(query, params, fetch=True)
-        
-        # Get current user's rank
-        user_rank_query = """
-        SELECT COUNT(*) + 1 as user_rank
-        FROM game_stats gs1
-        JOIN game_stats gs2 ON gs2.user_id = %s
-        WHERE gs1.total_points > gs2.total_points
-        """
-        
-        user_rank = execute_query(user_rank_query, (g.current_user['id'],), fetch=True)
-        current_user_rank = user_rank[0]['user_rank'] if user_rank else None
+        leaderboard, current_user_rank = leaderboard_service.leaderboard(
+            leaderboard_type, subject, class_level, limit, g.current_user['id']
+        )
         
         return jsonify({
             'success': True,
@@ -533,53 +458,118 @@ def get_leaderboard():
 
 # Helper Functions
 
+@lru_cache(maxsize=1024)
+def _parse_unlock_requirements(raw: str) -> Dict:
+    """Parse a games.unlock_requirements value; cached because the catalog rarely changes"""
+    return json.loads(raw or '{}')
+
+def get_unlock_requirements(game: Dict) -> Dict:
+    """Return the parsed unlock requirements of a games row (do not mutate the result)"""
+    raw = game.get('unlock_requirements')
+    if isinstance(raw, dict):
+        return raw
+    if isinstance(raw, (bytes, bytearray)):
+        raw = raw.decode('utf-8')
+    return _parse_unlock_requirements(raw or '{}')
+
+def load_unlock_context(user_id: int) -> tuple:
+    """Load everything unlock rules look at: the student's game_stats row and mastery per subject"""
+    stats = execute_prepared("unlock_stats_by_user", (user_id,), fetch=True)
+    mastery = execute_prepared("mastery_by_user", (user_id,), fetch=True)
+    
+    student_stats = stats[0] if stats else None
+    mastery_by_subject = {row['subject']: row['mastery_percentage'] for row in mastery or []}
+    return student_stats, mastery_by_subject
+
+def evaluate_unlock_requirements(requirements: Dict, student_stats: Optional[Dict],
+                                 mastery_by_subject: Dict[str, float]) -> bool:
+    """Check parsed unlock requirements against preloaded student data"""
+    if not requirements:
+        return True  # No requirements = always unlocked
+    
+    if not student_stats:
+        return False
+    
+    # Check level requirement
+    if 'level' in requirements:
+        if student_stats['level'] < requirements['level']:
+            return False
+    
+    # Check games completed requirement
+    if 'games_completed' in requirements:
+        if student_stats['games_completed'] < requirements['games_completed']:
+            return False
+    
+    # Check subject mastery requirement
+    for subject, required_mastery in requirements.get('subject_mastery', {}).items():
+        mastery = mastery_by_subject.get(subject)
+        if mastery is None or mastery < required_mastery:
+            return False
+    
+    return True
+
+def load_progress_by_game(user_id: int, game_ids: Optional[List[str]] = None) -> Dict[str, tuple]:
+    """Best score and attempt count per game for one student, optionally only for game_ids"""
+    query = """
+        SELECT game_id, best_score, attempts
+        FROM game_progress_summary
+        WHERE user_id = %s
+    """
+    params = [user_id]
+    if game_ids is not None:
+        if not game_ids:
+            return {}
+        query += f" AND game_id IN ({', '.join(['%s'] * len(game_ids))})"
+        params += game_ids
+    rows = execute_query(query, params, fetch=True)
+    return {row['game_id']: (row['best_score'] or 0, row['attempts']) for row in rows or []}
+
+def load_game_totals(user_id: int, game_id: str) -> Dict:
+    """Attempts, scores and time spent on one game, from the per-game summary row"""
+    rows = execute_query("""
+        SELECT attempts as total_attempts,
+               total_score / attempts as average_score,
+               best_score,
+               total_time_spent
+        FROM game_progress_summary
+        WHERE user_id = %s AND game_id = %s
+    """, (user_id, game_id), fetch=True)
+    if rows:
+        return rows[0]
+    return {'total_attempts': 0, 'average_score': None, 'best_score': None, 'total_time_spent': None}
+
+def check_unlock_statuses(user_id: int, games: List[Dict]) -> Dict[str, bool]:
+    """Check unlock status for a list of games rows with a constant number of queries"""
+    requirements = {}
+    for game in games:
+        try:
+            requirements[game['id']] = get_unlock_requirements(game)
+        except (TypeError, ValueError) as e:
+            logger.error(f"Invalid unlock requirements for game {game['id']}: {e}")
+            requirements[game['id']] = None
+    
+    context = (None, {})
+    if any(requirements.values()):
+        try:
+            context = load_unlock_context(user_id)
+        except Exception as e:
+            logger.error(f"Error loading unlock context: {e}")
+            return {game_id: not rules and rules is not None for game_id, rules in requirements.items()}
+    
+    return {
+        game_id: rules is not None and evaluate_unlock_requirements(rules, *context)
+        for game_id, rules in requirements.items()
+    }
+
 def check_game_unlock_status(user_id: int, game_id: str) -> bool:
     """Check if a game is unlocked for a student"""
     try:
-        # Get game requirements
-        game = execute_query(
-            "SELECT unlock_requirements FROM games WHERE id = %s",
-            (game_id,), fetch=True
-        )[0]
-        
-        requirements = json.loads(game['unlock_requirements'] or '{}')
-        
-        if not requirements:
-            return True  # No requirements = always unlocked
-        
-        # Get student stats
-        stats = execute_query(
-            "SELECT * FROM game_stats WHERE user_id = %s",
-            (user_id,), fetch=True
-        )
+        game = game_catalog.get(game_id, active_only=False)
         
-        if not stats:
+        if not game:
             return False
         
-        student_stats = stats[0]
-        
-        # Check level requirement
-        if 'level' in requirements:
-            if student_stats['level'] < requirements['level']:
-                return False
-        
-        # Check games completed requirement
-        if 'games_completed' in requirements:
-            if student_stats['games_completed'] < requirements['games_completed']:
-                return False
-        
-        # Check subject mastery requirement
-        if 'subject_mastery' in requirements:
-            for subject, required_mastery in requirements['subject_mastery'].items():
-                mastery = execute_query(
-                    "SELECT mastery_percentage FROM subject_mastery WHERE user_id = %s AND subject = %s",
-                    (user_id, subject), fetch=True
-                )
-                
-                if not mastery or mastery[0]['mastery_percentage'] < required_mastery:
-                    return False
-        
-        return True
+        return check_unlock_statuses(user_id, [game])[game_id]
         
     except Exception as e:
         logger.error(f"Error checking unlock status: {e}")
@@ -620,98 +610,111 @@ def calculate_xp_reward(base_xp: int, score: int, time_spent: int, time_limit: i
         logger.error(f"Error calculating XP reward: {e}")
         return base_xp
 
-def update_student_stats(user_id: int, xp_earned: int, score: int, time_spent: int):
-    """Update student statistics after game completion"""
-    try:
-        # This is handled by database triggers, but we can add additional logic here
-        # Update favorite subject based on recent activity
-        recent_games_query = """
-        SELECT g.subject, COUNT(*) as game_count
-        FROM game_progress gp
-        JOIN games g ON gp.game_id = g.id
-        WHERE gp.user_id = %s AND gp.completed_at >= DATE_SUB(NOW(), INTERVAL 7 DAY)
-        GROUP BY g.subject
-        ORDER BY game_count DESC
-        LIMIT 1
-        """
+def record_game_completion(user_id: int, game_id: str, session_id: str, game: Dict, score: int,
+                           time_spent: int, hints_used: int, mistakes: int, game_state: Dict) -> Dict:
+    """Record a finished game in one transaction and return xp_earned, new_achievements and progress_id"""
+    # Calculate XP reward
+    xp_earned = calculate_xp_reward(
+        game['xp_reward'],
+        score,
+        time_spent,
+        game['time_estimate'] * 60,  # Convert to seconds
+        hints_used,
+        game['difficulty']
+    )
+    
+    # Record the completion as one transaction on one connection
+    with db_transaction() as cursor:
+        now = datetime.now()
+        cursor.execute(
+            """INSERT INTO game_progress 
+               (user_id, game_id, session_id, score, time_spent, hints_used, 
+                mistakes, xp_earned, completed_at)
+               VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)""",
+            (user_id, game_id, session_id, score, time_spent,
+             hints_used, mistakes, xp_earned, now)
+        )
+        progress_id = cursor.lastrowid
         
-        result = execute_query(recent_games_query, (user_id,), fetch=True)
-        if result:
-            favorite_subject = result[0]['subject']
-            execute_query(
-                "UPDATE game_stats SET favorite_subject = %s WHERE user_id = %s",
-                (favorite_subject, user_id)
-            )
+        # The final state is kept compressed beside the history row and only read on demand
+        cursor.execute(
+            "INSERT INTO game_progress_state (progress_id, state) VALUES (%s, %s)",
+            (progress_id, compress_state(game_state))
+        )
         
-    except Exception as e:
-        logger.error(f"Error updating student stats: {e}")
-
-def check_achievements(user_id: int) -> List[Dict]:
-    """Check for newly unlocked achievements"""
-    try:
-        # Get student's current stats
-        stats = execute_query(
-            "SELECT * FROM game_stats WHERE user_id = %s",
-            (user_id,), fetch=True
-        )[0]
-        
-        # Get all achievements not yet unlocked
-        achievements_query = """
-        SELECT a.* FROM achievements a
-        LEFT JOIN student_achievements sa ON a.id = sa.achievement_id AND sa.user_id = %s
-        WHERE sa.user_id IS NULL AND a.is_active = TRUE
-        """
+        # Keep the per-game totals current so reads never scan the history
+        cursor.execute(
+            """INSERT INTO game_progress_summary
+               (user_id, game_id, attempts, best_score, total_score, total_time_spent, last_completed_at)
+               VALUES (%s, %s, 1, %s, %s, %s, %s)
+               ON DUPLICATE KEY UPDATE
+                   attempts = attempts + 1,
+                   best_score = GREATEST(best_score, VALUES(best_score)),
+                   total_score = total_score + VALUES(total_score),
+                   total_time_spent = total_time_spent + VALUES(total_time_spent),
+                   last_completed_at = VALUES(last_completed_at)""",
+            (user_id, game_id, score, score, time_spent, now)
+        )
         
-        achievements = execute_query(achievements_query, (user_id,), fetch=True)
+        # End game session with its final state; this supersedes any buffered autosave
+        cursor.execute(
+            """UPDATE game_sessions
+               SET is_active = FALSE, ended_at = %s, last_activity = %s,
+                   current_score = %s, game_state = %s
+               WHERE id = %s""",
+            (now, now, score, json.dumps(game_state), session_id)
+        )
         
-        new_achievements = []
+        # Update student stats
+        update_student_stats(cursor, user_id)
         
-        for achievement in achievements:
-            requirements = json.loads(achievement['requirements'])
-            
-            # Check if requirements are met (simplified logic)
-            if check_achievement_requirements(stats, requirements):
-                # Award achievement
-                execute_query(
-                    "INSERT INTO student_achievements (user_id, achievement_id, unlocked_at) VALUES (%s, %s, %s)",
-                    (user_id, achievement['id'], datetime.now())
-                )
-                
-                # Award XP
-                execute_query(
-                    "UPDATE game_stats SET total_points = total_points + %s WHERE user_id = %s",
-                    (achievement['xp_reward'], user_id)
-                )
-                
-                new_achievements.append(achievement)
-        
-        return new_achievements
+        # Award achievements this game unlocked
+        achievements = achievement_engine.evaluate(cursor, user_id, GameCompletion(
+            subject=game['subject'],
+            score=score,
+            time_spent=time_spent
+        ))
         
-    except Exception as e:
-        logger.error(f"Error checking achievements: {e}")
-        return []
+    session_store.complete(session_id)
+    
+    # Progress, mastery and any awarded achievements changed the dashboard
+    stats_cache.invalidate(user_id)
+    
+    # Log completion event
+    log_analytics_event(user_id, game_id, session_id, 'game_complete', {
+        'score': score,
+        'xp_earned': xp_earned,
+        'time_spent': time_spent
+    })
+    
+    leaderboard_service.record_game_completion(user_id, game['subject'], xp_earned, score)
+    for achievement in achievements:
+        leaderboard_service.record_bonus_xp(user_id, achievement['xp_reward'])
+    
+    return {
+        'xp_earned': xp_earned,
+        'new_achievements': achievements,
+        'progress_id': progress_id
+    }
 
-def check_achievement_requirements(stats: Dict, requirements: Dict) -> bool:
-    """Check if achievement requirements are met"""
-    try:
-        req_type = requirements.get('type')
-        req_value = requirements.get('value')
-        
-        if req_type == 'games_completed':
-            return stats['games_completed'] >= req_value
-        elif req_type == 'level':
-            return stats['level'] >= req_value
-        elif req_type == 'streak':
-            return stats['current_streak'] >= req_value
-        elif req_type == 'perfect_score':
-            # This would need additional logic to track perfect scores
-            return True  # Placeholder
-        
-        return False
-        
-    except Exception as e:
-        logger.error(f"Error checking achievement requirements: {e}")
-        return False
+def update_student_stats(cursor, user_id: int):
+    """Update student statistics after game completion, inside the completion transaction"""
+    # Points, averages and counts are handled by database triggers; this keeps the
+    # favorite subject in line with the last week of activity in a single statement
+    cursor.execute(
+        """UPDATE game_stats
+           SET favorite_subject = COALESCE((
+               SELECT g.subject
+               FROM game_progress gp
+               JOIN games g ON gp.game_id = g.id
+               WHERE gp.user_id = %s AND gp.completed_at >= DATE_SUB(NOW(), INTERVAL 7 DAY)
+               GROUP BY g.subject
+               ORDER BY COUNT(*) DESC
+               LIMIT 1
+           ), favorite_subject)
+           WHERE user_id = %s""",
+        (user_id, user_id)
+    )
 
 def calculate_level_info(total_points: int) -> Dict:
     """Calculate level information from total points"""
@@ -728,16 +731,46 @@ def calculate_level_info(total_points: int) -> Dict:
 
 def log_analytics_event(user_id: int, game_id: str, session_id: str, 
                        event_type: str, event_data: Dict = None):
-    """Log analytics event for reporting"""
+    """Queue an analytics event for reporting; written in batches off the request path"""
     try:
-        execute_query(
-            """INSERT INTO learning_analytics 
-               (user_id, game_id, session_id, event_type, event_data) 
-               VALUES (%s, %s, %s, %s, %s)""",
-            (user_id, game_id, session_id, event_type, json.dumps(event_data or {}))
-        )
+        if not analytics_buffer.log(user_id, game_id, session_id, event_type, event_data):
+            logger.warning(f"Analytics event dropped: {event_type} for game {game_id}")
     except Exception as e:
         logger.error(f"Error logging analytics event: {e}")
 
+# Metrics Endpoints
+
+@app.route('/api/metrics/stats-cache', methods=['GET'])
+def stats_cache_metrics():
+    """Student stats snapshot cache hit ratio and staleness"""
+    return jsonify(stats_cache.stats())
+
+@app.route('/api/metrics/game-catalog', methods=['GET'])
+def game_catalog_metrics():
+    """Catalog size, version stamp and reload counts"""
+    return jsonify(game_catalog.stats())
+
+@app.route('/api/metrics/session-store', methods=['GET'])
+def session_store_metrics():
+    """Buffered session states, coalesced saves and flush counts"""
+    return jsonify(session_store.stats())
+
+@app.route('/api/metrics/auth', methods=['GET'])
+def auth_metrics():
+    """Token cache hit ratio and rejection counts"""
+    return jsonify(token_verifier.stats())
+
+@app.route('/api/metrics/db-pool', methods=['GET'])
+def db_pool_metrics():
+    """MySQL pool checkout wait times, in-use and overflow counts"""
+    return jsonify(get_connection_pool().stats())
+
+@app.route('/api/metrics/queries', methods=['GET'])
+def query_metrics():
+    """Per-fingerprint query latency, rows and errors, pool waits and recent slow queries"""
+    limit = request.args.get('limit', 50, type=int)
+    return jsonify(get_query_metrics().snapshot(limit))
+
 if __name__ == '__main__':
+    warm_up_pool()
     app.run(debug=True, host='127.0.0.1', port=8001)
@@ -0,0 +1,476 @@
+# ASGI variant of the game API
+# Same routes, status codes and JSON bodies as game_api.py, served by FastAPI.
+# In-memory paths (token cache, game catalog, stats snapshots, autosaves) run on
+# the event loop; every MySQL call goes through async_db, so a request waiting on
+# the database holds no server thread. Run either app on port 8001.
+
+import asyncio
+import dataclasses
+import json
+import logging
+import uuid
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Any, Dict, Optional
+
+import uvicorn
+from fastapi import Depends, FastAPI, Request
+from fastapi.exceptions import RequestValidationError
+from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, Response
+from starlette.routing import Match
+from werkzeug.http import http_date, parse_etags, quote_etag
+
+from async_db import async_db
+from auth import token_verifier
+from config import PREPARED_QUERIES, warm_up_pool, get_connection_pool, get_query_metrics
+from game_api import (check_unlock_statuses, load_game_totals, load_progress_by_game, load_student_stats,
+                      log_analytics_event, record_game_completion)
+from game_catalog import game_catalog
+from progress_history import decode_cursor, load_progress_page, load_progress_state
+from leaderboard import leaderboard_service
+from query_metrics import track_route
+from session_store import session_store
+from stats_cache import stats_cache
+
+logger = logging.getLogger(__name__)
+
+
+def _json_default(value):
+    """Encode values the way Flask's jsonify does so both APIs return identical bodies"""
+    if isinstance(value, date):
+        return http_date(value)
+    if isinstance(value, (Decimal, uuid.UUID)):
+        return str(value)
+    if dataclasses.is_dataclass(value):
+        return dataclasses.asdict(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+class FlaskJSONResponse(JSONResponse):
+    def render(self, content: Any) -> bytes:
+        return json.dumps(content, default=_json_default, sort_keys=True,
+                          separators=(",", ":")).encode("utf-8")
+
+
+def jsonify(payload: Any, status_code: int = 200, headers: Optional[Dict[str, str]] = None) -> FlaskJSONResponse:
+    """Build the response directly so FastAPI's own encoder does not reformat dates"""
+    return FlaskJSONResponse(payload, status_code=status_code, headers=headers)
+
+
+class ApiError(Exception):
+    """Returned to the client as {"error": message} with the given status"""
+
+    def __init__(self, status_code: int, message: str):
+        super().__init__(message)
+        self.status_code = status_code
+        self.message = message
+
+
+app = FastAPI(title="Shiksha Game API (ASGI)", default_response_class=FlaskJSONResponse)
+app.add_middleware(
+    CORSMiddleware,
+    allow_origins=["http://localhost:3000", "http://127.0.0.1:3000"],
+    allow_methods=["*"],
+    allow_headers=["*"],
+)
+
+
+@app.exception_handler(ApiError)
+async def api_error_handler(request: Request, exc: ApiError):
+    return jsonify({'error': exc.message}, exc.status_code)
+
+
+@app.exception_handler(RequestValidationError)
+async def validation_error_handler(request: Request, exc: RequestValidationError):
+    """Reject malformed parameters with a 400 like the Flask app rather than FastAPI's 422 body"""
+    error = exc.errors()[0]
+    location = ".".join(str(part) for part in error['loc'][1:]) or error['loc'][0]
+    return jsonify({'success': False, 'message': f"Invalid {location}: {error['msg']}"}, 400)
+
+
+class QueryRouteMiddleware:
+    """Attribute every query a request issues to its route template in /api/metrics/queries.
+
+    Plain ASGI rather than @app.middleware("http"), which costs an extra task and
+    response streaming per request.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        route = "unmatched"
+        for candidate in app.router.routes:
+            match, _ = candidate.matches(scope)
+            if match == Match.FULL:
+                route = candidate.path
+                break
+        with track_route(f"{scope['method']} {route}"):
+            await self.app(scope, receive, send)
+
+
+app.add_middleware(QueryRouteMiddleware)
+
+
+@app.on_event("startup")
+async def load_shared_state():
+    """Warm the pool and load the game catalog before serving"""
+    await async_db.run_sync(warm_up_pool)
+    await async_db.run_sync(game_catalog.reload)
+    game_catalog.start()
+
+
+@app.on_event("shutdown")
+async def flush_shared_state():
+    await async_db.run_sync(session_store.flush)
+    game_catalog.stop()
+    async_db.close()
+
+
+def _int_arg(request: Request, name: str, default: Optional[int] = None) -> Optional[int]:
+    """Query parameter as int, falling back to default like Flask's request.args.get(type=int)"""
+    try:
+        return int(request.query_params[name])
+    except (KeyError, ValueError):
+        return default
+
+
+def _bearer_token(request: Request) -> str:
+    auth_header = request.headers.get('Authorization')
+    if not auth_header or not auth_header.startswith('Bearer '):
+        raise ApiError(401, 'Authentication required')
+    return auth_header.split(' ')[1]
+
+
+async def current_user(request: Request) -> Dict:
+    """Authentication dependency; cached tokens are resolved without leaving the event loop"""
+    token = _bearer_token(request)
+    user = token_verifier.cached(token)
+    if user is None:
+        try:
+            user = await async_db.run_sync(token_verifier.verify, token)
+        except Exception as e:
+            logger.error(f"Token verification failed: {e}")
+            user = None
+    if not user:
+        raise ApiError(401, 'Invalid token')
+    return user
+
+
+@app.post('/api/auth/logout')
+async def logout(request: Request, user: Dict = Depends(current_user)):
+    """Revoke the caller's session so the token stops working immediately"""
+    if not await async_db.run_sync(token_verifier.revoke, _bearer_token(request)):
+        raise ApiError(500, 'Failed to revoke session')
+    return jsonify({'success': True})
+
+# Game Management Endpoints
+
+@app.get('/api/games')
+async def get_games(request: Request, user: Dict = Depends(current_user)):
+    """Get available games for a student"""
+    try:
+        # Catalog lookups reload synchronously if the startup load failed, so keep them off the loop
+        games = await async_db.run_sync(game_catalog.find, request.query_params.get('subject'),
+                                        _int_arg(request, 'class_level'), request.query_params.get('difficulty'))
+        progress, unlocked = await asyncio.gather(
+            async_db.run_sync(load_progress_by_game, user['id']),
+            async_db.run_sync(check_unlock_statuses, user['id'], games)
+        )
+        for game in games:
+            best_score, attempts = progress.get(game['id'], (0, 0))
+            game['is_completed'] = attempts > 0
+            game['best_score'] = best_score
+            game['attempts'] = attempts
+            game['is_unlocked'] = unlocked[game['id']]
+
+        return jsonify({'success': True, 'games': games})
+
+    except Exception as e:
+        logger.error(f"Error fetching games: {e}")
+        raise ApiError(500, 'Failed to fetch games')
+
+
+@app.get('/api/games/{game_id}')
+async def get_game_details(game_id: str, user: Dict = Depends(current_user)):
+    """Get detailed information about a specific game"""
+    game = await async_db.run_sync(game_catalog.get, game_id)
+    if not game:
+        raise ApiError(404, 'Game not found')
+
+    try:
+        totals, progress, unlocked = await asyncio.gather(
+            async_db.run_sync(load_game_totals, user['id'], game_id),
+            async_db.fetch_all(
+                """SELECT score, time_spent, completed_at, xp_earned
+                   FROM game_progress
+                   WHERE user_id = %s AND game_id = %s
+                   ORDER BY completed_at DESC
+                   LIMIT 10""",
+                (user['id'], game_id)
+            ),
+            async_db.run_sync(check_unlock_statuses, user['id'], [game])
+        )
+        game.update(totals)
+        game['recent_progress'] = progress
+        game['is_unlocked'] = unlocked[game_id]
+
+        return jsonify({'success': True, 'game': game})
+
+    except Exception as e:
+        logger.error(f"Error fetching game details: {e}")
+        raise ApiError(500, 'Failed to fetch game details')
+
+# Game Progress Endpoints
+
+@app.post('/api/games/{game_id}/start')
+async def start_game_session(game_id: str, user: Dict = Depends(current_user)):
+    """Start a new game session"""
+    game = await async_db.run_sync(game_catalog.get, game_id)
+    if not game:
+        raise ApiError(404, 'Game not found')
+
+    try:
+        unlocked = await async_db.run_sync(check_unlock_statuses, user['id'], [game])
+        if not unlocked[game_id]:
+            raise ApiError(403, 'Game is locked')
+
+        session_id = str(uuid.uuid4())
+        now = datetime.now()
+        await async_db.execute(
+            """INSERT INTO game_sessions (id, user_id, game_id, started_at, last_activity, is_active)
+               VALUES (%s, %s, %s, %s, %s, %s)""",
+            (session_id, user['id'], game_id, now, now, True)
+        )
+        session_store.register(session_id, user['id'])
+        # Writes directly when the analytics buffer is disabled or blocks on a full queue
+        await async_db.run_sync(log_analytics_event, user['id'], game_id, session_id, 'game_start')
+
+        return jsonify({'success': True, 'session_id': session_id, 'game': game})
+
+    except ApiError:
+        raise
+    except Exception as e:
+        logger.error(f"Error starting game session: {e}")
+        raise ApiError(500, 'Failed to start game session')
+
+
+@app.post('/api/games/{game_id}/progress')
+async def save_game_progress(game_id: str, request: Request, user: Dict = Depends(current_user)):
+    """Save game progress and completion"""
+    try:
+        data = await request.json()
+
+        for field in ('session_id', 'score', 'time_spent', 'completed'):
+            if field not in data:
+                raise ApiError(400, f'Missing required field: {field}')
+
+        session_id = data['session_id']
+        score = int(data['score'])
+        time_spent = int(data['time_spent'])
+        completed = bool(data['completed'])
+        hints_used = int(data.get('hints_used', 0))
+        mistakes = int(data.get('mistakes', 0))
+        game_state = data.get('game_state', {})
+
+        # Verify the session belongs to the current user; known sessions are checked in memory
+        owner = session_store.owner(session_id)
+        if owner is None:
+            if not await async_db.fetch_one(PREPARED_QUERIES["session_for_user"], (session_id, user['id'])):
+                raise ApiError(403, 'Invalid session')
+            session_store.register(session_id, user['id'])
+        elif owner != user['id']:
+            raise ApiError(403, 'Invalid session')
+
+        game = await async_db.run_sync(game_catalog.get, game_id, False)
+        if not game:
+            raise ApiError(404, 'Game not found')
+
+        if completed:
+            result = await async_db.run_sync(record_game_completion, user['id'], game_id, session_id, game,
+                                             score, time_spent, hints_used, mistakes, game_state)
+            return jsonify({'success': True, **result})
+
+        # Save in-progress state; buffered and written behind in batches, or written
+        # directly when the store is disabled or full
+        if not await async_db.run_sync(session_store.save, session_id, user['id'], score, game_state):
+            raise ApiError(500, 'Failed to save progress')
+        return jsonify({'success': True, 'message': 'Progress saved'})
+
+    except ApiError:
+        raise
+    except Exception as e:
+        logger.error(f"Error saving game progress: {e}")
+        raise ApiError(500, 'Failed to save progress')
+
+# Student Statistics Endpoints
+
+@app.get('/api/student/stats')
+async def get_student_stats(request: Request, user: Dict = Depends(current_user)):
+    """Get comprehensive student statistics; supports If-None-Match"""
+    try:
+        snapshot = stats_cache.get(user['id'])
+        if snapshot is None:
+            generation = stats_cache.generation(user['id'])
+            stats = await async_db.run_sync(load_student_stats, user['id'])
+            snapshot = stats_cache.put(user['id'], stats, generation)
+
+        headers = {'ETag': quote_etag(snapshot.etag), 'Cache-Control': 'private, no-cache'}
+        if parse_etags(request.headers.get('If-None-Match')).contains_weak(snapshot.etag):
+            stats_cache.record_not_modified()
+            return Response(status_code=304, headers=headers)
+        return jsonify({'success': True, 'stats': snapshot.stats}, headers=headers)
+
+    except Exception as e:
+        logger.error(f"Error fetching student stats: {e}")
+        raise ApiError(500, 'Failed to fetch statistics')
+
+
+@app.get('/api/student/progress/{subject}')
+async def get_subject_progress(subject: str, cursor: Optional[str] = None, limit: Optional[int] = None,
+                               user: Dict = Depends(current_user)):
+    """Get detailed progress for a specific subject"""
+    if cursor:
+        try:
+            decode_cursor(cursor)
+        except ValueError:
+            raise ApiError(400, 'Invalid cursor')
+
+    try:
+        class_level = user.get('grade', 8)
+        games = await async_db.run_sync(game_catalog.find, subject, class_level)
+        mastery, (progress, next_cursor), progress_by_game = await asyncio.gather(
+            async_db.fetch_one(
+                """SELECT * FROM subject_mastery
+                   WHERE user_id = %s AND subject = %s AND class_level = %s""",
+                (user['id'], subject, class_level)
+            ),
+            async_db.run_sync(load_progress_page, user['id'], subject, cursor, limit),
+            async_db.run_sync(load_progress_by_game, user['id'], [game['id'] for game in games])
+        )
+
+        for game in games:
+            best_score, attempts = progress_by_game.get(game['id'], (0, 0))
+            game['is_completed'] = attempts > 0
+            game['best_score'] = best_score
+
+        return jsonify({
+            'success': True,
+            'subject': subject,
+            'mastery': mastery,
+            'recent_progress': progress,
+            'next_cursor': next_cursor,
+            'available_games': games
+        })
+
+    except Exception as e:
+        logger.error(f"Error fetching subject progress: {e}")
+        raise ApiError(500, 'Failed to fetch subject progress')
+
+
+@app.get('/api/student/progress/history/{progress_id}/state')
+async def get_progress_state(progress_id: int, user: Dict = Depends(current_user)):
+    """Get the final game state saved with one completed game"""
+    try:
+        state = await async_db.run_sync(load_progress_state, user['id'], progress_id)
+    except Exception as e:
+        logger.error(f"Error fetching progress state: {e}")
+        raise ApiError(500, 'Failed to fetch progress state')
+
+    if state is None:
+        raise ApiError(404, 'Progress not found')
+    return jsonify({'success': True, **state})
+
+# Achievement System Endpoints
+
+@app.get('/api/achievements')
+async def get_achievements(user: Dict = Depends(current_user)):
+    """Get all achievements and student's progress"""
+    try:
+        achievements = await async_db.fetch_all(
+            """SELECT a.*,
+                      CASE WHEN sa.user_id IS NOT NULL THEN TRUE ELSE FALSE END as is_unlocked,
+                      sa.unlocked_at
+               FROM achievements a
+               LEFT JOIN student_achievements sa ON a.id = sa.achievement_id AND sa.user_id = %s
+               WHERE a.is_active = TRUE
+               ORDER BY a.category, a.rarity, a.name""",
+            (user['id'],)
+        )
+
+        grouped_achievements = {}
+        for achievement in achievements:
+            grouped_achievements.setdefault(achievement['category'], []).append(achievement)
+
+        return jsonify({'success': True, 'achievements': grouped_achievements})
+
+    except Exception as e:
+        logger.error(f"Error fetching achievements: {e}")
+        raise ApiError(500, 'Failed to fetch achievements')
+
+# Leaderboard Endpoints
+
+@app.get('/api/leaderboard')
+async def get_leaderboard(request: Request, user: Dict = Depends(current_user)):
+    """Get leaderboard data"""
+    try:
+        leaderboard_type = request.query_params.get('type', 'overall')
+        leaderboard, current_user_rank = await async_db.run_sync(
+            leaderboard_service.leaderboard, leaderboard_type, request.query_params.get('subject'),
+            _int_arg(request, 'class_level'), _int_arg(request, 'limit', 50), user['id']
+        )
+
+        return jsonify({
+            'success': True,
+            'leaderboard': leaderboard or [],
+            'current_user_rank': current_user_rank,
+            'type': leaderboard_type
+        })
+
+    except Exception as e:
+        logger.error(f"Error fetching leaderboard: {e}")
+        raise ApiError(500, 'Failed to fetch leaderboard')
+
+# Metrics Endpoints
+
+@app.get('/api/metrics/stats-cache')
+async def stats_cache_metrics():
+    """Student stats snapshot cache hit ratio and staleness"""
+    return jsonify(stats_cache.stats())
+
+
+@app.get('/api/metrics/game-catalog')
+async def game_catalog_metrics():
+    """Catalog size, version stamp and reload counts"""
+    return jsonify(game_catalog.stats())
+
+
+@app.get('/api/metrics/session-store')
+async def session_store_metrics():
+    """Buffered session states, coalesced saves and flush counts"""
+    return jsonify(session_store.stats())
+
+
+@app.get('/api/metrics/auth')
+async def auth_metrics():
+    """Token cache hit ratio and rejection counts"""
+    return jsonify(token_verifier.stats())
+
+
+@app.get('/api/metrics/db-pool')
+async def db_pool_metrics():
+    """MySQL pool checkout wait times, in-use and overflow counts"""
+    return jsonify(get_connection_pool().stats())
+
+
+@app.get('/api/metrics/queries')
+async def query_metrics(limit: int = 50):
+    """Per-fingerprint query latency, rows and errors, pool waits and recent slow queries"""
+    return jsonify(get_query_metrics().snapshot(limit))
+
+
+if __name__ == "__main__":
+    uvicorn.run(app, host="127.0.0.1", port=8001)
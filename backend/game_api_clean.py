@@ -9,7 +9,9 @@ import json
 import hashlib
 import uuid
 from typing import Dict, List, Optional, Any
-from config import get_db_connection, execute_query, GAME_CONSTANTS, SUBJECT_CONFIG, BADGE_CONFIG
+from config import get_db_connection, execute_query, warm_up_pool, GAME_CONSTANTS, SUBJECT_CONFIG, BADGE_CONFIG
+from analytics_buffer import analytics_buffer
+from auth import token_verifier
 import logging
 
 # Setup logging
@@ -38,13 +40,9 @@ def require_auth(f):
     return decorated_function
 
 def verify_token(token: str) -> Optional[Dict]:
-    """Verify JWT token and return user data"""
+    """Verify a bearer token locally and return the cached user row"""
     try:
-        # This would integrate with your existing JWT verification
-        # For now, return a mock user for development
-        query = "SELECT * FROM users WHERE id = %s"
-        result = execute_query(query, (1,), fetch=True)
-        return result[0] if result else None
+        return token_verifier.verify(token)
     except Exception as e:
         logger.error(f"Token verification failed: {e}")
         return None
@@ -305,14 +303,10 @@ def calculate_level_info(total_points: int) -> Dict:
 
 def log_analytics_event(user_id: int, game_id: str, session_id: str, 
                        event_type: str, event_data: Dict = None):
-    """Log analytics event for reporting"""
+    """Queue an analytics event for reporting; written in batches off the request path"""
     try:
-        execute_query(
-            """INSERT INTO learning_analytics 
-               (user_id, game_id, session_id, event_type, event_data) 
-               VALUES (%s, %s, %s, %s, %s)""",
-            (user_id, game_id, session_id, event_type, json.dumps(event_data or {}))
-        )
+        if not analytics_buffer.log(user_id, game_id, session_id, event_type, event_data):
+            logger.warning(f"Analytics event dropped: {event_type} for game {game_id}")
     except Exception as e:
         logger.error(f"Error logging analytics event: {e}")
 
@@ -330,4 +324,5 @@ if __name__ == '__main__':
     print("🎮 Starting Odisha Education Game API...")
     print("📍 API will be available at: http://127.0.0.1:8001")
     print("🔗 Health check: http://127.0.0.1:8001/api/health")
+    warm_up_pool()
     app.run(debug=True, host='127.0.0.1', port=8001)
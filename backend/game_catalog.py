@@ -0,0 +1,175 @@
+# Process-local copy of the games table
+# The catalog is small and nearly static, so it is loaded once with its JSON
+# columns pre-parsed and indexed by id and by every (subject, class_level,
+# difficulty) filter combination. A daemon thread polls MAX(updated_at) and
+# COUNT(*) and reloads the catalog only when that version stamp changes.
+
+import json
+import threading
+import time
+from itertools import product
+from typing import Any, Dict, List, Optional, Tuple
+
+from config import GAME_CATALOG_CONFIG, execute_query
+
+JSON_COLUMNS = ("curriculum_data", "assets", "unlock_requirements")
+
+# games.difficulty is an ENUM, which MySQL orders by declaration index, not by name
+DIFFICULTY_ORDER = {"BEGINNER": 0, "INTERMEDIATE": 1, "ADVANCED": 2}
+
+VERSION_QUERY = "SELECT MAX(updated_at) AS updated_at, COUNT(*) AS games FROM games"
+
+FilterKey = Tuple[Optional[str], Optional[int], Optional[str]]
+
+
+def _parse_json(value):
+    if isinstance(value, (bytes, bytearray)):
+        value = value.decode("utf-8")
+    if isinstance(value, str):
+        return json.loads(value) if value else None
+    return value
+
+
+def _filter_key(subject: Optional[str], class_level: Optional[int], difficulty: Optional[str]) -> FilterKey:
+    """Index key for a filter; matches case-insensitively like the games table's collation"""
+    return (subject.lower() if subject else None,
+            class_level or None,
+            difficulty.upper() if difficulty else None)
+
+
+class GameCatalog:
+    def __init__(self, config: Dict[str, Any] = None):
+        config = config or GAME_CATALOG_CONFIG
+        self.poll_interval_seconds = config["poll_interval_seconds"]
+
+        self._by_id: Dict[str, Dict[str, Any]] = {}
+        self._by_filter: Dict[FilterKey, List[Dict[str, Any]]] = {}
+        self._version: Optional[tuple] = None
+        self._loaded_at: Optional[float] = None
+        self._lock = threading.Lock()
+        self._reload_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._counters = {
+            "reloads": 0,
+            "polls": 0,
+            "poll_failures": 0
+        }
+
+    def _read_version(self) -> Optional[tuple]:
+        rows = execute_query(VERSION_QUERY, fetch=True)
+        if not rows:
+            return None
+        return rows[0]["updated_at"], rows[0]["games"]
+
+    def reload(self, version: Optional[tuple] = None) -> bool:
+        """Load the whole games table and swap in fresh indexes"""
+        with self._reload_lock:
+            if version is None:
+                version = self._read_version()
+            rows = execute_query("SELECT * FROM games", fetch=True)
+            if rows is None or version is None:
+                return False
+
+            by_id, by_filter = {}, {}
+            for row in rows:
+                for column in JSON_COLUMNS:
+                    if column in row:
+                        try:
+                            row[column] = _parse_json(row[column])
+                        except ValueError as e:
+                            print(f"❌ Invalid {column} JSON for game {row['id']}: {e}")
+                            # Unparseable unlock rules stay raw so unlock checks fail closed
+                            if column != "unlock_requirements":
+                                row[column] = None
+                by_id[row["id"]] = row
+
+            # Same order as ORDER BY class_level, difficulty, title under a case-insensitive collation
+            active = sorted((row for row in rows if row["is_active"]),
+                            key=lambda row: (row["class_level"],
+                                             DIFFICULTY_ORDER.get((row["difficulty"] or "").upper(), len(DIFFICULTY_ORDER)),
+                                             row["title"].casefold()))
+            for row in active:
+                subject, class_level, difficulty = _filter_key(row["subject"], row["class_level"], row["difficulty"])
+                for key in product((subject, None), (class_level, None), (difficulty, None)):
+                    by_filter.setdefault(key, []).append(row)
+
+            with self._lock:
+                self._by_id, self._by_filter = by_id, by_filter
+                self._version = version
+                self._loaded_at = time.time()
+                self._counters["reloads"] += 1
+            return True
+
+    def poll(self) -> bool:
+        """Reload if the games table changed since the last load; returns True if it reloaded"""
+        version = self._read_version()
+        with self._lock:
+            self._counters["polls"] += 1
+            if version is None:
+                self._counters["poll_failures"] += 1
+                return False
+            if version == self._version:
+                return False
+        return self.reload(version)
+
+    def _ensure_loaded(self):
+        if self._loaded_at is None and not self.reload() and self._loaded_at is None:
+            raise RuntimeError("Could not load the game catalog")
+        if self._thread is None:
+            self.start()
+
+    def get(self, game_id: str, active_only: bool = True) -> Optional[Dict[str, Any]]:
+        """A copy of one games row with parsed JSON columns, or None"""
+        self._ensure_loaded()
+        with self._lock:
+            row = self._by_id.get(game_id)
+        if row is None or (active_only and not row["is_active"]):
+            return None
+        return dict(row)
+
+    def find(self, subject: Optional[str] = None, class_level: Optional[int] = None,
+             difficulty: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Active games matching the given filters, ordered by class level, difficulty and title"""
+        self._ensure_loaded()
+        with self._lock:
+            rows = self._by_filter.get(_filter_key(subject, class_level, difficulty), [])
+        return [dict(row) for row in rows]
+
+    def _run(self):
+        while not self._stop.wait(self.poll_interval_seconds):
+            try:
+                self.poll()
+            except Exception as e:
+                print(f"❌ Game catalog poll failed: {e}")
+
+    def start(self):
+        """Start the background version poll"""
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="game-catalog", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            version = self._version
+            return {
+                "games": len(self._by_id),
+                "active_games": len(self._by_filter.get((None, None, None), [])),
+                "version": {"updated_at": str(version[0]), "games": version[1]} if version else None,
+                "loaded_at": self._loaded_at,
+                "poller_running": self._thread is not None and self._thread.is_alive(),
+                **self._counters
+            }
+
+
+# Initialize the game catalog
+game_catalog = GameCatalog()
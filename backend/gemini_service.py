@@ -1,14 +1,70 @@
 import google.generativeai as genai
+import asyncio
 import json
 import re
-from typing import List, Dict, Any
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Any, Tuple, AsyncIterator, Awaitable, Callable
 from models import (
     GeneratedQuestion, LessonContent, QuestionGenerationRequest,
     LessonGenerationRequest, AdaptiveQuestionRequest, MultilingualText,
     QuestionOptions, DifficultyLevel, QuestionType, Subject
 )
-from curriculum import get_curriculum_topics, get_cultural_contexts
-from config import GEMINI_API_KEY
+from curriculum import get_curriculum_topics, get_cultural_contexts, resolve_topic
+from config import GEMINI_API_KEY, GEMINI_CONFIG
+from question_cache import question_cache, make_cache_key
+
+class IncrementalQuestionParser:
+    """Pull complete question objects out of a partially received JSON response
+    
+    Understands both {"questions": [{...}, ...]} and a bare [{...}, ...] array.
+    Text before the first bracket (such as a markdown code fence) is ignored.
+    """
+    
+    def __init__(self):
+        self._buffer = []
+        self._stack = []
+        self._in_string = False
+        self._escaped = False
+        self._capturing = False
+    
+    def feed(self, text: str) -> List[Dict[str, Any]]:
+        """Consume the next chunk and return any question objects it completed"""
+        completed = []
+        
+        for char in text:
+            if self._capturing:
+                self._buffer.append(char)
+            
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif char == "\\":
+                    self._escaped = True
+                elif char == '"':
+                    self._in_string = False
+                continue
+            
+            if char == '"':
+                self._in_string = bool(self._stack)
+            elif char in "{[":
+                self._stack.append(char)
+                if char == "{" and self._stack in (["{", "[", "{"], ["[", "{"]):
+                    self._capturing = True
+                    self._buffer = [char]
+            elif char in "}]":
+                if not self._stack:
+                    continue
+                self._stack.pop()
+                if char == "}" and self._capturing and self._stack in (["{", "["], ["["]):
+                    raw = "".join(self._buffer)
+                    self._capturing = False
+                    self._buffer = []
+                    try:
+                        completed.append(json.loads(raw))
+                    except json.JSONDecodeError as e:
+                        print(f"Skipping unparseable streamed question: {str(e)}")
+        
+        return completed
 
 class GeminiContentService:
     def __init__(self):
@@ -16,7 +72,73 @@ class GeminiContentService:
             raise ValueError("GEMINI_API_KEY not found in environment variables")
         
         genai.configure(api_key=GEMINI_API_KEY)
-        self.model = genai.GenerativeModel('gemini-pro')
+        self.model = genai.GenerativeModel(GEMINI_CONFIG["model_name"])
+        
+        # Bound the number of generations in flight so one worker can serve many
+        # requests without flooding the upstream API
+        self.max_concurrency = GEMINI_CONFIG["max_concurrency"]
+        self.request_timeout = GEMINI_CONFIG["request_timeout"]
+        self.use_async_api = GEMINI_CONFIG["use_async_api"]
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.max_concurrency, thread_name_prefix="gemini"
+        )
+        
+        # Single-flight: identical concurrent requests await one shared upstream call
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self._flight_counters = {"leaders": 0, "coalesced": 0}
+        self._background_tasks = set()
+    
+    def _spawn(self, coro):
+        """Run a coroutine off the request path, keeping a reference until it finishes"""
+        task = asyncio.get_running_loop().create_task(coro)
+        self._background_tasks.add(task)
+        task.add_done_callback(self._background_tasks.discard)
+    
+    async def _single_flight(self, key: str, factory: Callable[[], Awaitable[Any]]):
+        """Run factory() once per key among concurrent callers and share its result
+        
+        Each waiter awaits the shared task through asyncio.shield, so cancelling one
+        waiter never cancels the upstream call; failures propagate to every waiter.
+        """
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.get_running_loop().create_task(factory())
+            self._inflight[key] = task
+            task.add_done_callback(lambda done: self._finish_flight(key, done))
+            self._flight_counters["leaders"] += 1
+        else:
+            self._flight_counters["coalesced"] += 1
+        
+        return await asyncio.shield(task)
+    
+    def _finish_flight(self, key: str, task: asyncio.Task):
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        if not task.cancelled():
+            # Mark the exception as retrieved even if every waiter went away
+            task.exception()
+    
+    def single_flight_stats(self) -> Dict[str, Any]:
+        """Counters for request coalescing"""
+        return {"in_flight": len(self._inflight), **self._flight_counters}
+    
+    async def _generate(self, prompt: str):
+        """Run one Gemini generation without blocking the event loop"""
+        async with self._semaphore:
+            if self.use_async_api:
+                call = self.model.generate_content_async(prompt)
+            else:
+                loop = asyncio.get_running_loop()
+                call = loop.run_in_executor(self._executor, self.model.generate_content, prompt)
+            return await asyncio.wait_for(call, timeout=self.request_timeout)
+    
+    async def ping(self):
+        """Cheap upstream round trip used by health checks (token count, no generation)"""
+        if self.use_async_api:
+            return await self.model.count_tokens_async("ping")
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, self.model.count_tokens, "ping")
     
     def _clean_json_response(self, text: str) -> str:
         """Clean and extract JSON from Gemini response"""
@@ -31,20 +153,68 @@ class GeminiContentService:
         
         raise ValueError("No valid JSON found in response")
     
+    def resolve_topic(self, grade: int, subject: str, requested_topic: str) -> Tuple[str, List[str]]:
+        """Map a requested topic onto the curriculum, returning it with the grade's topics"""
+        curriculum_topics = get_curriculum_topics(grade, subject)
+        
+        match = resolve_topic(grade, subject, requested_topic)
+        relevant_topic = match.topic if match else requested_topic
+        
+        return relevant_topic, curriculum_topics
+    
+    def _build_question(self, q_data: Dict[str, Any], index: int, request: QuestionGenerationRequest,
+                        relevant_topic: str) -> GeneratedQuestion:
+        """Convert one question object from the model output into a GeneratedQuestion"""
+        return GeneratedQuestion(
+            id=f"{request.subject.value}_{request.grade}_{index+1}_{hash(str(q_data)) % 10000}",
+            type=QuestionType(q_data.get("type", "multiple-choice")),
+            question=MultilingualText(**q_data["question"]),
+            options=QuestionOptions(**q_data["options"]) if q_data.get("options") else None,
+            correctAnswer=q_data["correctAnswer"],
+            explanation=MultilingualText(**q_data["explanation"]),
+            hint=MultilingualText(**q_data["hint"]) if q_data.get("hint") else None,
+            culturalContext=MultilingualText(**q_data["culturalContext"]) if q_data.get("culturalContext") else None,
+            difficulty=DifficultyLevel(q_data.get("difficulty", request.difficulty.value)),
+            topic=q_data.get("topic", relevant_topic),
+            grade=q_data.get("grade", request.grade),
+            subject=Subject(q_data.get("subject", request.subject.value))
+        )
+    
     async def generate_questions(self, request: QuestionGenerationRequest) -> List[GeneratedQuestion]:
-        """Generate questions based on Odisha curriculum"""
+        """Generate questions based on Odisha curriculum, serving repeats from the question cache"""
         
-        curriculum_topics = get_curriculum_topics(request.grade, request.subject.value)
-        cultural_contexts = get_cultural_contexts(request.subject.value)
+        relevant_topic, curriculum_topics = self.resolve_topic(
+            request.grade, request.subject.value, request.topic
+        )
+        cache_key = make_cache_key(request, relevant_topic)
         
-        # Find relevant curriculum topic
-        relevant_topic = request.topic
-        for topic in curriculum_topics:
-            if request.topic.lower() in topic.lower() or topic.lower() in request.topic.lower():
-                relevant_topic = topic
-                break
+        questions = question_cache.get(cache_key)
+        if questions is None:
+            questions = await question_cache.load_persistent(cache_key)
+        if questions is not None:
+            return questions
         
-        prompt = f"""
+        return await self._single_flight(
+            "questions:" + cache_key,
+            lambda: self._generate_and_cache_questions(request, relevant_topic, curriculum_topics, cache_key)
+        )
+    
+    async def _generate_and_cache_questions(self, request: QuestionGenerationRequest, relevant_topic: str,
+                                            curriculum_topics: List[str], cache_key: str) -> List[GeneratedQuestion]:
+        questions = await self._generate_questions_live(request, relevant_topic, curriculum_topics)
+        
+        # The persistent write-through happens off the request path
+        question_cache.put(cache_key, questions)
+        self._spawn(question_cache.store_persistent(cache_key, request, relevant_topic, questions))
+        return questions
+    
+    def _build_questions_prompt(self, request: QuestionGenerationRequest, relevant_topic: str,
+                                curriculum_topics: List[str]) -> str:
+        """Build the question generation prompt"""
+        
+        cultural_contexts = get_cultural_contexts(request.subject.value)
+        
+        return f"""
 Generate {request.count} educational questions for Odisha Government State Board curriculum.
 
 CURRICULUM DETAILS:
@@ -117,30 +287,29 @@ IMPORTANT:
 - Include specific Odisha landmarks, festivals, or traditions in examples
 - Difficulty should match the requested level: {request.difficulty.value}
 """
-
+    
+    async def generate_fresh_questions(self, request: QuestionGenerationRequest) -> List[GeneratedQuestion]:
+        """Generate new questions, bypassing the question cache (used to fill the question bank)"""
+        relevant_topic, curriculum_topics = self.resolve_topic(
+            request.grade, request.subject.value, request.topic
+        )
+        return await self._generate_questions_live(request, relevant_topic, curriculum_topics)
+    
+    async def _generate_questions_live(self, request: QuestionGenerationRequest, relevant_topic: str,
+                                       curriculum_topics: List[str]) -> List[GeneratedQuestion]:
+        """Generate questions with a Gemini round trip"""
+        
+        prompt = self._build_questions_prompt(request, relevant_topic, curriculum_topics)
+        
         try:
-            response = self.model.generate_content(prompt)
+            response = await self._generate(prompt)
             cleaned_json = self._clean_json_response(response.text)
             
             data = json.loads(cleaned_json)
             questions = []
             
             for i, q_data in enumerate(data.get("questions", [])):
-                question = GeneratedQuestion(
-                    id=f"{request.subject.value}_{request.grade}_{i+1}_{hash(str(q_data)) % 10000}",
-                    type=QuestionType(q_data.get("type", "multiple-choice")),
-                    question=MultilingualText(**q_data["question"]),
-                    options=QuestionOptions(**q_data["options"]) if q_data.get("options") else None,
-                    correctAnswer=q_data["correctAnswer"],
-                    explanation=MultilingualText(**q_data["explanation"]),
-                    hint=MultilingualText(**q_data["hint"]) if q_data.get("hint") else None,
-                    culturalContext=MultilingualText(**q_data["culturalContext"]) if q_data.get("culturalContext") else None,
-                    difficulty=DifficultyLevel(q_data.get("difficulty", request.difficulty.value)),
-                    topic=q_data.get("topic", relevant_topic),
-                    grade=q_data.get("grade", request.grade),
-                    subject=Subject(q_data.get("subject", request.subject.value))
-                )
-                questions.append(question)
+                questions.append(self._build_question(q_data, i, request, relevant_topic))
             
             return questions
             
@@ -148,17 +317,92 @@ IMPORTANT:
             print(f"Error generating questions: {str(e)}")
             raise Exception(f"Failed to generate questions: {str(e)}")
     
+    async def generate_questions_stream(self, request: QuestionGenerationRequest) -> AsyncIterator[GeneratedQuestion]:
+        """Yield questions one by one as soon as each JSON object is complete"""
+        
+        relevant_topic, curriculum_topics = self.resolve_topic(
+            request.grade, request.subject.value, request.topic
+        )
+        cache_key = make_cache_key(request, relevant_topic)
+        
+        cached = question_cache.get(cache_key)
+        if cached is None:
+            cached = await question_cache.load_persistent(cache_key)
+        if cached is not None:
+            for question in cached:
+                yield question
+            return
+        
+        if not self.use_async_api:
+            # The executor path has no streaming API; emit the full result at once
+            for question in await self.generate_questions(request):
+                yield question
+            return
+        
+        # The upstream stream is drained into a queue by a background task, so the
+        # concurrency slot and timeout cover only Gemini and not how fast the client reads
+        prompt = self._build_questions_prompt(request, relevant_topic, curriculum_topics)
+        queue: asyncio.Queue = asyncio.Queue()
+        self._spawn(self._drain_question_stream(prompt, request, relevant_topic, cache_key, queue))
+        
+        while True:
+            item = await queue.get()
+            if item is None:
+                return
+            if isinstance(item, Exception):
+                print(f"Error streaming questions: {str(item)}")
+                raise Exception(f"Failed to generate questions: {str(item)}")
+            yield item
+    
+    async def _drain_question_stream(self, prompt: str, request: QuestionGenerationRequest, relevant_topic: str,
+                                     cache_key: str, queue: asyncio.Queue):
+        """Read a streamed generation into queue: each question as it parses, then None or the error"""
+        parser = IncrementalQuestionParser()
+        questions = []
+        
+        async def read():
+            response = await self.model.generate_content_async(prompt, stream=True)
+            async for chunk in response:
+                for q_data in parser.feed(chunk.text):
+                    try:
+                        question = self._build_question(q_data, len(questions), request, relevant_topic)
+                    except Exception as e:
+                        print(f"Skipping malformed streamed question: {str(e)}")
+                        continue
+                    questions.append(question)
+                    queue.put_nowait(question)
+        
+        try:
+            async with self._semaphore:
+                await asyncio.wait_for(read(), timeout=self.request_timeout)
+        except Exception as e:
+            queue.put_nowait(e)
+            return
+        
+        queue.put_nowait(None)
+        # Cached even if the client stopped reading part way through
+        if questions:
+            question_cache.put(cache_key, questions)
+            await question_cache.store_persistent(cache_key, request, relevant_topic, questions)
+    
     async def generate_lesson_content(self, request: LessonGenerationRequest) -> LessonContent:
-        """Generate comprehensive lesson content based on Odisha curriculum"""
+        """Generate comprehensive lesson content, sharing one upstream call between identical requests"""
         
-        curriculum_topics = get_curriculum_topics(request.grade, request.subject.value)
-        cultural_contexts = get_cultural_contexts(request.subject.value)
+        relevant_topic, curriculum_topics = self.resolve_topic(
+            request.grade, request.subject.value, request.topic
+        )
+        flight_key = "lesson:" + make_cache_key(request, relevant_topic)
         
-        relevant_topic = request.topic
-        for topic in curriculum_topics:
-            if request.topic.lower() in topic.lower() or topic.lower() in request.topic.lower():
-                relevant_topic = topic
-                break
+        return await self._single_flight(
+            flight_key,
+            lambda: self._generate_lesson_live(request, relevant_topic, curriculum_topics)
+        )
+    
+    async def _generate_lesson_live(self, request: LessonGenerationRequest, relevant_topic: str,
+                                    curriculum_topics: List[str]) -> LessonContent:
+        """Generate lesson content with a Gemini round trip"""
+        
+        cultural_contexts = get_cultural_contexts(request.subject.value)
         
         prompt = f"""
 Create comprehensive lesson content for Odisha Government State Board curriculum.
@@ -228,7 +472,7 @@ Use specific Odisha examples like:
 """
 
         try:
-            response = self.model.generate_content(prompt)
+            response = await self._generate(prompt)
             cleaned_json = self._clean_json_response(response.text)
             
             data = json.loads(cleaned_json)
@@ -249,8 +493,8 @@ Use specific Odisha examples like:
             print(f"Error generating lesson content: {str(e)}")
             raise Exception(f"Failed to generate lesson content: {str(e)}")
     
-    async def generate_adaptive_questions(self, request: AdaptiveQuestionRequest) -> List[GeneratedQuestion]:
-        """Generate adaptive questions based on student performance"""
+    def build_adaptive_request(self, request: AdaptiveQuestionRequest) -> QuestionGenerationRequest:
+        """Turn student performance into a concrete question generation request"""
         
         # Determine difficulty based on performance
         avg_score = request.studentPerformance.averageScore
@@ -267,15 +511,17 @@ Use specific Odisha examples like:
             focus_topics = get_curriculum_topics(request.grade, request.subject.value)[:3]
         
         # Create question generation request for adaptive content
-        question_request = QuestionGenerationRequest(
+        return QuestionGenerationRequest(
             subject=request.subject,
             grade=request.grade,
             topic=focus_topics[0] if focus_topics else "General",
             count=5,
             difficulty=difficulty
         )
-        
-        return await self.generate_questions(question_request)
+    
+    async def generate_adaptive_questions(self, request: AdaptiveQuestionRequest) -> List[GeneratedQuestion]:
+        """Generate adaptive questions based on student performance"""
+        return await self.generate_questions(self.build_adaptive_request(request))
 
 # Initialize the service
 gemini_service = GeminiContentService()
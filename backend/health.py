@@ -0,0 +1,136 @@
+# Background health monitoring for the Gemini API service
+# Deep checks of Gemini and MySQL run on a timer; probes only read the cached results.
+
+import asyncio
+import time
+from datetime import datetime, timezone
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from config import HEALTH_CONFIG
+from async_db import async_db
+from gemini_service import gemini_service
+
+
+def _utc_iso(timestamp: Optional[float]) -> Optional[str]:
+    if timestamp is None:
+        return None
+    return datetime.fromtimestamp(timestamp, tz=timezone.utc).isoformat()
+
+
+async def check_gemini():
+    """Gemini is reachable and the API key is accepted"""
+    await gemini_service.ping()
+
+
+async def check_database():
+    """MySQL answers a trivial query through the pool"""
+    await async_db.fetch_one("SELECT 1 AS ok")
+
+
+class ComponentHealth:
+    def __init__(self, name: str, check: Callable[[], Awaitable[Any]], critical: bool):
+        self.name = name
+        self.check = check
+        self.critical = critical
+        self.healthy: Optional[bool] = None
+        self.last_check: Optional[float] = None
+        self.last_success: Optional[float] = None
+        self.latency_ms: Optional[float] = None
+        self.consecutive_failures = 0
+        self.error: Optional[str] = None
+
+    def to_dict(self, stale_after: float) -> Dict[str, Any]:
+        stale = self.last_success is None or time.time() - self.last_success > stale_after
+        return {
+            "healthy": bool(self.healthy) and not stale,
+            "critical": self.critical,
+            "last_check": _utc_iso(self.last_check),
+            "last_success": _utc_iso(self.last_success),
+            "latency_ms": self.latency_ms,
+            "consecutive_failures": self.consecutive_failures,
+            "error": self.error
+        }
+
+
+class HealthMonitor:
+    def __init__(self, config: Dict[str, Any] = None):
+        config = config or HEALTH_CONFIG
+        self.check_interval_seconds = config["check_interval_seconds"]
+        self.check_timeout_seconds = config["check_timeout_seconds"]
+        self.stale_after_seconds = config["stale_after_seconds"]
+        self.started_at = time.time()
+
+        self.components = {
+            "gemini_api": ComponentHealth("gemini_api", check_gemini, critical=True),
+            "database": ComponentHealth("database", check_database, critical=False)
+        }
+        self._task: Optional[asyncio.Task] = None
+
+    async def _check(self, component: ComponentHealth):
+        started = time.perf_counter()
+        try:
+            await asyncio.wait_for(component.check(), timeout=self.check_timeout_seconds)
+            component.healthy = True
+            component.error = None
+            component.consecutive_failures = 0
+            component.last_success = time.time()
+        except Exception as e:
+            component.healthy = False
+            component.error = str(e) or type(e).__name__
+            component.consecutive_failures += 1
+        finally:
+            component.latency_ms = round((time.perf_counter() - started) * 1000, 2)
+            component.last_check = time.time()
+
+    async def run_checks(self):
+        """Run every deep check once, concurrently"""
+        await asyncio.gather(*(self._check(c) for c in self.components.values()))
+
+    async def _run(self):
+        while True:
+            try:
+                await self.run_checks()
+            except Exception as e:
+                print(f"❌ Health monitor error: {e}")
+            await asyncio.sleep(self.check_interval_seconds)
+
+    def start(self):
+        """Start the background checker on the running event loop"""
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        """Stop the background checker"""
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    def readiness(self) -> Dict[str, Any]:
+        """Summarise the cached check results; never runs a check itself"""
+        components = {name: c.to_dict(self.stale_after_seconds) for name, c in self.components.items()}
+
+        if any(c.last_check is None for c in self.components.values()):
+            status = "starting"
+        elif all(state["healthy"] for state in components.values()):
+            status = "ready"
+        elif all(state["healthy"] for state in components.values() if state["critical"]):
+            status = "degraded"
+        else:
+            status = "unavailable"
+
+        return {
+            "status": status,
+            "ready": status in ("ready", "degraded"),
+            "uptime_seconds": round(time.time() - self.started_at, 1),
+            "check_interval_seconds": self.check_interval_seconds,
+            "components": components
+        }
+
+
+# Initialize the monitor
+health_monitor = HealthMonitor()
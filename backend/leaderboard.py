@@ -0,0 +1,351 @@
+# Precomputed leaderboards for the game API
+# Boards are rebuilt from MySQL on the LEADERBOARD_CONFIG refresh intervals, kept
+# current in memory on score events, and materialized into game_leaderboards.
+# Each board is a sorted list of (-points, user_id) keys, so top-N is a slice and
+# "my rank" is a bisect.
+
+import threading
+import time
+from bisect import bisect_left, insort
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+from config import LEADERBOARD_CONFIG, db_transaction, execute_many, execute_query
+
+BoardKey = Tuple[str, Optional[str], Optional[int]]  # (board type, subject, class level)
+
+# LEADERBOARD_CONFIG category -> board type it rebuilds
+CATEGORY_BOARDS = {
+    "overall": "overall",
+    "weekly": "weekly",
+    "subject_wise": "subject"
+}
+
+PROFILE_FIELDS = ("name", "avatar", "grade", "level", "current_streak")
+
+# Entry fields used for ranking and materialization but not returned by the leaderboard API
+PRIVATE_FIELDS = ("user_id", "grade")
+
+
+class Board:
+    """One ranking, ordered by points descending then user id"""
+
+    def __init__(self):
+        self._keys: List[Tuple[int, int]] = []
+        self._entries: Dict[int, Dict[str, Any]] = {}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def upsert(self, user_id: int, entry: Dict[str, Any]):
+        """Insert or replace a user's entry and re-position it"""
+        old = self._entries.get(user_id)
+        if old is not None:
+            del self._keys[bisect_left(self._keys, (-old["total_points"], user_id))]
+        self._entries[user_id] = entry
+        insort(self._keys, (-entry["total_points"], user_id))
+
+    def get(self, user_id: int) -> Optional[Dict[str, Any]]:
+        return self._entries.get(user_id)
+
+    def top(self, limit: int) -> List[Dict[str, Any]]:
+        """The first `limit` entries with their row number"""
+        return [
+            {**self._entries[user_id], "rank_position": position}
+            for position, (_, user_id) in enumerate(self._keys[:limit], start=1)
+        ]
+
+    def rank(self, user_id: int) -> Optional[int]:
+        """1 + the number of users with strictly more points; None when not on the board"""
+        entry = self._entries.get(user_id)
+        if entry is None:
+            return None
+        return bisect_left(self._keys, (-entry["total_points"], -1)) + 1
+
+
+def _week_start(now: datetime) -> datetime:
+    monday = now - timedelta(days=now.weekday())
+    return monday.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+class LeaderboardService:
+    def __init__(self, config: Dict[str, Any] = None):
+        config = config or LEADERBOARD_CONFIG
+        self.refresh_intervals = {
+            category: interval for category, interval in config["refresh_intervals"].items()
+            if category in CATEGORY_BOARDS
+        }
+        self.max_entries = config["max_entries"]
+        self.materialize_interval = config["materialize_interval"]
+
+        self._boards: Dict[BoardKey, Board] = {}
+        self._profiles: Dict[int, Dict[str, Any]] = {}
+        self._refreshed_at: Dict[str, float] = {}
+        self._dirty = set()
+        self._week_start: Optional[datetime] = None
+        self._lock = threading.RLock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._counters = {
+            "refreshes": 0,
+            "refresh_failures": 0,
+            "score_events": 0,
+            "materializations": 0,
+            "materialize_failures": 0
+        }
+
+    # ---- building ----
+
+    def _fetch(self, query: str, params=None) -> List[Dict[str, Any]]:
+        rows = execute_query(query, params, fetch=True)
+        if rows is None:
+            raise RuntimeError("leaderboard query failed")
+        return rows
+
+    def _load_profiles(self):
+        rows = self._fetch(
+            """SELECT u.id AS user_id, u.name, u.avatar, u.grade,
+                      gs.level, gs.total_points, gs.games_completed, gs.average_score, gs.current_streak
+               FROM game_stats gs
+               JOIN users u ON gs.user_id = u.id
+               WHERE u.role = 'student'"""
+        )
+        self._profiles = {row["user_id"]: {field: row[field] for field in PROFILE_FIELDS} for row in rows}
+        return rows
+
+    def _entry(self, user_id: int, total_points, games_completed, average_score) -> Dict[str, Any]:
+        profile = self._profiles.get(user_id, {})
+        return {
+            "user_id": user_id,
+            **{field: profile.get(field) for field in PROFILE_FIELDS},
+            "total_points": int(total_points or 0),
+            "games_completed": int(games_completed or 0),
+            "average_score": float(average_score or 0)
+        }
+
+    def _replace_boards(self, board_type: str, rows: List[Dict[str, Any]]):
+        """Swap in every board of one type, split by subject and class level"""
+        boards: Dict[BoardKey, Board] = {}
+        for row in rows:
+            entry = self._entry(row["user_id"], row["total_points"], row["games_completed"], row["average_score"])
+            subject = row.get("subject")
+            for class_level in {None, entry["grade"]}:
+                boards.setdefault((board_type, subject, class_level), Board()).upsert(row["user_id"], entry)
+
+        for key in [key for key in self._boards if key[0] == board_type]:
+            del self._boards[key]
+        self._boards.update(boards)
+        self._dirty.update(boards)
+
+    def refresh(self, category: str):
+        """Rebuild the boards of one LEADERBOARD_CONFIG category from MySQL"""
+        board_type = CATEGORY_BOARDS[category]
+        try:
+            if board_type == "overall":
+                rows = self._load_profiles()
+            elif board_type == "weekly":
+                week_start = _week_start(datetime.now())
+                rows = self._fetch(
+                    """SELECT gp.user_id, SUM(gp.xp_earned) AS total_points,
+                              COUNT(*) AS games_completed, AVG(gp.score) AS average_score
+                       FROM game_progress gp
+                       JOIN users u ON gp.user_id = u.id
+                       WHERE u.role = 'student' AND gp.completed_at >= %s
+                       GROUP BY gp.user_id""",
+                    (week_start,)
+                )
+            else:
+                rows = self._fetch(
+                    """SELECT sm.user_id, sm.subject, SUM(sm.total_xp) AS total_points,
+                              SUM(sm.games_completed) AS games_completed, AVG(sm.average_score) AS average_score
+                       FROM subject_mastery sm
+                       JOIN users u ON sm.user_id = u.id
+                       WHERE u.role = 'student'
+                       GROUP BY sm.user_id, sm.subject"""
+                )
+        except Exception:
+            self._counters["refresh_failures"] += 1
+            raise
+
+        with self._lock:
+            if board_type == "weekly":
+                self._week_start = week_start
+            self._replace_boards(board_type, rows)
+            self._refreshed_at[category] = time.monotonic()
+            self._counters["refreshes"] += 1
+
+    def _ensure_loaded(self):
+        if len(self._refreshed_at) < len(self.refresh_intervals):
+            with self._lock:
+                for category in self.refresh_intervals:
+                    if category not in self._refreshed_at:
+                        self.refresh(category)
+            self.start()
+        elif self._week_start != _week_start(datetime.now()):
+            try:
+                self.refresh("weekly")
+            except Exception as e:
+                print(f"❌ Leaderboard refresh failed for weekly: {e}")
+
+    # ---- reads ----
+
+    def leaderboard(self, board_type: str, subject: Optional[str], class_level: Optional[int],
+                    limit: int, user_id: int) -> Tuple[List[Dict[str, Any]], Optional[int]]:
+        """Top entries of a board and the caller's rank on it"""
+        if board_type not in ("overall", "weekly", "subject"):
+            board_type = "overall"
+        if board_type != "subject":
+            subject = None
+
+        self._ensure_loaded()
+        with self._lock:
+            board = self._boards.get((board_type, subject, class_level))
+            if board is None:
+                return [], None
+            entries = board.top(max(0, min(limit, self.max_entries)))
+            rank = board.rank(user_id)
+        return [{field: value for field, value in entry.items() if field not in PRIVATE_FIELDS}
+                for entry in entries], rank
+
+    # ---- score events ----
+
+    def _load_profile(self, user_id: int) -> Optional[Dict[str, Any]]:
+        rows = execute_query(
+            """SELECT u.name, u.avatar, u.grade, gs.level, gs.current_streak
+               FROM users u
+               LEFT JOIN game_stats gs ON gs.user_id = u.id
+               WHERE u.id = %s AND u.role = 'student'""",
+            (user_id,), fetch=True
+        )
+        return {field: rows[0][field] for field in PROFILE_FIELDS} if rows else None
+
+    def _add_points(self, key: BoardKey, user_id: int, points: int, score: Optional[int]):
+        board = self._boards.setdefault(key, Board())
+        entry = dict(board.get(user_id) or self._entry(user_id, 0, 0, 0))
+        entry["total_points"] += points
+        if score is not None:
+            total = entry["average_score"] * entry["games_completed"] + score
+            entry["games_completed"] += 1
+            entry["average_score"] = round(total / entry["games_completed"], 2)
+        board.upsert(user_id, entry)
+        self._dirty.add(key)
+
+    def _record(self, user_id: int, points: int, subject: Optional[str], score: Optional[int]):
+        if not self._refreshed_at:
+            return  # Nothing built yet; the first read loads current totals
+
+        if user_id not in self._profiles:
+            profile = self._load_profile(user_id)
+            if profile is None:
+                return  # Only students are ranked
+            with self._lock:
+                self._profiles[user_id] = profile
+
+        with self._lock:
+            self._counters["score_events"] += 1
+            grade = self._profiles[user_id]["grade"]
+            board_keys = [("overall", None)]
+            if score is not None:
+                # The weekly refresh sums game_progress XP only, so bonus XP stays off the weekly board
+                board_keys.append(("weekly", None))
+                if subject:
+                    board_keys.append(("subject", subject))
+            for board_type, board_subject in board_keys:
+                for class_level in {None, grade}:
+                    self._add_points((board_type, board_subject, class_level), user_id, points, score)
+
+    def record_game_completion(self, user_id: int, subject: Optional[str], xp_earned: int, score: int):
+        """Apply a completed game to the overall, weekly and subject boards"""
+        self._record(user_id, xp_earned, subject, score)
+
+    def record_bonus_xp(self, user_id: int, xp: int):
+        """Apply XP that is not tied to a game, such as achievement rewards, to the overall boards"""
+        self._record(user_id, xp, None, None)
+
+    # ---- materialization ----
+
+    def materialize(self) -> int:
+        """Write the top entries of every changed board to game_leaderboards"""
+        with self._lock:
+            dirty = list(self._dirty)
+            self._dirty.clear()
+            snapshots = {key: self._boards[key].top(self.max_entries) for key in dirty if key in self._boards}
+            week_start = self._week_start
+
+        if not snapshots:
+            return 0
+
+        try:
+            with db_transaction() as cursor:
+                for (board_type, subject, class_level), rows in snapshots.items():
+                    table_type = "class" if board_type == "overall" and class_level is not None else board_type
+                    period = (week_start.date(), (week_start + timedelta(days=6)).date()) \
+                        if board_type == "weekly" and week_start else (None, None)
+
+                    cursor.execute(
+                        """DELETE FROM game_leaderboards
+                           WHERE leaderboard_type = %s AND subject <=> %s AND class_level <=> %s""",
+                        (table_type, subject, class_level)
+                    )
+                    execute_many(
+                        """INSERT INTO game_leaderboards
+                           (leaderboard_type, subject, class_level, period_start, period_end,
+                            user_id, rank_position, total_xp, games_completed, average_score)
+                           VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)""",
+                        [(table_type, subject, class_level, period[0], period[1], row["user_id"],
+                          row["rank_position"], row["total_points"], row["games_completed"],
+                          row["average_score"]) for row in rows],
+                        cursor=cursor
+                    )
+            self._counters["materializations"] += 1
+            return len(snapshots)
+        except Exception as e:
+            with self._lock:
+                self._dirty.update(snapshots)
+            self._counters["materialize_failures"] += 1
+            print(f"❌ Leaderboard materialization failed: {e}")
+            return 0
+
+    # ---- background worker ----
+
+    def _run(self):
+        while not self._stop.wait(self.materialize_interval):
+            now = time.monotonic()
+            for category, interval in self.refresh_intervals.items():
+                if now - self._refreshed_at.get(category, 0) >= interval:
+                    try:
+                        self.refresh(category)
+                    except Exception as e:
+                        print(f"❌ Leaderboard refresh failed for {category}: {e}")
+            self.materialize()
+
+    def start(self):
+        """Start the background refresh/materialize thread"""
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="leaderboard", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        """Stop the background thread and flush pending board changes"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self.materialize()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "boards": len(self._boards),
+                "ranked_users": len(self._profiles),
+                "dirty_boards": len(self._dirty),
+                "worker_running": self._thread is not None and self._thread.is_alive(),
+                **self._counters
+            }
+
+
+# Initialize the leaderboard service
+leaderboard_service = LeaderboardService()
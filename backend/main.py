@@ -1,17 +1,24 @@
-from fastapi import FastAPI, HTTPException, BackgroundTasks
+from fastapi import FastAPI, HTTPException, BackgroundTasks, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, StreamingResponse
+from starlette.routing import Match
 import uvicorn
-from typing import List
+from typing import List, Optional
 import asyncio
+import json
 
 from models import (
     QuestionGenerationRequest, LessonGenerationRequest, AdaptiveQuestionRequest,
     QuestionResponse, LessonResponse, ErrorResponse, GeneratedQuestion, LessonContent
 )
 from gemini_service import gemini_service
-from curriculum import get_curriculum_topics, get_cultural_contexts, get_all_grades, get_all_subjects
-from config import HOST, PORT, DEBUG, ALLOWED_ORIGINS
+from question_cache import question_cache
+from question_bank import question_bank
+from health import health_monitor
+from async_db import async_db
+from curriculum import get_curriculum_topics, get_cultural_contexts, get_all_grades, get_all_subjects, rank_topics
+from config import HOST, PORT, DEBUG, ALLOWED_ORIGINS, BATCH_CONFIG, warm_up_pool, get_connection_pool, get_query_metrics
+from query_metrics import track_route
 
 # Initialize FastAPI app
 app = FastAPI(
@@ -29,6 +36,32 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+@app.middleware("http")
+async def attribute_queries_to_route(request: Request, call_next):
+    """Attribute every query a request issues to its route template in /metrics/queries"""
+    route = "unmatched"
+    for candidate in app.router.routes:
+        match, _ = candidate.matches(request.scope)
+        if match == Match.FULL:
+            route = candidate.path
+            break
+    with track_route(f"{request.method} {route}"):
+        return await call_next(request)
+
+@app.on_event("startup")
+async def start_background_workers():
+    """Warm the database pool and start the health monitor and question bank refill worker"""
+    await async_db.run_sync(warm_up_pool)
+    health_monitor.start()
+    question_bank.start()
+
+@app.on_event("shutdown")
+async def stop_background_workers():
+    """Stop background workers"""
+    await question_bank.stop()
+    await health_monitor.stop()
+    async_db.close()
+
 @app.get("/")
 async def root():
     """Health check endpoint"""
@@ -38,33 +71,36 @@ async def root():
         "version": "1.0.0"
     }
 
+@app.get("/health/live")
+async def liveness_check():
+    """Liveness probe: the process is up and serving requests"""
+    return {"status": "alive"}
+
+@app.get("/health/ready")
+async def readiness_check():
+    """Readiness probe built from the cached background checks of Gemini and MySQL"""
+    readiness = health_monitor.readiness()
+    return JSONResponse(
+        status_code=200 if readiness["ready"] else 503,
+        content=readiness
+    )
+
 @app.get("/health")
 async def health_check():
-    """Detailed health check"""
-    try:
-        # Test Gemini service
-        test_request = QuestionGenerationRequest(
-            subject="science",
-            grade=8,
-            topic="Light",
-            count=1,
-            difficulty="easy"
-        )
-        await gemini_service.generate_questions(test_request)
-        
-        return {
-            "status": "healthy",
-            "gemini_api": "connected",
-            "curriculum_data": "loaded"
+    """Detailed health check (cached results, never triggers a generation)"""
+    readiness = health_monitor.readiness()
+    gemini = readiness["components"]["gemini_api"]
+    return JSONResponse(
+        status_code=200 if readiness["ready"] else 503,
+        content={
+            "status": "healthy" if readiness["ready"] else "unhealthy",
+            "readiness": readiness["status"],
+            "gemini_api": "connected" if gemini["healthy"] else "unavailable",
+            "curriculum_data": "loaded",
+            "uptime_seconds": readiness["uptime_seconds"],
+            "components": readiness["components"]
         }
-    except Exception as e:
-        return JSONResponse(
-            status_code=503,
-            content={
-                "status": "unhealthy",
-                "error": str(e)
-            }
-        )
+    )
 
 @app.get("/curriculum/grades")
 async def get_available_grades():
@@ -99,11 +135,25 @@ async def get_curriculum_topics_endpoint(grade: int, subject: str):
         "cultural_contexts": get_cultural_contexts(subject)
     }
 
+@app.get("/curriculum/{grade}/{subject}/resolve")
+async def resolve_curriculum_topic(grade: int, subject: str, topic: str, limit: int = 5):
+    """Rank curriculum topics matching a free-text topic"""
+    matches = rank_topics(grade, subject, topic, limit=min(max(limit, 1), 20))
+    return {
+        "grade": grade,
+        "subject": subject,
+        "query": topic,
+        "matches": [match._asdict() for match in matches]
+    }
+
 @app.post("/generate/questions", response_model=QuestionResponse)
 async def generate_questions_endpoint(request: QuestionGenerationRequest):
-    """Generate questions based on Odisha curriculum"""
+    """Generate questions based on Odisha curriculum, from the question bank when possible"""
     try:
-        questions = await gemini_service.generate_questions(request)
+        questions = question_bank.draw(request)
+        if questions is None:
+            question_bank.record_live()
+            questions = await gemini_service.generate_questions(request)
         
         return QuestionResponse(
             success=True,
@@ -118,6 +168,38 @@ async def generate_questions_endpoint(request: QuestionGenerationRequest):
             detail=f"Failed to generate questions: {str(e)}"
         )
 
+@app.post("/generate/questions/stream")
+async def generate_questions_stream_endpoint(request: QuestionGenerationRequest, format: str = "ndjson"):
+    """Stream questions as they are generated
+    
+    format=ndjson (default) emits one JSON object per line; format=sse emits
+    server-sent events. Every stream ends with a "done" or "error" message.
+    """
+    if format not in ("ndjson", "sse"):
+        raise HTTPException(status_code=400, detail="format must be 'ndjson' or 'sse'")
+    
+    def encode(event: str, payload: dict) -> str:
+        if format == "sse":
+            return f"event: {event}\ndata: {json.dumps(payload, ensure_ascii=False)}\n\n"
+        return json.dumps({"type": event, **payload}, ensure_ascii=False) + "\n"
+    
+    async def event_stream():
+        count = 0
+        try:
+            async for question in gemini_service.generate_questions_stream(request):
+                count += 1
+                yield encode("question", {"question": question.model_dump(mode="json")})
+            yield encode("done", {"count": count})
+        except Exception as e:
+            print(f"Error in generate_questions_stream_endpoint: {str(e)}")
+            yield encode("error", {"message": str(e), "count": count})
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream" if format == "sse" else "application/x-ndjson",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 @app.post("/generate/lesson", response_model=LessonResponse)
 async def generate_lesson_endpoint(request: LessonGenerationRequest):
     """Generate lesson content based on Odisha curriculum"""
@@ -141,7 +223,11 @@ async def generate_lesson_endpoint(request: LessonGenerationRequest):
 async def generate_adaptive_questions_endpoint(request: AdaptiveQuestionRequest):
     """Generate adaptive questions based on student performance"""
     try:
-        questions = await gemini_service.generate_adaptive_questions(request)
+        question_request = gemini_service.build_adaptive_request(request)
+        questions = question_bank.draw(question_request)
+        if questions is None:
+            question_bank.record_live()
+            questions = await gemini_service.generate_questions(question_request)
         
         return QuestionResponse(
             success=True,
@@ -156,39 +242,112 @@ async def generate_adaptive_questions_endpoint(request: AdaptiveQuestionRequest)
             detail=f"Failed to generate adaptive questions: {str(e)}"
         )
 
+def _batch_item_key(request: QuestionGenerationRequest) -> tuple:
+    """Key used to merge duplicate items within one batch"""
+    return (
+        request.subject.value,
+        request.grade,
+        " ".join(request.topic.lower().split()),
+        request.count,
+        request.difficulty.value
+    )
+
 @app.post("/generate/batch-questions")
-async def generate_batch_questions(requests: List[QuestionGenerationRequest]):
-    """Generate questions for multiple subjects/topics in batch"""
-    results = []
+async def generate_batch_questions(
+    requests: List[QuestionGenerationRequest],
+    deadline: Optional[float] = Query(None, gt=0, le=BATCH_CONFIG["max_deadline_seconds"],
+                                      description="Seconds to wait before reporting unfinished items as timed out")
+):
+    """Generate questions for multiple subjects/topics in batch
     
-    for request in requests:
-        try:
-            questions = await gemini_service.generate_questions(request)
-            results.append({
-                "subject": request.subject.value,
-                "grade": request.grade,
-                "topic": request.topic,
-                "success": True,
-                "questions": [q.dict() for q in questions],
-                "count": len(questions)
+    Items run concurrently (at most BATCH_CONFIG["max_parallel"] at a time) and
+    duplicates share one upstream call. Items still running at the deadline are
+    cancelled and reported as timed out, so the batch always returns partial results.
+    """
+    deadline_seconds = deadline if deadline is not None else BATCH_CONFIG["deadline_seconds"]
+    semaphore = asyncio.Semaphore(BATCH_CONFIG["max_parallel"])
+    
+    async def run_item(request: QuestionGenerationRequest):
+        async with semaphore:
+            return await gemini_service.generate_questions(request)
+    
+    item_keys = [_batch_item_key(request) for request in requests]
+    tasks = {}
+    for key, request in zip(item_keys, requests):
+        if key not in tasks:
+            tasks[key] = asyncio.create_task(run_item(request))
+    
+    if tasks:
+        _, pending = await asyncio.wait(tasks.values(), timeout=deadline_seconds)
+        for task in pending:
+            task.cancel()
+    
+    results = []
+    for key, request in zip(item_keys, requests):
+        task = tasks[key]
+        item = {
+            "subject": request.subject.value,
+            "grade": request.grade,
+            "topic": request.topic
+        }
+        
+        if not task.done() or task.cancelled():
+            item.update({
+                "success": False,
+                "error": f"Timed out after {deadline_seconds:g}s",
+                "timed_out": True,
+                "count": 0
             })
-        except Exception as e:
-            results.append({
-                "subject": request.subject.value,
-                "grade": request.grade,
-                "topic": request.topic,
+        elif task.exception() is not None:
+            item.update({
                 "success": False,
-                "error": str(e),
+                "error": str(task.exception()),
                 "count": 0
             })
+        else:
+            questions = task.result()
+            item.update({
+                "success": True,
+                "questions": [q.dict() for q in questions],
+                "count": len(questions)
+            })
+        
+        results.append(item)
     
     return {
         "batch_results": results,
         "total_requests": len(requests),
+        "unique_requests": len(tasks),
         "successful": len([r for r in results if r["success"]]),
-        "failed": len([r for r in results if not r["success"]])
+        "failed": len([r for r in results if not r["success"]]),
+        "timed_out": len([r for r in results if r.get("timed_out")])
     }
 
+@app.get("/metrics/question-cache")
+async def question_cache_metrics():
+    """Hit/miss/eviction counters for the generated question cache"""
+    return question_cache.stats()
+
+@app.get("/metrics/question-bank")
+async def question_bank_metrics():
+    """Pool levels and serve-from-pool vs live-generation ratio"""
+    return question_bank.stats()
+
+@app.get("/metrics/single-flight")
+async def single_flight_metrics():
+    """How many generations were coalesced onto an in-flight upstream call"""
+    return gemini_service.single_flight_stats()
+
+@app.get("/metrics/db-pool")
+async def db_pool_metrics():
+    """MySQL pool checkout wait times, in-use and overflow counts"""
+    return get_connection_pool().stats()
+
+@app.get("/metrics/queries")
+async def query_metrics(limit: int = 50):
+    """Per-fingerprint query latency, rows and errors, pool waits and recent slow queries"""
+    return get_query_metrics().snapshot(limit)
+
 @app.exception_handler(Exception)
 async def global_exception_handler(request, exc):
     """Global exception handler"""
@@ -0,0 +1,109 @@
+# Reads over the game_progress history
+# Subject history is served in keyset pages ordered by (completed_at, id) with
+# only the columns the dashboard shows, so a page costs the same however long a
+# student's history gets. Final game states live compressed in
+# game_progress_state and are loaded one completion at a time, on demand.
+# Blobs use MySQL's COMPRESS() layout (4-byte little-endian length + zlib
+# stream), which lets the migration backfill old rows in SQL.
+
+import base64
+import json
+import struct
+import zlib
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from config import PROGRESS_HISTORY_CONFIG, execute_query
+
+PROGRESS_COLUMNS = """gp.id, gp.game_id, gp.session_id, gp.score, gp.time_spent, gp.hints_used,
+                      gp.mistakes, gp.xp_earned, gp.completed_at, g.title, g.difficulty, g.game_type"""
+
+
+def compress_state(game_state: Dict, level: int = None) -> bytes:
+    """Serialize and compress a final game state the way MySQL's COMPRESS() does"""
+    raw = json.dumps(game_state).encode("utf-8")
+    level = PROGRESS_HISTORY_CONFIG["state_compression_level"] if level is None else level
+    return struct.pack("<I", len(raw)) + zlib.compress(raw, level)
+
+
+def decompress_state(blob: Optional[bytes]) -> Optional[Dict]:
+    """Inverse of compress_state(); also reads blobs written by COMPRESS()"""
+    if not blob:
+        return None
+    # decompressobj ignores the trailing '.' COMPRESS() appends to strings ending in a space
+    raw = zlib.decompressobj().decompress(bytes(blob[4:]))
+    return json.loads(raw.decode("utf-8"))
+
+
+def encode_cursor(row: Dict[str, Any]) -> str:
+    key = f"{row['completed_at'].isoformat()}|{row['id']}"
+    return base64.urlsafe_b64encode(key.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    """Position of the last row of the previous page; raises ValueError if malformed"""
+    try:
+        key = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode("utf-8")
+        completed_at, progress_id = key.rsplit("|", 1)
+        return datetime.fromisoformat(completed_at), int(progress_id)
+    except (ValueError, TypeError) as e:
+        raise ValueError(f"Invalid cursor: {e}")
+
+
+def page_size(requested: Optional[int] = None) -> int:
+    if not requested or requested < 1:
+        return PROGRESS_HISTORY_CONFIG["page_size"]
+    return min(requested, PROGRESS_HISTORY_CONFIG["max_page_size"])
+
+
+def load_progress_page(user_id: int, subject: str, cursor: Optional[str] = None,
+                       limit: Optional[int] = None) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """One page of a student's completions in a subject, newest first, and the cursor for the next page"""
+    limit = page_size(limit)
+    conditions, params = ["gp.user_id = %s", "g.subject = %s"], [user_id, subject]
+    if cursor:
+        completed_at, progress_id = decode_cursor(cursor)
+        conditions.append("(gp.completed_at < %s OR (gp.completed_at = %s AND gp.id < %s))")
+        params += [completed_at, completed_at, progress_id]
+
+    rows = execute_query(f"""
+        SELECT {PROGRESS_COLUMNS}
+        FROM game_progress gp
+        JOIN games g ON gp.game_id = g.id
+        WHERE {' AND '.join(conditions)}
+        ORDER BY gp.completed_at DESC, gp.id DESC
+        LIMIT %s
+    """, params + [limit + 1], fetch=True)
+    if rows is None:
+        raise RuntimeError("Could not load progress history")
+
+    next_cursor = encode_cursor(rows[limit - 1]) if len(rows) > limit else None
+    return rows[:limit], next_cursor
+
+
+def load_progress_state(user_id: int, progress_id: int) -> Optional[Dict[str, Any]]:
+    """The final game state of one of a student's completions, or None if it is not theirs"""
+    rows = execute_query("""
+        SELECT gp.id, gp.game_id, gp.completed_at, s.state, gp.game_state AS legacy_state
+        FROM game_progress gp
+        LEFT JOIN game_progress_state s ON s.progress_id = gp.id
+        WHERE gp.id = %s AND gp.user_id = %s
+    """, (progress_id, user_id), fetch=True)
+    if rows is None:
+        raise RuntimeError("Could not load progress state")
+    if not rows:
+        return None
+
+    row = rows[0]
+    if row["state"] is not None:
+        game_state = decompress_state(row["state"])
+    else:
+        # Completions recorded before game_progress_state existed and not yet migrated
+        legacy = row["legacy_state"]
+        game_state = json.loads(legacy) if isinstance(legacy, (str, bytes, bytearray)) else legacy
+    return {
+        "progress_id": row["id"],
+        "game_id": row["game_id"],
+        "completed_at": row["completed_at"],
+        "game_state": game_state
+    }
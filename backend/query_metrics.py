@@ -0,0 +1,259 @@
+# Query instrumentation for the MySQL helpers in config.py and async_db.py
+# Statements are grouped by fingerprint (SQL with literals and placeholders
+# normalized) into latency histograms with row and error counts. Queries slower
+# than slow_query_ms are logged with their call site. track_route() attributes
+# every query issued inside it to an HTTP route.
+
+import logging
+import os
+import re
+import sys
+import threading
+import time
+from bisect import bisect_left
+from collections import deque
+import contextlib
+from contextlib import contextmanager
+from contextvars import ContextVar, Token
+from functools import lru_cache
+from typing import Any, Deque, Dict, Iterator, List, Optional
+
+logger = logging.getLogger("shiksha.queries")
+
+# Histogram bucket upper bounds in milliseconds; the last bucket is unbounded
+LATENCY_BUCKETS_MS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+_current_route: ContextVar[Optional[str]] = ContextVar("query_route", default=None)
+
+# Frames from these files are skipped when looking for the code that issued a query
+_HELPER_FILES = {
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), name)
+    for name in ("config.py", "query_metrics.py", "db_pool.py", "async_db.py")
+} | {contextlib.__file__}
+
+_COMMENTS = re.compile(r"/\*.*?\*/|--[^\n]*|#[^\n]*", re.DOTALL)
+_STRINGS = re.compile(r"'(?:[^'\\]|\\.)*'|\"(?:[^\"\\]|\\.)*\"")
+_NUMBERS = re.compile(r"\b\d+(?:\.\d+)?\b")
+_PLACEHOLDERS = re.compile(r"%\(\w+\)s|%s|\?")
+_IN_LISTS = re.compile(r"\bIN\s*\(\s*\?(?:\s*,\s*\?)*\s*\)", re.IGNORECASE)
+_VALUES_ROWS = re.compile(r"(\bVALUES\s*\([^()]*(?:\([^()]*\)[^()]*)*\))(?:\s*,\s*\([^()]*(?:\([^()]*\)[^()]*)*\))+",
+                          re.IGNORECASE)
+_WHITESPACE = re.compile(r"\s+")
+
+
+@lru_cache(maxsize=2048)
+def fingerprint(query: str) -> str:
+    """Normalize SQL so statements that differ only in values share one entry"""
+    sql = _COMMENTS.sub(" ", query)
+    sql = _STRINGS.sub("?", sql)
+    sql = _PLACEHOLDERS.sub("?", sql)
+    sql = _NUMBERS.sub("?", sql)
+    sql = _WHITESPACE.sub(" ", sql).strip()
+    sql = _IN_LISTS.sub("IN (...)", sql)
+    sql = _VALUES_ROWS.sub(r"\1, ...", sql)
+    return sql
+
+
+def current_route() -> Optional[str]:
+    return _current_route.get()
+
+
+def enter_route(route: str) -> Token:
+    """Attribute queries to `route` until exit_route() is called with the returned token"""
+    return _current_route.set(route)
+
+
+def exit_route(token: Token):
+    _current_route.reset(token)
+
+
+@contextmanager
+def track_route(route: str) -> Iterator[None]:
+    """Attribute every query issued inside the block to `route`"""
+    token = enter_route(route)
+    try:
+        yield
+    finally:
+        exit_route(token)
+
+
+def _call_site() -> str:
+    frame = sys._getframe(2)
+    while frame is not None and frame.f_code.co_filename in _HELPER_FILES:
+        frame = frame.f_back
+    if frame is None:
+        return "unknown"
+    return f"{os.path.basename(frame.f_code.co_filename)}:{frame.f_lineno} in {frame.f_code.co_name}"
+
+
+class _FingerprintStats:
+    __slots__ = ("count", "errors", "rows", "total_ms", "max_ms", "buckets", "routes")
+
+    def __init__(self):
+        self.count = 0
+        self.errors = 0
+        self.rows = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.buckets = [0] * (len(LATENCY_BUCKETS_MS) + 1)
+        self.routes: Dict[str, List[float]] = {}  # route -> [count, total_ms]
+
+    def percentile(self, fraction: float) -> Optional[float]:
+        """Upper bound of the bucket holding the given fraction of samples"""
+        target = self.count * fraction
+        seen = 0
+        for index, bucket_count in enumerate(self.buckets):
+            seen += bucket_count
+            if seen >= target and bucket_count:
+                return LATENCY_BUCKETS_MS[index] if index < len(LATENCY_BUCKETS_MS) else self.max_ms
+        return None
+
+
+class QueryMetrics:
+    def __init__(self, config: Dict[str, Any]):
+        self.enabled = config["enabled"]
+        self.slow_query_ms = config["slow_query_ms"]
+        self.max_fingerprints = config["max_fingerprints"]
+
+        self._stats: Dict[str, _FingerprintStats] = {}
+        self._slow: Deque[Dict[str, Any]] = deque(maxlen=config["slow_log_size"])
+        self._pool_wait = {"count": 0, "total_ms": 0.0, "max_ms": 0.0}
+        self._lock = threading.Lock()
+        self._started_at = time.time()
+
+    def record(self, query: str, elapsed: float, rows: int = 0, error: Optional[BaseException] = None):
+        """Record one executed statement; elapsed is in seconds"""
+        if not self.enabled:
+            return
+
+        key = fingerprint(query if isinstance(query, str) else query.decode("utf-8", "replace"))
+        elapsed_ms = elapsed * 1000
+        route = _current_route.get() or "background"
+
+        with self._lock:
+            stats = self._stats.get(key)
+            if stats is None:
+                if len(self._stats) >= self.max_fingerprints:
+                    key = "<other>"
+                    stats = self._stats.setdefault(key, _FingerprintStats())
+                else:
+                    stats = self._stats[key] = _FingerprintStats()
+
+            stats.count += 1
+            stats.rows += max(rows or 0, 0)
+            stats.total_ms += elapsed_ms
+            stats.max_ms = max(stats.max_ms, elapsed_ms)
+            stats.buckets[bisect_left(LATENCY_BUCKETS_MS, elapsed_ms)] += 1
+            if error is not None:
+                stats.errors += 1
+            route_stats = stats.routes.setdefault(route, [0, 0.0])
+            route_stats[0] += 1
+            route_stats[1] += elapsed_ms
+
+        if elapsed_ms >= self.slow_query_ms:
+            call_site = _call_site()
+            entry = {
+                "fingerprint": key,
+                "duration_ms": round(elapsed_ms, 2),
+                "rows": rows,
+                "route": route,
+                "call_site": call_site,
+                "error": str(error) if error else None,
+                "at": time.time()
+            }
+            with self._lock:
+                self._slow.append(entry)
+            logger.warning(f"Slow query {elapsed_ms:.1f}ms [{route}] at {call_site}: {key}")
+
+    def record_pool_wait(self, elapsed: float):
+        """Record how long a caller waited to check out a connection"""
+        if not self.enabled:
+            return
+        elapsed_ms = elapsed * 1000
+        with self._lock:
+            self._pool_wait["count"] += 1
+            self._pool_wait["total_ms"] += elapsed_ms
+            self._pool_wait["max_ms"] = max(self._pool_wait["max_ms"], elapsed_ms)
+
+    @contextmanager
+    def timed(self, query: str) -> Iterator[Dict[str, Any]]:
+        """Time a statement; set result["rows"] inside the block to record its row count"""
+        result = {"rows": 0}
+        started = time.perf_counter()
+        try:
+            yield result
+        except BaseException as e:
+            self.record(query, time.perf_counter() - started, result["rows"], e)
+            raise
+        self.record(query, time.perf_counter() - started, result["rows"])
+
+    def reset(self):
+        with self._lock:
+            self._stats.clear()
+            self._slow.clear()
+            self._pool_wait = {"count": 0, "total_ms": 0.0, "max_ms": 0.0}
+            self._started_at = time.time()
+
+    def snapshot(self, limit: int = 50) -> Dict[str, Any]:
+        """Fingerprints ordered by total time, plus pool waits and recent slow queries"""
+        with self._lock:
+            items = sorted(self._stats.items(), key=lambda item: item[1].total_ms, reverse=True)
+            queries = [
+                {
+                    "fingerprint": key,
+                    "count": stats.count,
+                    "errors": stats.errors,
+                    "rows": stats.rows,
+                    "total_ms": round(stats.total_ms, 2),
+                    "mean_ms": round(stats.total_ms / stats.count, 3) if stats.count else 0.0,
+                    "p50_ms": stats.percentile(0.5),
+                    "p95_ms": stats.percentile(0.95),
+                    "max_ms": round(stats.max_ms, 2),
+                    "histogram": dict(zip([f"<={bound}ms" for bound in LATENCY_BUCKETS_MS] + ["inf"],
+                                          stats.buckets)),
+                    "routes": {route: {"count": count, "total_ms": round(total, 2)}
+                               for route, (count, total) in stats.routes.items()}
+                }
+                for key, stats in items[:limit]
+            ]
+            pool_wait = dict(self._pool_wait)
+            slow = list(self._slow)
+
+        pool_wait["mean_ms"] = round(pool_wait["total_ms"] / pool_wait["count"], 3) if pool_wait["count"] else 0.0
+        pool_wait["total_ms"] = round(pool_wait["total_ms"], 2)
+        pool_wait["max_ms"] = round(pool_wait["max_ms"], 2)
+        return {
+            "enabled": self.enabled,
+            "since": self._started_at,
+            "slow_query_ms": self.slow_query_ms,
+            "fingerprints": len(items),
+            "queries": queries,
+            "pool_wait": pool_wait,
+            "slow_queries": slow
+        }
+
+
+class InstrumentedCursor:
+    """Cursor proxy that records every execute/executemany"""
+
+    def __init__(self, cursor, metrics: QueryMetrics):
+        self._cursor = cursor
+        self._metrics = metrics
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+    def __iter__(self):
+        return iter(self._cursor)
+
+    def execute(self, query, params=None, *args, **kwargs):
+        with self._metrics.timed(query) as result:
+            outcome = self._cursor.execute(query, params, *args, **kwargs)
+            result["rows"] = self._cursor.rowcount
+            return outcome
+
+    def executemany(self, query, seq_params, *args, **kwargs):
+        with self._metrics.timed(query) as result:
+            outcome = self._cursor.executemany(query, seq_params, *args, **kwargs)
+            result["rows"] = self._cursor.rowcount
+            return outcome
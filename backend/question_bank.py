@@ -0,0 +1,208 @@
+# Pre-generated question bank
+# Keeps a pool of validated questions per (grade, subject, topic, difficulty) so
+# quizzes are served without waiting on a live Gemini call. A background worker
+# tops up pools that fall below the low-water mark. Pools exist only for topics
+# that resolve to the curriculum, so free-text topics cannot grow memory or
+# Gemini spend; they are always generated live.
+
+import asyncio
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+from models import GeneratedQuestion, QuestionGenerationRequest, QuestionType
+from curriculum import ODISHA_CURRICULUM, resolve_topic
+from config import QUESTION_BANK_CONFIG
+from gemini_service import gemini_service
+
+PoolKey = Tuple[int, str, str, str]  # (grade, subject, curriculum topic, difficulty)
+
+
+def validate_question(question: GeneratedQuestion, key: PoolKey) -> bool:
+    """Check that a generated question is complete and belongs in the given pool"""
+    grade, subject, _, difficulty = key
+
+    if question.grade != grade or question.subject.value != subject:
+        return False
+    if question.difficulty.value != difficulty:
+        return False
+    if not all(text.strip() for text in (question.question.en, question.question.od, question.question.hi)):
+        return False
+
+    if question.type == QuestionType.MULTIPLE_CHOICE:
+        options = question.options
+        if options is None or len(options.en) < 2:
+            return False
+        if not (len(options.en) == len(options.od) == len(options.hi)):
+            return False
+        if not isinstance(question.correctAnswer, int) or not 0 <= question.correctAnswer < len(options.en):
+            return False
+
+    return True
+
+
+class QuestionBank:
+    def __init__(self, service, config: Dict[str, Any] = None):
+        config = config or QUESTION_BANK_CONFIG
+        self.service = service
+        self.enabled = config["enabled"]
+        self.prefill_curriculum = config["prefill_curriculum"]
+        self.difficulties = config["difficulties"]
+        self.low_water_mark = config["low_water_mark"]
+        self.max_pool_size = config["max_pool_size"]
+        self.refill_batch_size = config["refill_batch_size"]
+        self.refill_interval_seconds = config["refill_interval_seconds"]
+        self.max_refills_per_cycle = config["max_refills_per_cycle"]
+
+        self._pools: Dict[PoolKey, Deque[GeneratedQuestion]] = {}
+        self._demand: Dict[PoolKey, int] = {}
+        self._refilling = set()
+        self._task: Optional[asyncio.Task] = None
+        self._counters = {
+            "served_from_pool": 0,
+            "served_live": 0,
+            "questions_served_from_pool": 0,
+            "refills": 0,
+            "refill_failures": 0,
+            "questions_added": 0,
+            "questions_rejected": 0
+        }
+
+    def register_curriculum(self):
+        """Create an empty pool for every curriculum topic and difficulty"""
+        for grade, subjects in ODISHA_CURRICULUM.items():
+            for subject, topics in subjects.items():
+                for topic in topics:
+                    for difficulty in self.difficulties:
+                        self._pools.setdefault((grade, subject, topic, difficulty), deque())
+
+    def pool_key(self, request: QuestionGenerationRequest) -> Optional[PoolKey]:
+        """Map a request onto its curriculum pool, or None if the topic is not in the curriculum"""
+        match = resolve_topic(request.grade, request.subject.value, request.topic)
+        if match is None:
+            return None
+        return (request.grade, request.subject.value, match.topic, request.difficulty.value)
+
+    def draw(self, request: QuestionGenerationRequest) -> Optional[List[GeneratedQuestion]]:
+        """Take request.count questions from the matching pool, or None if it cannot cover the request"""
+        if not self.enabled:
+            return None
+
+        key = self.pool_key(request)
+        if key is None:
+            return None
+        pool = self._pools.get(key)
+
+        if pool is None or len(pool) < request.count:
+            # Remember the demand so the worker fills this pool first
+            self._pools.setdefault(key, deque())
+            self._demand[key] = self._demand.get(key, 0) + 1
+            return None
+
+        self._counters["served_from_pool"] += 1
+        self._counters["questions_served_from_pool"] += request.count
+        return [pool.popleft() for _ in range(request.count)]
+
+    def record_live(self):
+        """Count a request that had to fall back to live generation"""
+        self._counters["served_live"] += 1
+
+    async def refill(self, key: PoolKey) -> int:
+        """Generate one batch for a pool and keep the questions that validate"""
+        if key in self._refilling:
+            return 0
+
+        grade, subject, topic, difficulty = key
+        pool = self._pools.setdefault(key, deque())
+        self._refilling.add(key)
+
+        try:
+            request = QuestionGenerationRequest(
+                subject=subject,
+                grade=grade,
+                topic=topic,
+                count=min(self.refill_batch_size, self.max_pool_size - len(pool)),
+                difficulty=difficulty
+            )
+            if request.count <= 0:
+                return 0
+
+            questions = await self.service.generate_fresh_questions(request)
+        except Exception as e:
+            self._counters["refill_failures"] += 1
+            print(f"❌ Question bank refill failed for {key}: {e}")
+            return 0
+        finally:
+            self._refilling.discard(key)
+
+        seen = {q.question.en for q in pool}
+        added = 0
+        for question in questions:
+            if len(pool) >= self.max_pool_size:
+                break
+            if question.question.en in seen or not validate_question(question, key):
+                self._counters["questions_rejected"] += 1
+                continue
+            seen.add(question.question.en)
+            pool.append(question)
+            added += 1
+
+        self._counters["refills"] += 1
+        self._counters["questions_added"] += added
+        self._demand.pop(key, None)
+        return added
+
+    async def refill_cycle(self):
+        """Top up the pools below the low-water mark, most requested and emptiest first"""
+        low = [key for key, pool in self._pools.items()
+               if len(pool) < self.low_water_mark and key not in self._refilling]
+        low.sort(key=lambda key: (-self._demand.get(key, 0), len(self._pools[key])))
+
+        batch = low[:self.max_refills_per_cycle]
+        if batch:
+            await asyncio.gather(*(self.refill(key) for key in batch))
+
+    async def _run(self):
+        while True:
+            try:
+                await self.refill_cycle()
+            except Exception as e:
+                print(f"❌ Question bank worker error: {e}")
+            await asyncio.sleep(self.refill_interval_seconds)
+
+    def start(self):
+        """Start the background refill worker on the running event loop"""
+        if not self.enabled or self._task is not None:
+            return
+        if self.prefill_curriculum:
+            self.register_curriculum()
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        """Stop the background refill worker"""
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    def stats(self) -> Dict[str, Any]:
+        """Pool levels and serve-from-pool vs live-generation counters"""
+        served = self._counters["served_from_pool"] + self._counters["served_live"]
+        sizes = [len(pool) for pool in self._pools.values()]
+        return {
+            "enabled": self.enabled,
+            "worker_running": self._task is not None and not self._task.done(),
+            "pools": len(sizes),
+            "pooled_questions": sum(sizes),
+            "pools_below_low_water": len([size for size in sizes if size < self.low_water_mark]),
+            "empty_pools": len([size for size in sizes if size == 0]),
+            "pool_serve_ratio": round(self._counters["served_from_pool"] / served, 4) if served else 0.0,
+            **self._counters
+        }
+
+
+# Initialize the question bank
+question_bank = QuestionBank(gemini_service)
@@ -0,0 +1,187 @@
+# Content-addressed cache for generated questions
+# Memory tier: LRU with TTL. Persistent tier: the curriculum_cache table.
+
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+from pydantic import BaseModel
+
+from models import GeneratedQuestion, QuestionGenerationRequest
+from config import QUESTION_CACHE_CONFIG
+from async_db import async_db, DatabaseError
+
+
+def make_cache_key(request: BaseModel, relevant_topic: str) -> str:
+    """Build a canonical hash of a generation request and its resolved curriculum topic"""
+    payload = request.model_dump(mode="json")
+    payload["topic"] = " ".join(payload["topic"].lower().split())
+    payload["relevant_topic"] = relevant_topic
+    canonical = json.dumps(payload, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+class QuestionCache:
+    def __init__(self, config: Dict[str, Any] = None):
+        config = config or QUESTION_CACHE_CONFIG
+        self.enabled = config["enabled"]
+        self.max_entries = config["max_entries"]
+        self.ttl_seconds = config["ttl_seconds"]
+        self.persistent_enabled = config["persistent_enabled"]
+        self.persistent_ttl_seconds = config["persistent_ttl_seconds"]
+        self.version = config["version"]
+
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._counters = {
+            "hits": 0,
+            "misses": 0,
+            "persistent_hits": 0,
+            "persistent_misses": 0,
+            "persistent_errors": 0,
+            "evictions": 0,
+            "expirations": 0,
+            "stores": 0
+        }
+
+    def get(self, key: str) -> Optional[List[GeneratedQuestion]]:
+        """Look up questions in the memory tier"""
+        if not self.enabled:
+            return None
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._counters["misses"] += 1
+                return None
+
+            expires_at, questions = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                self._counters["expirations"] += 1
+                self._counters["misses"] += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self._counters["hits"] += 1
+            return list(questions)
+
+    def put(self, key: str, questions: List[GeneratedQuestion]):
+        """Store questions in the memory tier, evicting the least recently used entry"""
+        if not self.enabled:
+            return
+
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, list(questions))
+            self._entries.move_to_end(key)
+            self._counters["stores"] += 1
+
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._counters["evictions"] += 1
+
+    async def load_persistent(self, key: str) -> Optional[List[GeneratedQuestion]]:
+        """Look up questions in the curriculum_cache table and promote hits to memory"""
+        if not (self.enabled and self.persistent_enabled):
+            return None
+
+        try:
+            rows = await async_db.fetch_all(
+                """SELECT content FROM curriculum_cache
+                   WHERE id = %s AND version = %s AND is_valid = TRUE
+                   AND (expires_at IS NULL OR expires_at > UTC_TIMESTAMP())""",
+                (self._row_id(key), self.version)
+            )
+        except DatabaseError as e:
+            print(f"❌ Question cache lookup failed: {e}")
+            self._count("persistent_errors")
+            return None
+
+        if not rows:
+            self._count("persistent_misses")
+            return None
+
+        try:
+            content = rows[0]["content"]
+            if isinstance(content, (bytes, bytearray)):
+                content = content.decode("utf-8")
+            data = json.loads(content) if isinstance(content, str) else content
+            questions = [GeneratedQuestion(**q) for q in data["questions"]]
+        except Exception as e:
+            print(f"❌ Discarding unreadable question cache row: {e}")
+            self._count("persistent_errors")
+            return None
+
+        self._count("persistent_hits")
+        self.put(key, questions)
+        return questions
+
+    async def store_persistent(self, key: str, request: QuestionGenerationRequest,
+                               relevant_topic: str, questions: List[GeneratedQuestion]):
+        """Write questions through to the curriculum_cache table"""
+        if not (self.enabled and self.persistent_enabled):
+            return
+
+        content = json.dumps(
+            {"questions": [q.model_dump(mode="json") for q in questions]},
+            ensure_ascii=False
+        )
+        expires_at = datetime.utcnow() + timedelta(seconds=self.persistent_ttl_seconds)
+
+        try:
+            await async_db.execute(
+                """INSERT INTO curriculum_cache
+                   (id, subject, class_level, topic, language, content, version, source, is_valid, expires_at)
+                   VALUES (%s, %s, %s, %s, 'en', %s, %s, 'gemini_questions', TRUE, %s)
+                   ON DUPLICATE KEY UPDATE content = VALUES(content), version = VALUES(version),
+                       is_valid = TRUE, expires_at = VALUES(expires_at)""",
+                (
+                    self._row_id(key),
+                    request.subject.value,
+                    request.grade,
+                    relevant_topic[:255],
+                    content,
+                    self.version,
+                    expires_at
+                )
+            )
+        except DatabaseError as e:
+            print(f"❌ Question cache write failed: {e}")
+            self._count("persistent_errors")
+
+    def clear(self):
+        """Drop every entry from the memory tier"""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """Return counters used to size the cache"""
+        with self._lock:
+            counters = dict(self._counters)
+            size = len(self._entries)
+
+        lookups = counters["hits"] + counters["misses"]
+        return {
+            "enabled": self.enabled,
+            "persistent_enabled": self.persistent_enabled,
+            "size": size,
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl_seconds,
+            "hit_ratio": round(counters["hits"] / lookups, 4) if lookups else 0.0,
+            **counters
+        }
+
+    def _count(self, name: str):
+        with self._lock:
+            self._counters[name] += 1
+
+    def _row_id(self, key: str) -> str:
+        return f"questions_{key}"
+
+
+# Initialize the cache
+question_cache = QuestionCache()
@@ -51,6 +51,27 @@ CREATE TABLE IF NOT EXISTS game_progress (
     FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
 );
 
+-- Final game state of each completion (compressed)
+CREATE TABLE IF NOT EXISTS game_progress_state (
+    progress_id INT PRIMARY KEY,
+    state MEDIUMBLOB NOT NULL,
+    FOREIGN KEY (progress_id) REFERENCES game_progress(id) ON DELETE CASCADE
+);
+
+-- Per-student, per-game progress totals
+CREATE TABLE IF NOT EXISTS game_progress_summary (
+    user_id INT NOT NULL,
+    game_id VARCHAR(255) NOT NULL,
+    attempts INT NOT NULL DEFAULT 0,
+    best_score INT NOT NULL DEFAULT 0,
+    total_score BIGINT NOT NULL DEFAULT 0,
+    total_time_spent BIGINT NOT NULL DEFAULT 0,
+    last_completed_at TIMESTAMP NULL,
+    PRIMARY KEY (user_id, game_id),
+    FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE,
+    FOREIGN KEY (game_id) REFERENCES games(id) ON DELETE CASCADE
+);
+
 -- Game sessions table
 CREATE TABLE IF NOT EXISTS game_sessions (
     id VARCHAR(255) PRIMARY KEY,
@@ -200,6 +221,7 @@ def get_indexes_sql():
         "CREATE INDEX idx_games_difficulty ON games(difficulty)",
         "CREATE INDEX idx_games_active ON games(is_active)",
         "CREATE INDEX idx_progress_user_game ON game_progress(user_id, game_id)",
+        "CREATE INDEX idx_progress_user_completed ON game_progress(user_id, completed_at)",
         "CREATE INDEX idx_progress_completed ON game_progress(completed_at)",
         "CREATE INDEX idx_progress_score ON game_progress(score)",
         "CREATE INDEX idx_sessions_user_active ON game_sessions(user_id, is_active)",
@@ -252,6 +274,29 @@ def get_sample_data_sql():
         ('english-grammar-quest', 'Grammar Adventure Quest', 'english', 7, 'strategy', 'BEGINNER', 15, 110, '{"topics": ["Grammar Rules", "Sentence Structure", "Parts of Speech"], "odishaBoard": true}', '{}')"""
     ]
 
+def get_backfill_sql():
+    """Return SQL that fills the progress history tables from existing game_progress rows (safe to re-run)"""
+    return [
+        """INSERT INTO game_progress_summary (user_id, game_id, attempts, best_score, total_score, total_time_spent, last_completed_at)
+        SELECT user_id, game_id, COUNT(*), MAX(score), SUM(score), SUM(time_spent), MAX(completed_at)
+        FROM game_progress
+        GROUP BY user_id, game_id
+        ON DUPLICATE KEY UPDATE
+            attempts = VALUES(attempts),
+            best_score = VALUES(best_score),
+            total_score = VALUES(total_score),
+            total_time_spent = VALUES(total_time_spent),
+            last_completed_at = VALUES(last_completed_at)""",
+        
+        """INSERT IGNORE INTO game_progress_state (progress_id, state)
+        SELECT id, COMPRESS(game_state) FROM game_progress WHERE game_state IS NOT NULL""",
+        
+        # Only clear states that made it into game_progress_state
+        """UPDATE game_progress gp
+        JOIN game_progress_state s ON s.progress_id = gp.id
+        SET gp.game_state = NULL"""
+    ]
+
 def run_migration():
     """Run the fixed migration"""
     try:
@@ -321,6 +366,22 @@ def run_migration():
                 print(f"❌ Sample data {i} failed: {e}")
                 failed += 1
         
+        # Backfill progress history tables in one transaction, stopping at the first error
+        print("📝 Backfilling progress history...")
+        backfill = get_backfill_sql()
+        i = 0
+        
+        try:
+            connection.start_transaction()
+            for i, backfill_sql in enumerate(backfill, 1):
+                cursor.execute(backfill_sql)
+            connection.commit()
+            successful += len(backfill)
+        except Exception as e:
+            connection.rollback()
+            print(f"❌ Backfill {i} failed, rolled back: {e}")
+            failed += 1
+        
         cursor.close()
         connection.close()
         
@@ -340,7 +401,7 @@ def verify_migration():
         print("\n🔍 Verifying migration...")
         
         expected_tables = [
-            'games', 'game_progress', 'game_sessions', 'achievements',
+            'games', 'game_progress', 'game_progress_state', 'game_progress_summary', 'game_sessions', 'achievements',
             'student_achievements', 'subject_mastery', 'game_assets',
             'curriculum_cache', 'offline_sync_queue', 'learning_analytics',
             'game_leaderboards'
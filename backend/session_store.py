@@ -0,0 +1,202 @@
+# Write-behind store for in-progress game session state
+# Autosaves replace the session's latest score and game_state in memory; a daemon
+# thread writes every dirty session in batched CASE updates each flush interval,
+# so repeated saves between flushes coalesce into one write. Completion writes
+# the final state itself and drops the entry; close() flushes on shutdown.
+# Session owners are remembered too, so autosaves skip the ownership query.
+
+import atexit
+import json
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from config import SESSION_STORE_CONFIG, execute_query
+
+UPDATE_SESSION = """UPDATE game_sessions
+                    SET current_score = %s, game_state = %s, last_activity = %s
+                    WHERE id = %s AND is_active = TRUE"""
+
+
+@dataclass
+class SessionState:
+    user_id: int
+    score: Optional[int] = None
+    game_state: Optional[str] = None  # serialized JSON
+    last_activity: Optional[datetime] = None
+    version: int = 0           # bumped on every save
+    flushed_version: int = 0   # last version written to MySQL
+    touched_at: float = 0.0    # monotonic time of the last save or lookup
+
+    @property
+    def dirty(self) -> bool:
+        return self.version != self.flushed_version
+
+
+class SessionStateStore:
+    def __init__(self, config: Dict[str, Any] = None):
+        config = config or SESSION_STORE_CONFIG
+        self.enabled = config["enabled"]
+        self.flush_interval_seconds = config["flush_interval_seconds"]
+        self.max_batch_rows = config["max_batch_rows"]
+        self.max_batch_bytes = config["max_batch_bytes"]
+        self.max_sessions = config["max_sessions"]
+        self.idle_ttl_seconds = config["idle_ttl_seconds"]
+
+        self._sessions: Dict[str, SessionState] = {}
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._counters = {
+            "saves": 0,
+            "coalesced": 0,
+            "direct_writes": 0,
+            "flushes": 0,
+            "rows_written": 0,
+            "flush_failures": 0,
+            "owner_hits": 0
+        }
+
+    def register(self, session_id: str, user_id: int):
+        """Remember a session's owner, e.g. right after it was created or verified"""
+        with self._lock:
+            if session_id not in self._sessions and len(self._sessions) < self.max_sessions:
+                self._sessions[session_id] = SessionState(user_id=user_id, touched_at=time.monotonic())
+
+    def owner(self, session_id: str) -> Optional[int]:
+        """The user a known session belongs to, or None if it has to be checked in MySQL"""
+        with self._lock:
+            state = self._sessions.get(session_id)
+            if state is None:
+                return None
+            state.touched_at = time.monotonic()
+            self._counters["owner_hits"] += 1
+            return state.user_id
+
+    def save(self, session_id: str, user_id: int, score: int, game_state: Dict) -> bool:
+        """Record the latest in-progress state; returns False if a direct write failed"""
+        serialized = json.dumps(game_state)
+        now = datetime.now()
+
+        if self.enabled:
+            self._ensure_started()
+            with self._lock:
+                state = self._sessions.get(session_id)
+                if state is None and len(self._sessions) < self.max_sessions:
+                    state = self._sessions[session_id] = SessionState(user_id=user_id)
+                if state is not None:
+                    if state.dirty:
+                        self._counters["coalesced"] += 1
+                    state.score, state.game_state, state.last_activity = score, serialized, now
+                    state.version += 1
+                    state.touched_at = time.monotonic()
+                    self._counters["saves"] += 1
+                    return True
+
+        with self._lock:
+            self._counters["direct_writes"] += 1
+        return execute_query(UPDATE_SESSION, (score, serialized, now, session_id)) is not None
+
+    def complete(self, session_id: str):
+        """Forget a session whose final state the completion transaction already wrote"""
+        with self._lock:
+            self._sessions.pop(session_id, None)
+
+    def _take_dirty(self) -> List[Tuple[str, int, SessionState]]:
+        with self._lock:
+            return [(session_id, state.version, SessionState(**vars(state)))
+                    for session_id, state in self._sessions.items() if state.dirty]
+
+    def _batches(self, dirty: List[Tuple[str, int, SessionState]]):
+        batch, batch_bytes = [], 0
+        for item in dirty:
+            size = len(item[2].game_state or "")
+            if batch and (len(batch) >= self.max_batch_rows or batch_bytes + size > self.max_batch_bytes):
+                yield batch
+                batch, batch_bytes = [], 0
+            batch.append(item)
+            batch_bytes += size
+        if batch:
+            yield batch
+
+    def _write_batch(self, batch: List[Tuple[str, int, SessionState]]) -> bool:
+        """One UPDATE for the whole batch; sessions that already ended are left alone"""
+        assignments, values = [], []
+        for column, attribute in (("current_score", "score"), ("game_state", "game_state"),
+                                  ("last_activity", "last_activity")):
+            assignments.append(f"{column} = CASE id {' '.join(['WHEN %s THEN %s'] * len(batch))} END")
+            for session_id, _, state in batch:
+                values += [session_id, getattr(state, attribute)]
+
+        placeholders = ", ".join(["%s"] * len(batch))
+        query = f"UPDATE game_sessions SET {', '.join(assignments)} WHERE id IN ({placeholders}) AND is_active = TRUE"
+        values += [session_id for session_id, _, _ in batch]
+        return execute_query(query, values) is not None
+
+    def flush(self) -> int:
+        """Write every dirty session now; returns the number of sessions written"""
+        written = 0
+        with self._flush_lock:
+            for batch in self._batches(self._take_dirty()):
+                if not self._write_batch(batch):
+                    with self._lock:
+                        self._counters["flush_failures"] += 1
+                    break  # still dirty, retried on the next flush
+                with self._lock:
+                    for session_id, version, _ in batch:
+                        state = self._sessions.get(session_id)
+                        if state is not None:
+                            state.flushed_version = max(state.flushed_version, version)
+                    self._counters["flushes"] += 1
+                    self._counters["rows_written"] += len(batch)
+                written += len(batch)
+        return written
+
+    def _evict_idle(self):
+        cutoff = time.monotonic() - self.idle_ttl_seconds
+        with self._lock:
+            for session_id in [session_id for session_id, state in self._sessions.items()
+                               if not state.dirty and state.touched_at < cutoff]:
+                del self._sessions[session_id]
+
+    def _run(self):
+        while not self._stop.wait(self.flush_interval_seconds):
+            try:
+                self.flush()
+                self._evict_idle()
+            except Exception as e:
+                print(f"❌ Session state flush failed: {e}")
+
+    def _ensure_started(self):
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="session-store", daemon=True)
+                self._thread.start()
+
+    def close(self):
+        """Stop the flush thread and write whatever is still dirty"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        self.flush()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            dirty = sum(1 for state in self._sessions.values() if state.dirty)
+            return {
+                "enabled": self.enabled,
+                "sessions": len(self._sessions),
+                "dirty": dirty,
+                "flush_interval_seconds": self.flush_interval_seconds,
+                **self._counters
+            }
+
+
+# Initialize the store and flush it when the process exits
+session_store = SessionStateStore()
+atexit.register(session_store.close)
@@ -0,0 +1,125 @@
+# Per-user snapshot cache for the student stats dashboard
+# Snapshots are dropped by the write paths that change them (game completion,
+# achievement awards) and expire after a TTL as a safety net for writes made by
+# other processes. Each snapshot carries a content hash used as its ETag.
+
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, Optional
+
+from config import STATS_CACHE_CONFIG
+
+
+@dataclass(frozen=True)
+class StatsSnapshot:
+    stats: Dict[str, Any]
+    etag: str
+    built_at: float
+
+
+def make_etag(stats: Dict[str, Any]) -> str:
+    """Content hash of a stats payload; identical data always gives the same tag"""
+    canonical = json.dumps(stats, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha1(canonical.encode("utf-8")).hexdigest()
+
+
+class StatsSnapshotCache:
+    def __init__(self, config: Dict[str, Any] = None):
+        config = config or STATS_CACHE_CONFIG
+        self.enabled = config["enabled"]
+        self.max_entries = config["max_entries"]
+        self.ttl_seconds = config["ttl_seconds"]
+
+        self._entries: "OrderedDict[int, StatsSnapshot]" = OrderedDict()
+        self._generations: Dict[int, int] = {}
+        self._lock = threading.Lock()
+        self._counters = {
+            "hits": 0,
+            "misses": 0,
+            "expirations": 0,
+            "invalidations": 0,
+            "evictions": 0,
+            "stale_puts": 0,
+            "not_modified": 0
+        }
+
+    def generation(self, user_id: int) -> int:
+        """Read before building a snapshot; put() discards it if the user was invalidated meanwhile"""
+        with self._lock:
+            return self._generations.get(user_id, 0)
+
+    def get(self, user_id: int) -> Optional[StatsSnapshot]:
+        if not self.enabled:
+            return None
+
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None:
+                self._counters["misses"] += 1
+                return None
+
+            if time.monotonic() - entry.built_at > self.ttl_seconds:
+                del self._entries[user_id]
+                self._counters["expirations"] += 1
+                self._counters["misses"] += 1
+                return None
+
+            self._entries.move_to_end(user_id)
+            self._counters["hits"] += 1
+            return entry
+
+    def put(self, user_id: int, stats: Dict[str, Any], generation: int) -> StatsSnapshot:
+        """Store a freshly built snapshot and return it with its ETag"""
+        entry = StatsSnapshot(stats=stats, etag=make_etag(stats), built_at=time.monotonic())
+        if not self.enabled:
+            return entry
+
+        with self._lock:
+            if self._generations.get(user_id, 0) != generation:
+                self._counters["stale_puts"] += 1
+                return entry
+
+            self._entries[user_id] = entry
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._counters["evictions"] += 1
+        return entry
+
+    def invalidate(self, user_id: int):
+        """Drop a user's snapshot after a write that changes their stats"""
+        with self._lock:
+            self._generations[user_id] = self._generations.get(user_id, 0) + 1
+            if self._entries.pop(user_id, None) is not None:
+                self._counters["invalidations"] += 1
+
+    def record_not_modified(self):
+        with self._lock:
+            self._counters["not_modified"] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit ratio and snapshot ages for sizing the TTL"""
+        now = time.monotonic()
+        with self._lock:
+            counters = dict(self._counters)
+            ages = [now - entry.built_at for entry in self._entries.values()]
+
+        lookups = counters["hits"] + counters["misses"]
+        return {
+            "enabled": self.enabled,
+            "size": len(ages),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl_seconds,
+            "hit_ratio": round(counters["hits"] / lookups, 4) if lookups else 0.0,
+            "average_age_seconds": round(sum(ages) / len(ages), 1) if ages else 0.0,
+            "oldest_age_seconds": round(max(ages), 1) if ages else 0.0,
+            **counters
+        }
+
+
+# Initialize the cache
+stats_cache = StatsSnapshotCache()
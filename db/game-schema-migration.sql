@@ -36,16 +36,38 @@ CREATE TABLE IF NOT EXISTS game_progress (
     mistakes INT DEFAULT 0,
     xp_earned INT NOT NULL,
     completed_at TIMESTAMP NOT NULL,
-    game_state JSON, -- Save game state for resuming
+    game_state JSON, -- Legacy: final states are stored in game_progress_state
     performance_data JSON, -- Detailed performance metrics
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE,
     FOREIGN KEY (game_id) REFERENCES games(id) ON DELETE CASCADE,
     INDEX idx_user_game (user_id, game_id),
+    INDEX idx_user_completed (user_id, completed_at), -- Keyset pages of a student's history
     INDEX idx_completed_at (completed_at),
     INDEX idx_score (score)
 );
 
+-- Final game state of each completion, kept out of the history rows
+CREATE TABLE IF NOT EXISTS game_progress_state (
+    progress_id INT PRIMARY KEY,
+    state MEDIUMBLOB NOT NULL, -- COMPRESS()-format zlib JSON, read on demand
+    FOREIGN KEY (progress_id) REFERENCES game_progress(id) ON DELETE CASCADE
+);
+
+-- Per-student, per-game totals, updated by the game completion transaction
+CREATE TABLE IF NOT EXISTS game_progress_summary (
+    user_id INT NOT NULL,
+    game_id VARCHAR(255) NOT NULL,
+    attempts INT NOT NULL DEFAULT 0,
+    best_score INT NOT NULL DEFAULT 0,
+    total_score BIGINT NOT NULL DEFAULT 0,
+    total_time_spent BIGINT NOT NULL DEFAULT 0,
+    last_completed_at TIMESTAMP NULL,
+    PRIMARY KEY (user_id, game_id),
+    FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE,
+    FOREIGN KEY (game_id) REFERENCES games(id) ON DELETE CASCADE
+);
+
 -- Game sessions for tracking active/paused games
 CREATE TABLE IF NOT EXISTS game_sessions (
     id VARCHAR(255) PRIMARY KEY,
@@ -248,6 +270,7 @@ INSERT IGNORE INTO games (id, title, subject, class_level, game_type, difficulty
 -- Create indexes for better performance
 CREATE INDEX IF NOT EXISTS idx_games_unlock ON games(difficulty, class_level);
 CREATE INDEX IF NOT EXISTS idx_progress_performance ON game_progress(user_id, score, completed_at);
+CREATE INDEX IF NOT EXISTS idx_user_completed ON game_progress(user_id, completed_at);
 CREATE INDEX IF NOT EXISTS idx_mastery_tracking ON subject_mastery(user_id, mastery_percentage);
 CREATE INDEX IF NOT EXISTS idx_analytics_reporting ON learning_analytics(user_id, event_type, timestamp);
 
@@ -331,6 +354,30 @@ END//
 
 DELIMITER ;
 
+-- Backfill the history tables from existing game_progress rows (safe to re-run).
+-- Copy and clear run in one transaction, and the clear only touches copied rows.
+START TRANSACTION;
+
+INSERT INTO game_progress_summary (user_id, game_id, attempts, best_score, total_score, total_time_spent, last_completed_at)
+SELECT user_id, game_id, COUNT(*), MAX(score), SUM(score), SUM(time_spent), MAX(completed_at)
+FROM game_progress
+GROUP BY user_id, game_id
+ON DUPLICATE KEY UPDATE
+    attempts = VALUES(attempts),
+    best_score = VALUES(best_score),
+    total_score = VALUES(total_score),
+    total_time_spent = VALUES(total_time_spent),
+    last_completed_at = VALUES(last_completed_at);
+
+INSERT IGNORE INTO game_progress_state (progress_id, state)
+SELECT id, COMPRESS(game_state) FROM game_progress WHERE game_state IS NOT NULL;
+
+UPDATE game_progress gp
+JOIN game_progress_state s ON s.progress_id = gp.id
+SET gp.game_state = NULL;
+
+COMMIT;
+
 -- Add some sample curriculum cache data
 INSERT IGNORE INTO curriculum_cache (id, subject, class_level, topic, language, content, version, expires_at) VALUES
 ('maths_8_algebra_en', 'maths', 8, 'Algebra', 'en', '{"concepts": ["Variables", "Linear Equations", "Solving Equations"], "examples": ["2x + 3 = 7", "x - 5 = 10"], "difficulty": "beginner"}', '1.0', DATE_ADD(NOW(), INTERVAL 30 DAY)),